@@ -0,0 +1,41 @@
+import argparse
+import asyncio
+import os
+import time
+
+os.environ.setdefault("LLM_STUB", "1")
+
+import httpx
+
+from src.main import app
+
+
+async def _run_level(client: httpx.AsyncClient, session_id: str, concurrency: int, rounds: int) -> float:
+    async def one():
+        response = await client.post("/api/generate/feed", json={"session_id": session_id, "platform": "reddit"})
+        response.raise_for_status()
+
+    start = time.perf_counter()
+    for _ in range(rounds):
+        await asyncio.gather(*(one() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    return concurrency * rounds / elapsed
+
+
+async def main(levels: list[int], rounds: int):
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        response = await client.post("/api/ingest/text", json={"prompt": "Benchmark source material about vinyl records."})
+        session_id = response.json()["session_id"]
+        print(f"{'concurrency':>12} {'req/s':>10}")
+        for level in levels:
+            throughput = await _run_level(client, session_id, level, rounds)
+            print(f"{level:>12} {throughput:>10.2f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Concurrent /api/generate/feed throughput against the stub provider")
+    parser.add_argument("--levels", type=int, nargs="+", default=[1, 2, 4, 8, 16, 32])
+    parser.add_argument("--rounds", type=int, default=3)
+    args = parser.parse_args()
+    asyncio.run(main(args.levels, args.rounds))
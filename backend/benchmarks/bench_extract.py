@@ -0,0 +1,72 @@
+import argparse
+import re
+import time
+from collections import Counter
+from pathlib import Path
+
+from bs4 import BeautifulSoup
+
+from benchmarks.fixtures import make_html_page
+from src.services.extract import extract_main_text
+
+CORPUS = Path(__file__).parent / "corpus"
+
+
+def soup_extract(html: str) -> str:
+    soup = BeautifulSoup(html, 'lxml')
+
+    for tag in soup(['script', 'style', 'nav', 'footer', 'header', 'aside', 'form', 'iframe']):
+        tag.decompose()
+
+    main_content = soup.find('article') or soup.find('main') or soup.find('div', class_=lambda x: x and 'content' in x.lower()) or soup.body
+
+    if main_content:
+        text = main_content.get_text(separator='\n', strip=True)
+    else:
+        text = soup.get_text(separator='\n', strip=True)
+
+    return '\n'.join(line for line in text.split('\n') if line.strip())
+
+
+def token_f1(predicted: str, gold: str) -> float:
+    pred = Counter(re.findall(r"\w+", predicted.lower()))
+    ref = Counter(re.findall(r"\w+", gold.lower()))
+    overlap = sum((pred & ref).values())
+    if not overlap:
+        return 0.0
+    precision = overlap / sum(pred.values())
+    recall = overlap / sum(ref.values())
+    return 2 * precision * recall / (precision + recall)
+
+
+def best_time(fn, html: str, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(html)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main(repeat: int, paragraphs: list[int]):
+    extractors = (("soup", soup_extract), ("lxml", extract_main_text))
+    print(f"{'page':>22} {'path':>6} {'ms':>9} {'f1':>6}")
+    for html_path in sorted(CORPUS.glob("*.html")):
+        html = html_path.read_text()
+        gold = html_path.with_suffix(".txt").read_text()
+        for name, fn in extractors:
+            elapsed = best_time(fn, html, repeat)
+            print(f"{html_path.stem:>22} {name:>6} {elapsed * 1000:>9.2f} {token_f1(fn(html), gold):>6.3f}")
+    for count in paragraphs:
+        html = make_html_page(count)
+        for name, fn in extractors:
+            elapsed = best_time(fn, html, max(1, repeat // 10))
+            print(f"{f'generated_{count}':>22} {name:>6} {elapsed * 1000:>9.2f} {'-':>6}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="HTML main-content extraction speed and token F1, BeautifulSoup vs lxml density")
+    parser.add_argument("--repeat", type=int, default=50)
+    parser.add_argument("--paragraphs", type=int, nargs="+", default=[100, 1000, 5000])
+    args = parser.parse_args()
+    main(args.repeat, args.paragraphs)
@@ -0,0 +1,367 @@
+import argparse
+import asyncio
+import json
+import logging
+import os
+import random
+import resource
+import socket
+import subprocess
+import time
+from collections import defaultdict
+from datetime import datetime, timezone
+from typing import Awaitable, Callable, Optional
+
+import httpx
+
+from benchmarks.fixtures import corpus_pages, load_prompts, make_pdf
+from benchmarks.loop import LoopLagMonitor
+
+SCENARIOS = ("pipeline", "burst", "mixed")
+PLATFORMS = ("reddit", "twitter")
+
+
+def percentile(values: list[float], q: float) -> Optional[float]:
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, round(q * len(ordered)) - 1))]
+
+
+def rss_mb() -> float:
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2 ** 20
+    except OSError:
+        return peak_rss_mb()
+
+
+def peak_rss_mb() -> float:
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+class Recorder:
+    def __init__(self):
+        self.latencies: dict[str, list[float]] = defaultdict(list)
+        self.errors: dict[str, int] = defaultdict(int)
+
+    async def call(self, op: str, fn: Callable[[], Awaitable]):
+        start = time.perf_counter()
+        try:
+            result = await fn()
+        except Exception:
+            self.errors[op] += 1
+            return None
+        self.latencies[op].append(time.perf_counter() - start)
+        return result
+
+    def record(self, op: str, seconds: float) -> None:
+        self.latencies[op].append(seconds)
+
+    def summary(self) -> dict:
+        ops = {}
+        for op in sorted(set(self.latencies) | set(self.errors)):
+            values = self.latencies.get(op, [])
+            ops[op] = {
+                "count": len(values),
+                "errors": self.errors.get(op, 0),
+                "p50_ms": _ms(percentile(values, 0.50)),
+                "p95_ms": _ms(percentile(values, 0.95)),
+                "p99_ms": _ms(percentile(values, 0.99)),
+                "mean_ms": _ms(sum(values) / len(values) if values else None),
+                "max_ms": _ms(max(values) if values else None),
+            }
+        return ops
+
+
+def _ms(seconds: Optional[float]) -> Optional[float]:
+    return round(seconds * 1000, 2) if seconds is not None else None
+
+
+class Workload:
+    def __init__(self, client: httpx.AsyncClient, recorder: Recorder, args: argparse.Namespace, pages_url: str):
+        self.client = client
+        self.recorder = recorder
+        self.args = args
+        self.pages_url = pages_url
+        self.prompts = load_prompts()
+        self.pages = corpus_pages()
+        self.run_id = f"{time.time():.0f}"
+
+    async def _post(self, path: str, **kwargs) -> dict:
+        response = await self.client.post(path, **kwargs)
+        response.raise_for_status()
+        return response.json()
+
+    async def ingest(self, kind: str, user: int, iteration: int, platform: str) -> Optional[str]:
+        n = user * 1000 + iteration
+        params = {"platform": platform}
+        if kind == "pdf":
+            pdf = make_pdf(self.args.pdf_pages, seed=n if self.args.unique_sources else 0)
+            call = lambda: self._post("/api/ingest/pdf", params=params, files={"file": ("bench.pdf", pdf, "application/pdf")})
+        elif kind == "url":
+            page = str(50 + n) if self.args.unique_sources else self.pages[n % len(self.pages)]
+            call = lambda: self._post("/api/ingest/url", params=params, json={"url": f"{self.pages_url}/pages/{page}"})
+        else:
+            prompt = self.prompts[n % len(self.prompts)]
+            if self.args.unique_sources:
+                prompt += f"\n\n(benchmark run {self.run_id}, user {user}, iteration {iteration})"
+            call = lambda: self._post("/api/ingest/text", params=params, json={"prompt": prompt})
+        data = await self.recorder.call(f"ingest_{kind}", call)
+        return data["session_id"] if data else None
+
+    async def feed(self, session_id: str, platform: str) -> None:
+        await self.recorder.call("feed", lambda: self._post("/api/generate/feed", json={
+            "session_id": session_id, "platform": platform, "post_count": self.args.posts, "bypass_cache": self.args.bypass_cache,
+        }))
+
+    async def stream(self, session_id: str, platform: str) -> None:
+        start = time.perf_counter()
+        body = {"session_id": session_id, "platform": platform, "post_count": self.args.posts, "bypass_cache": self.args.bypass_cache}
+        try:
+            async with self.client.stream("POST", "/api/generate/feed/stream", json=body) as response:
+                response.raise_for_status()
+                first = True
+                async for line in response.aiter_lines():
+                    if not line:
+                        continue
+                    if "error" in json.loads(line):
+                        raise ValueError(line)
+                    if first:
+                        self.recorder.record("stream_first_post", time.perf_counter() - start)
+                        first = False
+        except Exception:
+            self.recorder.errors["stream"] += 1
+            return
+        self.recorder.record("stream", time.perf_counter() - start)
+
+    async def page(self, session_id: str, platform: str, cursor: str) -> str:
+        data = await self.recorder.call("feed_page", lambda: self._post("/api/generate/feed/page", json={
+            "session_id": session_id, "platform": platform, "cursor": cursor, "page_size": 5, "bypass_cache": self.args.bypass_cache,
+        }))
+        return data["next_cursor"] if data else cursor
+
+    async def graph(self, session_id: str) -> None:
+        await self.recorder.call("graph", lambda: self._post("/api/generate/knowledge-graph", json={"session_id": session_id}))
+
+    async def recommendations(self, session_id: str) -> None:
+        await self.recorder.call("recommendations", lambda: self._post("/api/generate/recommendations", json={
+            "session_id": session_id, "bypass_cache": self.args.bypass_cache,
+        }))
+
+    async def bundle(self, session_id: str, platform: str) -> None:
+        await self.recorder.call("bundle", lambda: self._post("/api/generate/bundle", json={
+            "session_id": session_id, "platform": platform, "post_count": self.args.posts, "bypass_cache": self.args.bypass_cache,
+        }))
+
+    async def pipeline(self, user: int) -> None:
+        for iteration in range(self.args.iterations):
+            platform = PLATFORMS[(user + iteration) % len(PLATFORMS)]
+            kind = ("text", "pdf", "url")[(user + iteration) % 3]
+            session_id = await self.ingest(kind, user, iteration, platform)
+            if session_id:
+                await self.feed(session_id, platform)
+                await self.graph(session_id)
+
+    async def burst(self, user: int) -> None:
+        if user:
+            return
+        session_id = await self.ingest("text", 0, 0, "reddit")
+        if not session_id:
+            return
+        for _ in range(self.args.iterations):
+            await asyncio.gather(*(self.feed(session_id, "reddit") for _ in range(self.args.burst)))
+            await asyncio.sleep(self.args.pause)
+
+    async def mixed(self, user: int) -> None:
+        rng = random.Random(self.args.seed * 1000 + user)
+        platform = rng.choice(PLATFORMS)
+        session_id = await self.ingest(rng.choice(("text", "pdf", "url")), user, 0, platform)
+        if not session_id:
+            return
+        cursor = "0"
+        actions = ("feed", "stream", "page", "recommendations", "bundle")
+        for _ in range(self.args.iterations):
+            action = rng.choices(actions, weights=(30, 20, 20, 15, 15))[0]
+            platform = rng.choice(PLATFORMS)
+            if action == "feed":
+                await self.feed(session_id, platform)
+            elif action == "stream":
+                await self.stream(session_id, platform)
+            elif action == "page":
+                cursor = await self.page(session_id, platform, cursor)
+            elif action == "recommendations":
+                await self.recommendations(session_id)
+            else:
+                await self.bundle(session_id, platform)
+
+
+def configure_env(args: argparse.Namespace, stub_url: str) -> None:
+    from benchmarks.stub_server import provider_env
+
+    knobs = {
+        "STUB_LATENCY_MS": args.latency_ms,
+        "STUB_JITTER_MS": args.jitter_ms,
+        "STUB_FIRST_CHUNK_MS": args.first_chunk_ms,
+        "STUB_FAILURE_RATE": args.failure_rate,
+        "STUB_GARBAGE_RATE": args.garbage_rate,
+        "STUB_SEED": args.seed,
+    }
+    os.environ.update({name: str(value) for name, value in knobs.items() if value is not None})
+    if args.provider == "stub":
+        if not args.target:
+            os.environ["LLM_STUB"] = "1"
+    else:
+        os.environ.pop("LLM_STUB", None)
+        os.environ.update(provider_env(stub_url))
+
+
+async def run(args: argparse.Namespace) -> dict:
+    from benchmarks.stub_server import start_in_thread
+
+    stub_port = args.stub_port or free_port()
+    stub_url = f"http://127.0.0.1:{stub_port}"
+    configure_env(args, stub_url)
+
+    app = None
+    if not args.target:
+        from src.main import app
+
+        if not args.verbose:
+            logging.getLogger().setLevel(logging.WARNING)
+    stub_server = start_in_thread(port=stub_port)
+
+    app_server = app_task = None
+    base_url = args.target
+    if app is not None:
+        import uvicorn
+
+        port = free_port()
+        app_server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+        app_task = asyncio.create_task(app_server.serve())
+        while not app_server.started:
+            await asyncio.sleep(0.01)
+        base_url = f"http://127.0.0.1:{port}"
+
+    recorder = Recorder()
+    limits = httpx.Limits(max_connections=max(args.users, args.burst) * 2)
+    rss_start = rss_mb()
+    try:
+        async with httpx.AsyncClient(base_url=base_url, timeout=args.timeout, limits=limits) as client:
+            workload = Workload(client, recorder, args, stub_url)
+            scenario = getattr(workload, args.scenario)
+            async with LoopLagMonitor() as monitor:
+                start = time.perf_counter()
+                await asyncio.gather(*(scenario(user) for user in range(args.users)))
+                wall = time.perf_counter() - start
+    finally:
+        if app_server:
+            app_server.should_exit = True
+            await app_task
+        stub_server.should_exit = True
+
+    operations = recorder.summary()
+    requests = sum(op["count"] + op["errors"] for name, op in operations.items() if name != "stream_first_post")
+    return {
+        "scenario": args.scenario,
+        "started_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "commit": git_commit(),
+        "in_process": not args.target,
+        "config": {
+            **{k: v for k, v in vars(args).items() if k not in ("output", "baseline", "verbose")},
+            **{k: v for k, v in os.environ.items() if k.startswith(("STUB_", "LLM_", "FEED_", "SESSION_STORE", "JOB_"))},
+        },
+        "wall_seconds": round(wall, 3),
+        "requests": requests,
+        "errors": sum(op["errors"] for op in operations.values()),
+        "throughput_rps": round(requests / wall, 2) if wall else None,
+        "operations": operations,
+        "loop_lag_ms": {
+            "p50": _ms(percentile(monitor.samples, 0.50)),
+            "p99": _ms(percentile(monitor.samples, 0.99)),
+            "max": _ms(monitor.max_lag),
+        },
+        "rss_mb": {"start": round(rss_start, 1), "end": round(rss_mb(), 1), "peak": round(peak_rss_mb(), 1)},
+    }
+
+
+def print_report(result: dict, baseline: Optional[dict] = None) -> None:
+    print(f"scenario={result['scenario']} commit={result['commit']} wall={result['wall_seconds']}s "
+          f"requests={result['requests']} errors={result['errors']} throughput={result['throughput_rps']} req/s")
+    print(f"loop lag p50={result['loop_lag_ms']['p50']}ms p99={result['loop_lag_ms']['p99']}ms max={result['loop_lag_ms']['max']}ms "
+          f"rss start={result['rss_mb']['start']}MB end={result['rss_mb']['end']}MB peak={result['rss_mb']['peak']}MB")
+    print(f"{'operation':>18} {'count':>6} {'errors':>6} {'p50_ms':>9} {'p95_ms':>9} {'p99_ms':>9} {'max_ms':>9}")
+    for name, op in result["operations"].items():
+        print(f"{name:>18} {op['count']:>6} {op['errors']:>6} {_cell(op['p50_ms'])} {_cell(op['p95_ms'])} {_cell(op['p99_ms'])} {_cell(op['max_ms'])}")
+    if not baseline:
+        return
+    print(f"\ncompared with {baseline.get('commit')} ({baseline.get('started_at')}):")
+    print(f"{'operation':>18} {'p50 delta':>10} {'p95 delta':>10} {'p99 delta':>10}")
+    for name, op in result["operations"].items():
+        base = baseline.get("operations", {}).get(name)
+        if base:
+            print(f"{name:>18} " + " ".join(f"{_delta(op[k], base[k]):>10}" for k in ("p50_ms", "p95_ms", "p99_ms")))
+    print(f"{'throughput':>18} {_delta(result['throughput_rps'], baseline.get('throughput_rps')):>10}")
+
+
+def _cell(value: Optional[float]) -> str:
+    return f"{value:>9.1f}" if value is not None else f"{'-':>9}"
+
+
+def _delta(value: Optional[float], base: Optional[float]) -> str:
+    if value is None or not base:
+        return "-"
+    return f"{(value - base) / base * 100:+.1f}%"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Scripted load scenarios against the backend with a local LLM stub")
+    parser.add_argument("scenario", choices=SCENARIOS)
+    parser.add_argument("--users", type=int, default=8, help="concurrent virtual users")
+    parser.add_argument("--iterations", type=int, default=5, help="actions (or burst rounds) per user")
+    parser.add_argument("--burst", type=int, default=32, help="concurrent feed requests per burst round")
+    parser.add_argument("--pause", type=float, default=0.5, help="seconds between burst rounds")
+    parser.add_argument("--posts", type=int, default=10)
+    parser.add_argument("--pdf-pages", type=int, default=5)
+    parser.add_argument("--provider", choices=("server", "stub"), default="server",
+                        help="server: real Gemini/Minimax clients against the stub HTTP server; stub: in-process stub provider")
+    parser.add_argument("--target", help="benchmark an already running backend at this base URL instead of an in-process one "
+                                         "(start it against `python -m benchmarks.stub_server`)")
+    parser.add_argument("--stub-port", type=int, help="port for the stub server that also serves the URL-ingest pages")
+    parser.add_argument("--latency-ms", type=float)
+    parser.add_argument("--jitter-ms", type=float)
+    parser.add_argument("--first-chunk-ms", type=float)
+    parser.add_argument("--failure-rate", type=float)
+    parser.add_argument("--garbage-rate", type=float)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--bypass-cache", action=argparse.BooleanOptionalAction, default=True)
+    parser.add_argument("--unique-sources", action=argparse.BooleanOptionalAction, default=True,
+                        help="vary ingested sources so repeats are not served from an existing session")
+    parser.add_argument("--timeout", type=float, default=300)
+    parser.add_argument("--output", help="write the JSON result to this file")
+    parser.add_argument("--baseline", help="JSON result of an earlier run to compare against")
+    parser.add_argument("--verbose", action="store_true")
+    args = parser.parse_args()
+
+    result = asyncio.run(run(args))
+    baseline = None
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+    print_report(result, baseline)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(result, f, indent=2)
@@ -0,0 +1,58 @@
+import argparse
+import asyncio
+import io
+import time
+
+import pdfplumber
+
+from benchmarks.fixtures import make_pdf
+from benchmarks.loop import LoopLagMonitor
+from src.routes.ingest import MAX_SOURCE_LENGTH
+from src.services.pdf import SpooledPdf, extract_pdf_text, shutdown_executor
+
+
+async def inline_extract(contents: bytes, max_chars: int) -> tuple[str, int]:
+    with pdfplumber.open(io.BytesIO(contents)) as pdf:
+        text_parts = []
+        for page in pdf.pages:
+            text = page.extract_text()
+            if text:
+                text_parts.append(text)
+        return "\n\n".join(text_parts), len(pdf.pages)
+
+
+async def pooled_extract(contents: bytes, max_chars: int) -> tuple[str, int]:
+    with SpooledPdf.from_bytes(contents) as pdf:
+        return await extract_pdf_text(pdf, max_chars, use_cache=False)
+
+
+async def cached_extract(contents: bytes, max_chars: int) -> tuple[str, int]:
+    with SpooledPdf.from_bytes(contents) as pdf:
+        return await extract_pdf_text(pdf, max_chars)
+
+
+async def measure(fn, contents: bytes) -> tuple[float, float, int]:
+    async with LoopLagMonitor() as monitor:
+        start = time.perf_counter()
+        text, _ = await fn(contents, MAX_SOURCE_LENGTH)
+        elapsed = time.perf_counter() - start
+    return elapsed, monitor.max_lag, len(text)
+
+
+async def main(page_counts: list[int]):
+    await pooled_extract(make_pdf(1), MAX_SOURCE_LENGTH)
+    print(f"{'pages':>6} {'path':>8} {'latency_s':>10} {'max_lag_ms':>11} {'chars':>8}")
+    for pages in page_counts:
+        contents = make_pdf(pages)
+        await cached_extract(contents, MAX_SOURCE_LENGTH)
+        for name, fn in (("inline", inline_extract), ("pool", pooled_extract), ("cached", cached_extract)):
+            elapsed, lag, chars = await measure(fn, contents)
+            print(f"{pages:>6} {name:>8} {elapsed:>10.3f} {lag * 1000:>11.1f} {chars:>8}")
+    shutdown_executor()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="PDF extraction latency and event-loop lag: inline, process pool, and page-text cache hit")
+    parser.add_argument("--pages", type=int, nargs="+", default=[10, 100, 300])
+    args = parser.parse_args()
+    asyncio.run(main(args.pages))
@@ -0,0 +1,164 @@
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Optional
+
+import httpx
+
+from benchmarks.bench_load import _delta, free_port, git_commit, percentile
+
+BACKEND = Path(__file__).resolve().parent.parent
+HEAVY_MODULES = ("google.genai", "pdfplumber", "lxml", "bs4", "requests", "tiktoken", "numpy")
+IMPORT_PROBE = f"""
+import json, sys, time
+start = time.perf_counter()
+import src.main
+elapsed = time.perf_counter() - start
+print(json.dumps({{"seconds": elapsed, "loaded": [m for m in {HEAVY_MODULES!r} if m in sys.modules]}}))
+"""
+
+
+def _env(extra: Optional[dict] = None) -> dict:
+    env = dict(os.environ, PYTHONPATH=str(BACKEND))
+    env.update(extra or {})
+    return env
+
+
+def measure_import(runs: int) -> dict:
+    samples, loaded = [], set()
+    for _ in range(runs):
+        out = subprocess.run([sys.executable, "-c", IMPORT_PROBE], cwd=BACKEND, env=_env(), capture_output=True, text=True, check=True)
+        probe = json.loads(out.stdout.strip().splitlines()[-1])
+        samples.append(probe["seconds"])
+        loaded.update(probe["loaded"])
+    return {"samples": samples, "loaded_heavy_modules": sorted(loaded)}
+
+
+def _wait_healthy(client: httpx.Client, deadline: float) -> None:
+    while time.perf_counter() < deadline:
+        try:
+            if client.get("/api/health").status_code == 200:
+                return
+        except httpx.TransportError:
+            pass
+        time.sleep(0.005)
+    raise TimeoutError("backend did not become healthy in time")
+
+
+def measure_cold_start(runs: int, provider_env: dict, timeout: float, think: float = 0.0, verbose: bool = False) -> dict:
+    timings: dict[str, list[float]] = {"health": [], "first_ingest": [], "first_feed": []}
+    for _ in range(runs):
+        port = free_port()
+        start = time.perf_counter()
+        server = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "src.main:app", "--host", "127.0.0.1", "--port", str(port), "--log-level", "warning"],
+            cwd=BACKEND, env=_env(provider_env), stdout=subprocess.DEVNULL, stderr=None if verbose else subprocess.DEVNULL,
+        )
+        try:
+            with httpx.Client(base_url=f"http://127.0.0.1:{port}", timeout=timeout) as client:
+                _wait_healthy(client, start + timeout)
+                timings["health"].append(time.perf_counter() - start)
+
+                step = time.perf_counter()
+                response = client.post("/api/ingest/text", json={"prompt": f"Cold start probe {port}: tonearm setup and cartridge alignment."})
+                response.raise_for_status()
+                timings["first_ingest"].append(time.perf_counter() - step)
+                time.sleep(think)
+
+                step = time.perf_counter()
+                client.post(
+                    "/api/generate/feed",
+                    json={"session_id": response.json()["session_id"], "platform": "reddit", "post_count": 3, "bypass_cache": True},
+                ).raise_for_status()
+                timings["first_feed"].append(time.perf_counter() - step)
+        finally:
+            server.terminate()
+            server.wait(timeout=10)
+    return timings
+
+
+def _summary(samples: list[float]) -> dict:
+    return {
+        "runs": len(samples),
+        "p50_ms": round(percentile(samples, 0.5) * 1000, 1) if samples else None,
+        "max_ms": round(max(samples) * 1000, 1) if samples else None,
+    }
+
+
+def run(args: argparse.Namespace) -> dict:
+    from benchmarks.stub_server import provider_env, start_in_thread
+
+    imports = measure_import(args.runs)
+    stub_port = free_port()
+    stub = start_in_thread(port=stub_port)
+    env = dict(provider_env(f"http://127.0.0.1:{stub_port}"), STUB_LATENCY_MS=str(args.latency_ms))
+    try:
+        cold = measure_cold_start(args.runs, env, args.timeout, args.think_ms / 1000, args.verbose)
+    finally:
+        stub.should_exit = True
+    return {
+        "commit": git_commit(),
+        "started_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": sys.version.split()[0],
+        "import": _summary(imports["samples"]),
+        "loaded_heavy_modules": imports["loaded_heavy_modules"],
+        **{name: _summary(samples) for name, samples in cold.items()},
+    }
+
+
+def print_report(result: dict, baseline: Optional[dict] = None) -> None:
+    print(f"commit={result['commit']} python={result['python']}")
+    print(f"{'stage':>14} {'runs':>5} {'p50_ms':>9} {'max_ms':>9}" + (f" {'p50 delta':>10}" if baseline else ""))
+    for stage in ("import", "health", "first_ingest", "first_feed"):
+        row = result[stage]
+        line = f"{stage:>14} {row['runs']:>5} {row['p50_ms']:>9.1f} {row['max_ms']:>9.1f}"
+        if baseline and stage in baseline:
+            line += f" {_delta(row['p50_ms'], baseline[stage]['p50_ms']):>10}"
+        print(line)
+    print(f"heavy modules loaded by importing src.main: {', '.join(result['loaded_heavy_modules']) or 'none'}")
+
+
+def check(result: dict, args: argparse.Namespace) -> list[str]:
+    failures = []
+    if args.max_import_ms and result["import"]["p50_ms"] > args.max_import_ms:
+        failures.append(f"import p50 {result['import']['p50_ms']}ms exceeds {args.max_import_ms}ms")
+    if args.max_health_ms and result["health"]["p50_ms"] > args.max_health_ms:
+        failures.append(f"time to first /api/health p50 {result['health']['p50_ms']}ms exceeds {args.max_health_ms}ms")
+    if args.forbid_heavy and result["loaded_heavy_modules"]:
+        failures.append(f"src.main eagerly imports {', '.join(result['loaded_heavy_modules'])}")
+    return failures
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Cold-start cost: import time, time to first /api/health and first-request latency")
+    parser.add_argument("--runs", type=int, default=5, help="fresh interpreter / server processes per measurement")
+    parser.add_argument("--latency-ms", type=float, default=50, help="stub provider latency for the first feed request")
+    parser.add_argument("--think-ms", type=float, default=0, help="pause between the first ingest and the first feed request")
+    parser.add_argument("--timeout", type=float, default=60)
+    parser.add_argument("--max-import-ms", type=float, help="fail if the median import of src.main is slower than this")
+    parser.add_argument("--max-health-ms", type=float, help="fail if the median time to a healthy /api/health is slower than this")
+    parser.add_argument("--forbid-heavy", action=argparse.BooleanOptionalAction, default=True,
+                        help="fail if importing src.main loads provider SDKs or document parsers")
+    parser.add_argument("--output", help="write the JSON result to this file")
+    parser.add_argument("--baseline", help="JSON result of an earlier run to compare against")
+    parser.add_argument("--verbose", action="store_true", help="show the backend's own logs")
+    args = parser.parse_args()
+
+    result = run(args)
+    baseline = None
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+    print_report(result, baseline)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(result, f, indent=2)
+    failures = check(result, args)
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    sys.exit(1 if failures else 0)
@@ -0,0 +1,89 @@
+import json
+import random
+from pathlib import Path
+
+CORPUS = Path(__file__).parent / "corpus"
+
+WORDS = (
+    "signal chain vinyl record stylus cartridge amplifier preamp phono groove platter tonearm "
+    "frequency response distortion analog digital sampling bitrate mastering loudness dynamic range "
+    "speaker impedance turntable belt drive direct drive isolation resonance channel balance"
+).split()
+
+
+def make_paragraphs(count: int, seed: int = 0) -> list[str]:
+    rng = random.Random(seed)
+    paragraphs = []
+    for _ in range(count):
+        sentences = []
+        for _ in range(rng.randint(3, 6)):
+            words = rng.choices(WORDS, k=rng.randint(8, 16))
+            sentences.append(" ".join(words).capitalize() + ".")
+        paragraphs.append(" ".join(sentences))
+    return paragraphs
+
+
+def _escape(text: str) -> str:
+    return text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+def make_pdf(pages: int, lines_per_page: int = 45, seed: int = 0) -> bytes:
+    rng = random.Random(seed)
+    objects: list[bytes] = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        b"",
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+    ]
+    page_ids = []
+    for _ in range(pages):
+        lines = [" ".join(rng.choices(WORDS, k=12)) for _ in range(lines_per_page)]
+        ops = ["BT", "/F1 10 Tf", "14 TL", "40 800 Td"]
+        ops += [f"({_escape(line)}) '" for line in lines]
+        ops.append("ET")
+        stream = "\n".join(ops).encode("latin-1")
+        objects.append(b"<< /Length %d >>\nstream\n" % len(stream) + stream + b"\nendstream")
+        content_id = len(objects)
+        objects.append(
+            b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] "
+            b"/Resources << /Font << /F1 3 0 R >> >> /Contents %d 0 R >>" % content_id
+        )
+        page_ids.append(len(objects))
+    kids = " ".join(f"{i} 0 R" for i in page_ids).encode()
+    objects[1] = b"<< /Type /Pages /Kids [" + kids + b"] /Count %d >>" % pages
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for i, body in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n" % i + body + b"\nendobj\n"
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    for offset in offsets:
+        out += b"%010d 00000 n \n" % offset
+    out += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref)
+    return bytes(out)
+
+
+def make_html_page(paragraphs: int, seed: int = 0) -> str:
+    rng = random.Random(seed)
+    links = "".join(f'<li><a href="/p/{i}">{" ".join(rng.choices(WORDS, k=3))}</a></li>' for i in range(40))
+    body = "".join(f"<p>{p}</p>" for p in make_paragraphs(paragraphs, seed))
+    cards = "".join(
+        f'<div class="card"><a href="/c/{i}">{" ".join(rng.choices(WORDS, k=4))}</a><span>{i} comments</span></div>'
+        for i in range(paragraphs)
+    )
+    return (
+        "<html><head><title>Generated</title><script>var x = 1;</script><style>p { margin: 0 }</style></head><body>"
+        f"<header><nav><ul>{links}</ul></nav></header>"
+        f'<div class="wrap"><div class="sidebar-content">{cards}</div>'
+        f'<div class="story"><h1>Generated article</h1>{body}</div></div>'
+        f"<footer><ul>{links}</ul></footer></body></html>"
+    )
+
+
+def load_prompts() -> list[str]:
+    return json.loads((CORPUS / "prompts.json").read_text(encoding="utf-8"))
+
+
+def corpus_pages() -> list[str]:
+    return sorted(path.stem for path in CORPUS.glob("*.html"))
@@ -0,0 +1,31 @@
+import asyncio
+import time
+
+
+class LoopLagMonitor:
+    def __init__(self, interval: float = 0.01):
+        self.interval = interval
+        self.max_lag = 0.0
+        self.samples: list[float] = []
+        self._task = None
+        self._last_tick = 0.0
+
+    def _record(self, lag: float):
+        lag = max(lag, 0.0)
+        self.samples.append(lag)
+        self.max_lag = max(self.max_lag, lag)
+
+    async def _run(self):
+        while True:
+            self._last_tick = time.perf_counter()
+            await asyncio.sleep(self.interval)
+            self._record(time.perf_counter() - self._last_tick - self.interval)
+
+    async def __aenter__(self):
+        self._task = asyncio.create_task(self._run())
+        await asyncio.sleep(0)
+        return self
+
+    async def __aexit__(self, *exc):
+        self._record(time.perf_counter() - self._last_tick - self.interval)
+        self._task.cancel()
@@ -0,0 +1,160 @@
+import argparse
+import asyncio
+import json
+import threading
+import time
+import uuid
+from pathlib import Path
+from typing import Optional
+
+import uvicorn
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import HTMLResponse, JSONResponse, Response, StreamingResponse
+from starlette.routing import Route
+
+from benchmarks.fixtures import make_html_page
+
+CORPUS = Path(__file__).parent / "corpus"
+
+
+def _parts_text(content: Optional[dict]) -> list[str]:
+    return [part["text"] for part in (content or {}).get("parts", []) if "text" in part]
+
+
+def create_app(gemini=None, minimax=None) -> Starlette:
+    from src.providers.stub import StubBehavior
+
+    gemini = gemini or StubBehavior.from_env("STUB_GEMINI_")
+    minimax = minimax or StubBehavior.from_env("STUB_MINIMAX_")
+    caches: dict[str, list[str]] = {}
+
+    def gemini_prompt(body: dict) -> tuple[str, int]:
+        cached = caches.get(body.get("cachedContent", ""), [])
+        texts = _parts_text(body.get("systemInstruction")) + cached
+        for content in body.get("contents", []):
+            texts += _parts_text(content)
+        return "\n\n".join(texts), sum(len(t) for t in cached)
+
+    def gemini_chunk(text: str, prompt_chars: int, cached_chars: int) -> dict:
+        return {
+            "candidates": [{"content": {"parts": [{"text": text}], "role": "model"}, "finishReason": "STOP", "index": 0}],
+            "usageMetadata": {
+                "promptTokenCount": prompt_chars // 4,
+                "candidatesTokenCount": len(text) // 4,
+                "cachedContentTokenCount": cached_chars // 4,
+            },
+        }
+
+    def gemini_error() -> JSONResponse:
+        return JSONResponse({"error": {"code": 503, "message": "Stub overloaded", "status": "UNAVAILABLE"}}, status_code=503)
+
+    async def gemini_model(request: Request) -> Response:
+        _, _, action = request.path_params["target"].partition(":")
+        prompt, cached_chars = gemini_prompt(await request.json())
+        text = gemini.respond(prompt)
+        if action == "streamGenerateContent":
+            fails = gemini.fails()
+            chunks = gemini.chunks(text)
+            delays = gemini.chunk_delays(len(chunks))
+            if fails and len(chunks) < 2:
+                await asyncio.sleep(delays[0])
+                return gemini_error()
+
+            async def events():
+                for i, (chunk, delay) in enumerate(zip(chunks, delays)):
+                    await asyncio.sleep(delay)
+                    if fails and i >= len(chunks) // 2:
+                        return
+                    yield f"data: {json.dumps(gemini_chunk(chunk, len(prompt), cached_chars))}\r\n\r\n"
+
+            return StreamingResponse(events(), media_type="text/event-stream")
+        await asyncio.sleep(gemini.delay())
+        if gemini.fails():
+            return gemini_error()
+        return JSONResponse(gemini_chunk(text, len(prompt), cached_chars))
+
+    async def create_cache(request: Request) -> Response:
+        body = await request.json()
+        name = f"cachedContents/{uuid.uuid4().hex[:12]}"
+        texts = _parts_text(body.get("systemInstruction"))
+        for content in body.get("contents", []):
+            texts += _parts_text(content)
+        caches[name] = texts
+        return JSONResponse({"name": name, "model": body.get("model"), "usageMetadata": {"totalTokenCount": sum(len(t) for t in texts) // 4}})
+
+    async def delete_cache(request: Request) -> Response:
+        caches.pop(f"cachedContents/{request.path_params['cache_id']}", None)
+        return JSONResponse({})
+
+    async def minimax_chat(request: Request) -> Response:
+        body = await request.json()
+        prompt = "\n\n".join(m.get("content", "") for m in body.get("messages", []))
+        text = minimax.respond(prompt)
+        if body.get("stream"):
+            fails = minimax.fails()
+            chunks = minimax.chunks(text)
+            delays = minimax.chunk_delays(len(chunks))
+
+            async def events():
+                for i, (chunk, delay) in enumerate(zip(chunks, delays)):
+                    await asyncio.sleep(delay)
+                    if fails and i >= len(chunks) // 2:
+                        return
+                    yield f"data: {json.dumps({'choices': [{'delta': {'content': chunk}}]})}\n\n"
+                yield "data: [DONE]\n\n"
+
+            return StreamingResponse(events(), media_type="text/event-stream")
+        await asyncio.sleep(minimax.delay())
+        if minimax.fails():
+            return JSONResponse({"base_resp": {"status_code": 1002, "status_msg": "Stub rate limited"}}, status_code=500)
+        return JSONResponse({
+            "choices": [{"message": {"role": "assistant", "content": text}, "finish_reason": "stop"}],
+            "usage": {"prompt_tokens": len(prompt) // 4, "completion_tokens": len(text) // 4},
+        })
+
+    async def page(request: Request) -> Response:
+        name = request.path_params["name"]
+        if name.isdigit():
+            return HTMLResponse(make_html_page(int(name), seed=int(name)))
+        path = CORPUS / f"{name}.html"
+        if not path.is_file():
+            return HTMLResponse("Not found", status_code=404)
+        return HTMLResponse(path.read_text(encoding="utf-8"))
+
+    return Starlette(routes=[
+        Route("/v1beta/models/{target}", gemini_model, methods=["POST"]),
+        Route("/v1beta/cachedContents", create_cache, methods=["POST"]),
+        Route("/v1beta/cachedContents/{cache_id}", delete_cache, methods=["DELETE"]),
+        Route("/v1/text/chatcompletion_v2", minimax_chat, methods=["POST"]),
+        Route("/pages/{name}", page, methods=["GET"]),
+    ])
+
+
+def provider_env(base_url: str) -> dict[str, str]:
+    return {
+        "GEMINI_API_KEY": "stub",
+        "GEMINI_BASE_URL": base_url,
+        "MINIMAX_API_KEY": "stub",
+        "MINIMAX_BASE_URL": f"{base_url}/v1/text/chatcompletion_v2",
+    }
+
+
+def start_in_thread(host: str = "127.0.0.1", port: int = 8765) -> uvicorn.Server:
+    server = uvicorn.Server(uvicorn.Config(create_app(), host=host, port=port, log_level="warning"))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.01)
+    return server
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Local Gemini/Minimax-compatible stub server with latency, failure and garbage knobs")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+    base_url = f"http://{args.host}:{args.port}"
+    print("Point the backend at this server with:")
+    for name, value in provider_env(base_url).items():
+        print(f"  export {name}={value}")
+    uvicorn.run(create_app(), host=args.host, port=args.port, log_level="warning")
@@ -1,26 +1,151 @@
 from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.middleware.gzip import GZipMiddleware
+from starlette.datastructures import Headers, MutableHeaders
+from fastapi.responses import JSONResponse, PlainTextResponse
 import uvicorn
+import asyncio
+import importlib
+import importlib.util
 import logging
+import math
+import os
+import time
+from contextlib import asynccontextmanager
 
 from src.routes.ingest import router as ingest_router
 from src.routes.generate import router as generate_router
+from src.providers.llm import llm_manager
+from src.services.pdf import shutdown_executor
+from src.services.prompts import load_tokenizer
+from src.services.fetcher import fetcher
+from src.services import session as session_service
+from src.services.cache import response_cache
+from src.services.jobs import job_queue, jobs
+from src.services.metrics import Gauge, http_request_seconds, rate_limited_total, registry
+from src.services.ratelimit import caller_limiter
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-app = FastAPI(title="Learned API", version="1.0.0")
+COMPRESS_MIN_SIZE = int(os.getenv("COMPRESS_MIN_SIZE", "1024"))
+UNCOMPRESSED_PATHS = {"/api/generate/feed/stream"}
+RATE_LIMITED_PREFIX = "/api/generate/"
+TRUST_FORWARDED = os.getenv("TRUST_FORWARDED", "0") != "0"
+PROVIDER_WARMUP = os.getenv("PROVIDER_WARMUP", "1") != "0"
 
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await asyncio.to_thread(load_tokenizer)
+    warmups = [asyncio.create_task(asyncio.to_thread(importlib.import_module, "src.services.retrieval"))]
+    if PROVIDER_WARMUP:
+        warmups.append(asyncio.create_task(llm_manager.ready()))
+    yield
+    await asyncio.gather(*warmups, return_exceptions=True)
+    await job_queue.aclose()
+    await jobs.aclose()
+    await llm_manager.aclose()
+    shutdown_executor()
+    await fetcher.aclose()
+
+
+app = FastAPI(title="Learned API", version="1.0.0", lifespan=lifespan)
+
+
+class CompressionMiddleware:
+    def __init__(self, app, minimum_size: int = COMPRESS_MIN_SIZE):
+        self.app = app
+        self.gzip = GZipMiddleware(app, minimum_size=minimum_size, compresslevel=6)
+        self.brotli = None
+        if importlib.util.find_spec("brotli_asgi"):
+            self.brotli = importlib.import_module("brotli_asgi").BrotliMiddleware(app, minimum_size=minimum_size, quality=5)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] in UNCOMPRESSED_PATHS:
+            await self.app(scope, receive, send)
+        elif self.brotli and "br" in Headers(scope=scope).get("accept-encoding", ""):
+            await self.brotli(scope, receive, _vary(send))
+        else:
+            await self.gzip(scope, receive, _vary(send))
+
+
+def _vary(send):
+    async def send_with_vary(message):
+        if message["type"] == "http.response.start":
+            headers = MutableHeaders(raw=message["headers"])
+            if "accept-encoding" not in headers.get("vary", "").lower():
+                headers.add_vary_header("Accept-Encoding")
+        await send(message)
+
+    return send_with_vary
+
+
+app.add_middleware(CompressionMiddleware)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["http://localhost:3000", "https://*.vercel.app"],
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag"],
 )
 
 
+registry.register(Gauge("learned_sessions", "Sessions held by the session store", lambda: len(session_service.store)))
+registry.register(Gauge(
+    "learned_session_store_bytes", "Approximate bytes held by the in-memory session store",
+    lambda: getattr(session_service.store, "total_bytes", 0),
+))
+registry.register(Gauge("learned_llm_cache_entries", "Entries in the LLM response cache", lambda: len(response_cache.memory)))
+registry.register(Gauge("learned_jobs", "Background jobs tracked by the job registry", lambda: len(jobs)))
+registry.register(Gauge("learned_job_queue_depth", "Generation jobs waiting for a worker", job_queue.depth))
+registry.register(Gauge("learned_llm_cache_hits_total", "LLM response cache hits", lambda: response_cache.hits, "counter"))
+registry.register(Gauge("learned_llm_cache_misses_total", "LLM response cache misses", lambda: response_cache.misses, "counter"))
+registry.register(Gauge("learned_llm_cache_reused_entries", "LLM cache entries served at least once", lambda: response_cache.memory.reused()))
+registry.register(Gauge("learned_llm_cache_bytes", "Bytes held by the in-memory LLM response cache", lambda: response_cache.memory.total_bytes))
+registry.register(Gauge("learned_rate_limited_callers", "Callers tracked by the per-caller rate limiter", lambda: len(caller_limiter)))
+
+
+def _caller(request: Request) -> str:
+    forwarded = request.headers.get("x-forwarded-for")
+    if TRUST_FORWARDED and forwarded:
+        return forwarded.split(",")[0].strip()
+    return request.client.host if request.client else "unknown"
+
+
+@app.middleware("http")
+async def limit_callers(request: Request, call_next):
+    if request.method == "POST" and request.url.path.startswith(RATE_LIMITED_PREFIX):
+        retry_after = caller_limiter.check(_caller(request))
+        if retry_after > 0:
+            rate_limited_total.inc(scope="caller")
+            return JSONResponse(
+                status_code=429,
+                content={"detail": "Rate limit exceeded"},
+                headers={"Retry-After": str(math.ceil(retry_after))},
+            )
+    return await call_next(request)
+
+
+@app.middleware("http")
+async def record_request_latency(request: Request, call_next):
+    start = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        route = request.scope.get("route")
+        http_request_seconds.observe(
+            time.perf_counter() - start,
+            route=getattr(route, "path", "unmatched"),
+            method=request.method,
+            status=status,
+        )
+
+
 @app.exception_handler(Exception)
 async def global_exception_handler(request: Request, exc: Exception):
     logger.error(f"Unhandled exception: {exc}")
@@ -35,6 +160,11 @@ async def health_check():
     return {"status": "ok", "providers": ["gemini", "minimax"]}
 
 
+@app.get("/api/metrics", response_class=PlainTextResponse)
+async def metrics():
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4")
+
+
 app.include_router(ingest_router)
 app.include_router(generate_router)
 
@@ -1,4 +1,4 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from typing import List, Optional
 from datetime import datetime
 
@@ -28,7 +28,13 @@ class Session(BaseModel):
     session_id: str
     source_text: str
     platform: str
+    full_text: Optional[str] = None
+    page_count: Optional[int] = None
     generated_posts: List[PostSchema] = []
+    recommendations: List[str] = []
+    knowledge_graph: Optional["KnowledgeGraphResponse"] = None
+    posts_version: int = 0
+    graph_posts_version: int = 0
     created_at: datetime = datetime.now()
 
 
@@ -57,10 +63,33 @@ class UrlIngestResponse(BaseModel):
     source_text: str
 
 
+class BatchIngestResponse(BaseModel):
+    job_id: str
+    status: str
+    total: int
+
+
+class JobStatusResponse(BaseModel):
+    job_id: str
+    kind: str
+    status: str
+    total: int = 0
+    completed: int = 0
+    items: List[dict] = []
+    result: Optional[dict] = None
+    error: Optional[str] = None
+
+
+class JobSubmitResponse(BaseModel):
+    job_id: str
+    status: str
+
+
 class FeedGenerateRequest(BaseModel):
     session_id: str
     platform: str
     post_count: int = 10
+    bypass_cache: bool = False
 
 
 class FeedGenerateResponse(BaseModel):
@@ -69,8 +98,26 @@ class FeedGenerateResponse(BaseModel):
     platform: str
 
 
+class FeedPageRequest(BaseModel):
+    session_id: str
+    platform: str
+    cursor: Optional[str] = None
+    page_size: int = Field(5, ge=1, le=20)
+    prefetch: bool = True
+    bypass_cache: bool = False
+
+
+class FeedPageResponse(BaseModel):
+    session_id: str
+    posts: List[PostSchema]
+    platform: str
+    next_cursor: str
+    total: int
+
+
 class RecommendationsRequest(BaseModel):
     session_id: str
+    bypass_cache: bool = False
 
 
 class RecommendationsResponse(BaseModel):
@@ -94,7 +141,25 @@ class GraphEdge(BaseModel):
 
 class KnowledgeGraphRequest(BaseModel):
     session_id: str
+    bypass_cache: bool = False
+    refine: bool = False
 
 class KnowledgeGraphResponse(BaseModel):
     nodes: List[GraphNode]
     edges: List[GraphEdge]
+
+class BundleGenerateRequest(BaseModel):
+    session_id: str
+    platform: str
+    post_count: int = 10
+    bypass_cache: bool = False
+
+class BundleGenerateResponse(BaseModel):
+    session_id: str
+    platform: str
+    posts: List[PostSchema]
+    recommendations: List[str]
+    knowledge_graph: Optional[KnowledgeGraphResponse] = None
+
+
+Session.model_rebuild()
@@ -1,67 +1,226 @@
 from abc import ABC, abstractmethod
-from typing import Optional
+from collections import OrderedDict
+from typing import Any, AsyncIterator, Callable, Optional, Union
+import asyncio
+import json
 import os
 import logging
-import requests
-from google import genai
-from google.genai import types
+import threading
+import time
+import httpx
 from dotenv import load_dotenv
+from src.services.cache import cache_key, response_cache
+from src.services.prompts import Prompt, as_prompt, count_tokens
+from src.providers.resilience import CircuitBreaker, CircuitOpenError, LatencyTracker
+from src.providers.pool import ProviderPool
+from src.services.ratelimit import TokenBucket, provider_bucket
+from src.services.singleflight import SingleFlight, flight_key
+from src.services.metrics import (
+    llm_fallbacks_total, llm_prompt_chars, llm_requests_total, llm_response_chars, rate_limited_total, record_tokens,
+)
 
 load_dotenv()
 
 logger = logging.getLogger(__name__)
 
+MINIMAX_TIMEOUT = float(os.getenv("MINIMAX_TIMEOUT", "120"))
+MINIMAX_MAX_CONNECTIONS = int(os.getenv("MINIMAX_MAX_CONNECTIONS", "20"))
+GEMINI_MAX_CONNECTIONS = int(os.getenv("GEMINI_MAX_CONNECTIONS", "20"))
+KEEPALIVE_EXPIRY = float(os.getenv("LLM_KEEPALIVE_EXPIRY", "60"))
+HEDGE_ENABLED = os.getenv("LLM_HEDGE", "1") != "0"
+HEDGE_DEFAULT_DELAY = float(os.getenv("LLM_HEDGE_DELAY", "15"))
+HEDGE_MIN_DELAY = float(os.getenv("LLM_HEDGE_MIN_DELAY", "1"))
+HEDGE_PERCENTILE = float(os.getenv("LLM_HEDGE_PERCENTILE", "0.95"))
+PROVIDER_CONCURRENCY = int(os.getenv("LLM_CONCURRENCY", "16"))
+GEMINI_CONTEXT_CACHE = os.getenv("GEMINI_CONTEXT_CACHE", "1") != "0"
+GEMINI_CACHE_MIN_TOKENS = int(os.getenv("GEMINI_CACHE_MIN_TOKENS", "1024"))
+GEMINI_CACHE_MIN_USES = int(os.getenv("GEMINI_CACHE_MIN_USES", "2"))
+GEMINI_CACHE_TTL = int(os.getenv("GEMINI_CACHE_TTL", "3600"))
+GEMINI_CACHE_MAX_ENTRIES = int(os.getenv("GEMINI_CACHE_MAX_ENTRIES", "256"))
+
 
 class LLMProvider(ABC):
+    name: str = ""
+    model: str = ""
+
     @abstractmethod
-    def generate(self, prompt: str) -> str:
+    async def agenerate(self, prompt: Prompt) -> str:
+        pass
+
+    async def astream(self, prompt: Prompt) -> AsyncIterator[str]:
+        yield await self.agenerate(prompt)
+
+    async def aclose(self) -> None:
         pass
 
 
+class ContextCache:
+    def __init__(self, create: Callable[[Prompt], Any], ttl: float = GEMINI_CACHE_TTL, min_uses: int = GEMINI_CACHE_MIN_USES, max_entries: int = GEMINI_CACHE_MAX_ENTRIES):
+        self.create = create
+        self.ttl = ttl
+        self.min_uses = min_uses
+        self.max_entries = max_entries
+        self._entries: OrderedDict[str, list] = OrderedDict()
+
+    async def lookup(self, prompt: Prompt) -> Optional[str]:
+        now = time.monotonic()
+        key = prompt.prefix_key
+        entry = self._entries.get(key)
+        if entry is None or entry[1] <= now:
+            if count_tokens(prompt.system) + count_tokens(prompt.context) < GEMINI_CACHE_MIN_TOKENS:
+                return None
+            entry = self._entries[key] = [0, now + self.ttl, None]
+        entry[0] += 1
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+        if entry[0] < self.min_uses:
+            return None
+        if entry[2] is None:
+            entry[1] = now + self.ttl - 60
+            entry[2] = asyncio.ensure_future(self.create(prompt))
+        try:
+            return await asyncio.shield(entry[2])
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.warning(f"Context cache unavailable, sending full prompt: {e}")
+            return None
+
+    def discard(self, prompt: Prompt) -> None:
+        self._entries.pop(prompt.prefix_key, None)
+
+    def names(self) -> list[str]:
+        return [
+            entry[2].result() for entry in self._entries.values()
+            if entry[2] is not None and entry[2].done() and not entry[2].cancelled() and entry[2].exception() is None
+        ]
+
+
 class GeminiProvider(LLMProvider):
+    name = "gemini"
+    model = "gemini-2.5-flash"
+
     def __init__(self, api_key: Optional[str] = None):
         api_key = api_key or os.getenv("GEMINI_API_KEY")
         if not api_key:
             raise ValueError("GEMINI_API_KEY not set")
-        self.client = genai.Client(api_key=api_key)
+        from google import genai
+        from google.genai import types
+
+        limits = httpx.Limits(
+            max_connections=GEMINI_MAX_CONNECTIONS,
+            max_keepalive_connections=GEMINI_MAX_CONNECTIONS,
+            keepalive_expiry=KEEPALIVE_EXPIRY,
+        )
+        self.client = genai.Client(
+            api_key=api_key,
+            http_options=types.HttpOptions(base_url=os.getenv("GEMINI_BASE_URL"), async_client_args={"limits": limits}),
+        )
+        self.context_cache = ContextCache(self._create_cache)
+
+    async def _create_cache(self, prompt: Prompt) -> str:
+        from google.genai import types
+
+        cache = await self.client.aio.caches.create(
+            model=self.model,
+            config=types.CreateCachedContentConfig(
+                system_instruction=prompt.system or None,
+                contents=[prompt.context],
+                ttl=f"{GEMINI_CACHE_TTL}s",
+            ),
+        )
+        logger.info(f"Created Gemini context cache {cache.name}")
+        return cache.name
 
-    def generate(self, prompt: str) -> str:
+    async def _request(self, prompt: Prompt, use_context_cache: bool = True) -> tuple[str, Any]:
+        from google.genai import types
+
+        cached_content = None
+        if use_context_cache and GEMINI_CONTEXT_CACHE and prompt.context:
+            cached_content = await self.context_cache.lookup(prompt)
+        if cached_content:
+            return prompt.user, types.GenerateContentConfig(cached_content=cached_content)
+        return prompt.content, types.GenerateContentConfig(system_instruction=prompt.system or None)
+
+    async def agenerate(self, prompt: Prompt) -> str:
         for attempt in range(2):
+            contents, config = await self._request(prompt, use_context_cache=attempt == 0)
             try:
-                response = self.client.models.generate_content(
-                    model='gemini-2.5-flash',
-                    contents=prompt
+                response = await self.client.aio.models.generate_content(
+                    model=self.model,
+                    contents=contents,
+                    config=config,
                 )
+                usage = response.usage_metadata
+                if usage:
+                    record_tokens(self.name, usage.prompt_token_count, usage.candidates_token_count, usage.cached_content_token_count)
                 return response.text
             except Exception as e:
                 logger.warning(f"Gemini attempt {attempt + 1} failed: {e}")
+                if config.cached_content:
+                    self.context_cache.discard(prompt)
                 if attempt == 1:
                     raise
         raise Exception("Gemini failed after retries")
 
+    async def astream(self, prompt: Prompt) -> AsyncIterator[str]:
+        contents, config = await self._request(prompt)
+        try:
+            stream = await self.client.aio.models.generate_content_stream(
+                model=self.model,
+                contents=contents,
+                config=config,
+            )
+        except Exception:
+            if config.cached_content:
+                self.context_cache.discard(prompt)
+            raise
+        async for chunk in stream:
+            if chunk.text:
+                yield chunk.text
+
+    async def aclose(self) -> None:
+        await asyncio.gather(
+            *(self.client.aio.caches.delete(name=name) for name in self.context_cache.names()),
+            return_exceptions=True,
+        )
+        http = getattr(self.client._api_client, "_async_httpx_client", None)
+        if http is not None:
+            await http.aclose()
+
 
 class MinimaxProvider(LLMProvider):
-    def __init__(self, api_key: Optional[str] = None):
+    name = "minimax"
+    model = "MiniMax-Text-01"
+
+    def __init__(self, api_key: Optional[str] = None, http_client: Optional[httpx.AsyncClient] = None):
         self.api_key = api_key or os.getenv("MINIMAX_API_KEY")
         if not self.api_key:
             raise ValueError("MINIMAX_API_KEY not set")
-        self.base_url = "https://api.minimaxi.chat/v1/text/chatcompletion_v2"
+        self.base_url = os.getenv("MINIMAX_BASE_URL", "https://api.minimaxi.chat/v1/text/chatcompletion_v2")
+        self._owns_client = http_client is None
+        self.http = http_client or httpx.AsyncClient(
+            timeout=MINIMAX_TIMEOUT,
+            limits=httpx.Limits(
+                max_connections=MINIMAX_MAX_CONNECTIONS,
+                max_keepalive_connections=MINIMAX_MAX_CONNECTIONS,
+                keepalive_expiry=KEEPALIVE_EXPIRY,
+            ),
+        )
 
-    def generate(self, prompt: str) -> str:
-        headers = {
-            "Authorization": f"Bearer {self.api_key}",
-            "Content-Type": "application/json"
-        }
-        payload = {
-            "model": "MiniMax-Text-01",
-            "messages": [{"role": "user", "content": prompt}]
-        }
+    async def agenerate(self, prompt: Prompt) -> str:
+        headers = self._headers()
+        payload = self._payload(prompt)
         for attempt in range(2):
             try:
-                response = requests.post(self.base_url, json=payload, headers=headers, timeout=120)
+                response = await self.http.post(self.base_url, json=payload, headers=headers)
                 response.raise_for_status()
                 data = response.json()
                 logger.info(f"Minimax raw response: {data}")
+                usage = data.get("usage") if isinstance(data, dict) else None
+                if isinstance(usage, dict):
+                    record_tokens(self.name, usage.get("prompt_tokens"), usage.get("completion_tokens"))
                 choices = data.get("choices") if isinstance(data, dict) else None
                 if not choices:
                     raise ValueError(f"Minimax bad response: {data}")
@@ -77,56 +236,343 @@ class MinimaxProvider(LLMProvider):
                     raise
         raise Exception("Minimax failed after retries")
 
+    async def astream(self, prompt: Prompt) -> AsyncIterator[str]:
+        payload = {**self._payload(prompt), "stream": True}
+        async with self.http.stream("POST", self.base_url, json=payload, headers=self._headers()) as response:
+            response.raise_for_status()
+            async for line in response.aiter_lines():
+                if not line.startswith("data:"):
+                    continue
+                data = line[5:].strip()
+                if not data or data == "[DONE]":
+                    continue
+                choices = json.loads(data).get("choices") or [{}]
+                delta = (choices[0] or {}).get("delta") or {}
+                text = delta.get("content") if isinstance(delta, dict) else None
+                if text:
+                    yield text
+
+    def _headers(self) -> dict:
+        return {
+            "Authorization": f"Bearer {self.api_key}",
+            "Content-Type": "application/json"
+        }
+
+    def _payload(self, prompt: Prompt) -> dict:
+        messages = [{"role": "system", "content": prompt.system}] if prompt.system else []
+        messages.append({"role": "user", "content": prompt.content})
+        return {
+            "model": self.model,
+            "messages": messages
+        }
+
+    async def aclose(self) -> None:
+        if self._owns_client:
+            await self.http.aclose()
+
 
 class LLMManager:
     def __init__(self):
-        self.gemini: Optional[LLMProvider] = None
-        self.minimax: Optional[LLMProvider] = None
+        self._gemini: Optional[LLMProvider] = None
+        self._minimax: Optional[LLMProvider] = None
+        self._initialized = False
+        self._init_lock = threading.Lock()
+        self._warmup: Optional[asyncio.Future] = None
+        self.breakers: dict[str, CircuitBreaker] = {}
+        self.latencies: dict[str, LatencyTracker] = {}
+        self.limits: dict[str, asyncio.Semaphore] = {}
+        self.buckets: dict[str, Optional[TokenBucket]] = {}
+        self.flights = SingleFlight("llm")
+        self.gemini_pool = ProviderPool(lambda key: GeminiProvider(api_key=key))
+        self.minimax_pool = ProviderPool(lambda key: MinimaxProvider(api_key=key))
+
+    @property
+    def gemini(self) -> Optional[LLMProvider]:
+        self._init_providers()
+        return self._gemini
+
+    @property
+    def minimax(self) -> Optional[LLMProvider]:
         self._init_providers()
+        return self._minimax
 
     def _init_providers(self):
+        if self._initialized:
+            return
+        with self._init_lock:
+            if not self._initialized:
+                self._create_providers()
+                self._initialized = True
+
+    async def ready(self) -> None:
+        if self._initialized:
+            return
+        if self._warmup is None or self._warmup.get_loop() is not asyncio.get_running_loop():
+            self._warmup = asyncio.ensure_future(asyncio.to_thread(self._init_providers))
+        await asyncio.shield(self._warmup)
+
+    def _create_providers(self):
+        if os.getenv("LLM_STUB"):
+            from src.providers.stub import StubProvider
+            self._gemini = StubProvider.from_env()
+            logger.info("Stub provider initialized")
+            return
+
         try:
-            self.gemini = GeminiProvider()
+            self._gemini = GeminiProvider()
             logger.info("Gemini provider initialized")
         except Exception as e:
             logger.warning(f"Gemini provider unavailable: {e}")
 
         try:
-            self.minimax = MinimaxProvider()
+            self._minimax = MinimaxProvider()
             logger.info("Minimax provider initialized")
         except Exception as e:
             logger.warning(f"Minimax provider unavailable: {e}")
 
-    def generate(self, prompt: str, gemini_key: Optional[str] = None, minimax_key: Optional[str] = None) -> tuple[str, str]:
+    async def provider_names(self) -> list[str]:
+        await self.ready()
+        return [p.name for p in (self.gemini, self.minimax) if p]
+
+    def _resolve(self, gemini_key: Optional[str], minimax_key: Optional[str]) -> tuple[Optional[LLMProvider], Optional[LLMProvider], list[tuple[ProviderPool, LLMProvider]]]:
         active_gemini = self.gemini
         active_minimax = self.minimax
+        leased: list[tuple[ProviderPool, LLMProvider]] = []
         if gemini_key:
             try:
-                active_gemini = GeminiProvider(api_key=gemini_key)
+                active_gemini = self.gemini_pool.acquire(gemini_key)
+                leased.append((self.gemini_pool, active_gemini))
             except Exception as e:
-                logger.warning(f"Could not init Gemini with provided key: {e}")
+                logger.warning(f"Could not init Gemini with provided key: {type(e).__name__}")
         if minimax_key:
             try:
-                active_minimax = MinimaxProvider(api_key=minimax_key)
+                active_minimax = self.minimax_pool.acquire(minimax_key)
+                leased.append((self.minimax_pool, active_minimax))
             except Exception as e:
-                logger.warning(f"Could not init Minimax with provided key: {e}")
+                logger.warning(f"Could not init Minimax with provided key: {type(e).__name__}")
+        return active_gemini, active_minimax, leased
 
-        if active_gemini:
-            try:
-                result = active_gemini.generate(prompt)
-                return result, "gemini"
-            except Exception as e:
-                logger.warning(f"Gemini failed, falling back to Minimax: {e}")
+    async def _release(self, leased: list[tuple[ProviderPool, LLMProvider]]) -> None:
+        for pool, provider in leased:
+            await pool.release(provider)
+
+    def _cached(self, prompt: Prompt, providers: tuple[Optional[LLMProvider], ...]) -> Optional[tuple[str, str]]:
+        keys = {cache_key(prompt.text, p.name, p.model): p for p in providers if p}
+        found = response_cache.lookup(keys)
+        if found is None:
+            return None
+        key, entry = found
+        logger.info(f"LLM cache hit for {keys[key].name} (entry served {entry.hits} times)")
+        return entry.value, keys[key].name
+
+    def _store(self, prompt: Prompt, provider: LLMProvider, result: str) -> None:
+        response_cache.put(cache_key(prompt.text, provider.name, provider.model), result)
+
+    def forget(self, prompt: Union[Prompt, str]) -> None:
+        text = as_prompt(prompt).text
+        for provider in (self.gemini, self.minimax, GeminiProvider, MinimaxProvider):
+            if provider:
+                response_cache.delete(cache_key(text, provider.name, provider.model))
 
-        if active_minimax:
+    def _breaker(self, provider: LLMProvider) -> Optional[CircuitBreaker]:
+        if provider is not self.gemini and provider is not self.minimax:
+            return None
+        return self.breakers.setdefault(provider.name, CircuitBreaker())
+
+    def _available(self, providers: list[LLMProvider]) -> list[LLMProvider]:
+        available = []
+        for provider in providers:
+            breaker = self._breaker(provider)
+            if breaker is None or breaker.available():
+                available.append(provider)
+            else:
+                logger.warning(f"{provider.name} circuit open, skipping")
+                llm_fallbacks_total.inc(from_provider=provider.name, reason="circuit_open")
+        return available
+
+    def _limit(self, provider: LLMProvider) -> asyncio.Semaphore:
+        limit = self.limits.get(provider.name)
+        if limit is None:
+            size = int(os.getenv(f"LLM_CONCURRENCY_{provider.name.upper()}", str(PROVIDER_CONCURRENCY)))
+            limit = self.limits[provider.name] = asyncio.Semaphore(size)
+        return limit
+
+    async def _pace(self, provider: LLMProvider) -> None:
+        if provider is not self.gemini and provider is not self.minimax:
+            return
+        if provider.name not in self.buckets:
+            self.buckets[provider.name] = provider_bucket(provider.name)
+        bucket = self.buckets[provider.name]
+        if bucket and bucket.try_acquire() > 0:
+            rate_limited_total.inc(scope=provider.name)
+            await bucket.acquire()
+
+    def _hedge_delay(self, provider: LLMProvider) -> float:
+        tracker = self.latencies.get(provider.name)
+        p95 = tracker.percentile(HEDGE_PERCENTILE) if tracker else None
+        return max(HEDGE_MIN_DELAY, p95 if p95 is not None else HEDGE_DEFAULT_DELAY)
+
+    async def _call(self, provider: LLMProvider, prompt: Prompt, validate: Optional[Callable[[str], Any]]) -> str:
+        breaker = self._breaker(provider)
+        if breaker and not breaker.allow():
+            llm_fallbacks_total.inc(from_provider=provider.name, reason="circuit_open")
+            raise CircuitOpenError(f"{provider.name} circuit open")
+        llm_prompt_chars.observe(len(prompt.text), provider=provider.name)
+        try:
+            await self._pace(provider)
+            async with self._limit(provider):
+                start = time.monotonic()
+                result = await provider.agenerate(prompt)
+        except asyncio.CancelledError:
+            if breaker:
+                breaker.release()
+            llm_requests_total.inc(provider=provider.name, outcome="cancelled")
+            raise
+        except Exception:
+            if breaker:
+                breaker.record_failure()
+            llm_requests_total.inc(provider=provider.name, outcome="failure")
+            raise
+        if breaker:
+            breaker.record_success()
+        llm_requests_total.inc(provider=provider.name, outcome="success")
+        llm_response_chars.observe(len(result), provider=provider.name)
+        self.latencies.setdefault(provider.name, LatencyTracker()).record(time.monotonic() - start)
+        if validate:
+            validate(result)
+        return result
+
+    async def _sequential(self, providers: list[LLMProvider], prompt: Prompt, validate: Optional[Callable[[str], Any]]) -> tuple[str, LLMProvider]:
+        for provider in providers:
             try:
-                result = active_minimax.generate(prompt)
-                return result, "minimax"
+                return await self._call(provider, prompt, validate), provider
+            except CircuitOpenError as e:
+                logger.warning(f"{e}, skipping")
             except Exception as e:
-                logger.error(f"Minimax also failed: {e}")
-                raise Exception("All LLM providers failed")
+                logger.warning(f"{provider.name} failed: {e}")
+                llm_fallbacks_total.inc(from_provider=provider.name, reason="error")
+        raise Exception("All LLM providers failed")
+
+    async def _hedged(self, primary: LLMProvider, secondary: LLMProvider, prompt: Prompt, validate: Optional[Callable[[str], Any]]) -> tuple[str, LLMProvider]:
+        tasks = {asyncio.create_task(self._call(primary, prompt, validate)): primary}
+        try:
+            done, _ = await asyncio.wait(tasks, timeout=self._hedge_delay(primary))
+            for task in done:
+                tasks.pop(task)
+                if task.exception() is None:
+                    return task.result(), primary
+                logger.warning(f"{primary.name} failed: {task.exception()}")
+                llm_fallbacks_total.inc(from_provider=primary.name, reason="error")
+            if tasks:
+                logger.info(f"{primary.name} slower than hedge delay, also trying {secondary.name}")
+                llm_fallbacks_total.inc(from_provider=primary.name, reason="hedge")
+            tasks[asyncio.create_task(self._call(secondary, prompt, validate))] = secondary
+            while tasks:
+                done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    provider = tasks.pop(task)
+                    if task.exception() is None:
+                        return task.result(), provider
+                    logger.warning(f"{provider.name} failed: {task.exception()}")
+            raise Exception("All LLM providers failed")
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    async def agenerate(
+        self,
+        prompt: Union[Prompt, str],
+        gemini_key: Optional[str] = None,
+        minimax_key: Optional[str] = None,
+        use_cache: bool = True,
+        prefer: Optional[str] = None,
+        validate: Optional[Callable[[str], Any]] = None,
+    ) -> tuple[str, str]:
+        prompt = as_prompt(prompt)
+        key = flight_key(prompt.text, gemini_key or "", minimax_key or "", use_cache, prefer or "", id(validate))
+        return await self.flights.do(key, lambda: self._agenerate(prompt, gemini_key, minimax_key, use_cache, prefer, validate))
+
+    async def _agenerate(
+        self,
+        prompt: Prompt,
+        gemini_key: Optional[str],
+        minimax_key: Optional[str],
+        use_cache: bool,
+        prefer: Optional[str],
+        validate: Optional[Callable[[str], Any]],
+    ) -> tuple[str, str]:
+        await self.ready()
+        active_gemini, active_minimax, leased = self._resolve(gemini_key, minimax_key)
+        providers = [p for p in (active_gemini, active_minimax) if p]
+        if prefer:
+            providers.sort(key=lambda p: p.name != prefer)
+        try:
+            if use_cache:
+                cached = self._cached(prompt, tuple(providers))
+                if cached:
+                    return cached
+            if not providers:
+                raise Exception("No LLM providers available")
+            providers = self._available(providers)
+            if not providers:
+                raise Exception("All LLM providers unavailable (circuit open)")
+            if HEDGE_ENABLED and len(providers) > 1:
+                result, provider = await self._hedged(providers[0], providers[1], prompt, validate)
+            else:
+                result, provider = await self._sequential(providers, prompt, validate)
+            self._store(prompt, provider, result)
+            return result, provider.name
+        finally:
+            await self._release(leased)
+
+    async def astream(self, prompt: Union[Prompt, str], gemini_key: Optional[str] = None, minimax_key: Optional[str] = None, use_cache: bool = True) -> AsyncIterator[tuple[str, str]]:
+        prompt = as_prompt(prompt)
+        await self.ready()
+        active_gemini, active_minimax, leased = self._resolve(gemini_key, minimax_key)
+        try:
+            if use_cache:
+                cached = self._cached(prompt, (active_gemini, active_minimax))
+                if cached:
+                    yield cached
+                    return
+            for provider in self._available([p for p in (active_gemini, active_minimax) if p]):
+                breaker = self._breaker(provider)
+                if breaker and not breaker.allow():
+                    logger.warning(f"{provider.name} circuit open, skipping")
+                    llm_fallbacks_total.inc(from_provider=provider.name, reason="circuit_open")
+                    continue
+                chunks: list[str] = []
+                try:
+                    await self._pace(provider)
+                    async with self._limit(provider):
+                        async for chunk in provider.astream(prompt):
+                            chunks.append(chunk)
+                            yield chunk, provider.name
+                    if breaker:
+                        breaker.record_success()
+                    self._store(prompt, provider, "".join(chunks))
+                    return
+                except Exception as e:
+                    if breaker:
+                        breaker.record_failure()
+                    if chunks:
+                        raise
+                    logger.warning(f"{provider.name} stream failed before first chunk: {e}")
+                except BaseException:
+                    if breaker:
+                        breaker.release()
+                    raise
+            raise Exception("All LLM providers failed")
+        finally:
+            await self._release(leased)
 
-        raise Exception("No LLM providers available")
+    async def aclose(self) -> None:
+        await asyncio.gather(
+            *(p.aclose() for p in (self._gemini, self._minimax) if p),
+            self.gemini_pool.aclose(),
+            self.minimax_pool.aclose(),
+            return_exceptions=True,
+        )
 
 
 llm_manager = LLMManager()
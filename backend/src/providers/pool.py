@@ -0,0 +1,90 @@
+import asyncio
+import hashlib
+import hmac
+import logging
+import os
+import time
+from collections import OrderedDict
+from typing import Any, Callable
+
+logger = logging.getLogger(__name__)
+
+PROVIDER_POOL_SIZE = int(os.getenv("LLM_PROVIDER_POOL_SIZE", "64"))
+PROVIDER_IDLE_TTL = float(os.getenv("LLM_PROVIDER_IDLE_TTL", "600"))
+
+_KEY_SALT = os.urandom(32)
+
+
+def key_digest(api_key: str) -> str:
+    return hmac.new(_KEY_SALT, api_key.encode("utf-8"), hashlib.sha256).hexdigest()
+
+
+class _Entry:
+    __slots__ = ("provider", "leases", "last_used", "evicted")
+
+    def __init__(self, provider: Any):
+        self.provider = provider
+        self.leases = 0
+        self.last_used = time.monotonic()
+        self.evicted = False
+
+
+class ProviderPool:
+    def __init__(self, factory: Callable[[str], Any], max_size: int = PROVIDER_POOL_SIZE, idle_ttl: float = PROVIDER_IDLE_TTL):
+        self._factory = factory
+        self.max_size = max_size
+        self.idle_ttl = idle_ttl
+        self._entries: OrderedDict[str, _Entry] = OrderedDict()
+        self._by_provider: dict[int, _Entry] = {}
+        self._closing: set[asyncio.Task] = set()
+
+    def acquire(self, api_key: str) -> Any:
+        digest = key_digest(api_key)
+        entry = self._entries.get(digest)
+        if entry is None:
+            entry = _Entry(self._factory(api_key))
+            self._entries[digest] = entry
+            self._by_provider[id(entry.provider)] = entry
+        self._entries.move_to_end(digest)
+        entry.leases += 1
+        entry.last_used = time.monotonic()
+        self._evict()
+        return entry.provider
+
+    async def release(self, provider: Any) -> None:
+        entry = self._by_provider.get(id(provider))
+        if entry is None:
+            return
+        entry.leases -= 1
+        entry.last_used = time.monotonic()
+        if entry.evicted and entry.leases == 0:
+            await self._close(entry)
+
+    def _evict(self) -> None:
+        now = time.monotonic()
+        for digest, entry in list(self._entries.items()):
+            over_capacity = len(self._entries) > self.max_size
+            idle = entry.leases == 0 and now - entry.last_used > self.idle_ttl
+            if not over_capacity and not idle:
+                continue
+            del self._entries[digest]
+            entry.evicted = True
+            if entry.leases == 0:
+                task = asyncio.get_running_loop().create_task(self._close(entry))
+                self._closing.add(task)
+                task.add_done_callback(self._closing.discard)
+
+    async def _close(self, entry: _Entry) -> None:
+        self._by_provider.pop(id(entry.provider), None)
+        try:
+            await entry.provider.aclose()
+        except Exception as e:
+            logger.warning(f"Failed to close pooled provider: {e}")
+
+    async def aclose(self) -> None:
+        entries = list(self._entries.values())
+        self._entries.clear()
+        await asyncio.gather(*(self._close(entry) for entry in entries), *self._closing)
+
+    def __len__(self) -> int:
+        return len(self._entries)
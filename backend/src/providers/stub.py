@@ -0,0 +1,149 @@
+import asyncio
+import json
+import os
+import random
+import re
+import uuid
+from dataclasses import dataclass, field
+from typing import AsyncIterator, Optional
+
+from src.providers.llm import LLMProvider
+from src.services.prompts import Prompt
+
+FALLBACK_WORDS = "stub source material about records audio signal chain turntable".split()
+
+
+class StubError(Exception):
+    pass
+
+
+def _source_words(prompt: str) -> list[str]:
+    source = prompt.split("Source material:\n", 1)[1] if "Source material:\n" in prompt else ""
+    words = re.findall(r"[A-Za-z][A-Za-z'-]+", source[:4000])
+    return words or FALLBACK_WORDS
+
+
+def _sentence(rng: random.Random, words: list[str], length: int) -> str:
+    return " ".join(rng.choice(words) for _ in range(length)).capitalize() + "."
+
+
+def _stub_posts(count: int = 10, words: list[str] = FALLBACK_WORDS, rng: Optional[random.Random] = None) -> list:
+    rng = rng or random.Random()
+    post_types = ["question", "creator", "rant", "listicle", "poll"]
+    return [
+        {
+            "id": str(uuid.uuid4()),
+            "platform": "reddit",
+            "post_type": post_types[i % len(post_types)],
+            "title": f"Stub post {uuid.uuid4().hex[:8]}: {_sentence(rng, words, 6)}",
+            "body": " ".join(_sentence(rng, words, rng.randint(10, 20)) for _ in range(4)),
+            "author_handle": f"u/stub_user_{i + 1}",
+            "upvotes": 100 * (i + 1),
+            "timestamp": f"{i + 1} hours ago",
+            "citations": ["Source: stub"],
+            "comments": [
+                {
+                    "id": f"c{i + 1}-{j + 1}",
+                    "author_handle": f"u/stub_commenter_{j + 1}",
+                    "body": _sentence(rng, words, rng.randint(12, 24)),
+                    "upvotes": 10 * (j + 1),
+                    "citations": [],
+                }
+                for j in range(2)
+            ],
+        }
+        for i in range(count)
+    ]
+
+
+def stub_response(prompt: str, rng: Optional[random.Random] = None) -> str:
+    if "knowledge graph" in prompt.lower() and "\nGraph:\n" in prompt:
+        graph = json.loads(prompt.rsplit("\nGraph:\n", 1)[1])
+        return json.dumps({"edges": [dict(edge, relationship="uses") for edge in graph["edges"]]})
+    if "follow-up" in prompt.lower():
+        return json.dumps([f"Stub recommendation {i + 1}" for i in range(5)])
+    match = re.search(r"exactly (\d+) posts", prompt)
+    return json.dumps(_stub_posts(int(match.group(1)) if match else 10, _source_words(prompt), rng))
+
+
+@dataclass
+class StubBehavior:
+    latency: float = 0.5
+    jitter: float = 0.0
+    first_chunk: Optional[float] = None
+    chunk_size: int = 64
+    failure_rate: float = 0.0
+    garbage_rate: float = 0.0
+    seed: Optional[int] = None
+    rng: random.Random = field(init=False, repr=False)
+
+    def __post_init__(self):
+        self.rng = random.Random(self.seed)
+
+    @classmethod
+    def from_env(cls, prefix: str = "STUB_") -> "StubBehavior":
+        def env(name: str, default: str) -> str:
+            return os.getenv(f"{prefix}{name}", os.getenv(f"STUB_{name}", default))
+
+        first_chunk = env("FIRST_CHUNK_MS", "")
+        seed = env("SEED", "")
+        return cls(
+            latency=float(env("LATENCY_MS", "500")) / 1000,
+            jitter=float(env("JITTER_MS", "0")) / 1000,
+            first_chunk=float(first_chunk) / 1000 if first_chunk else None,
+            chunk_size=int(env("CHUNK_SIZE", "64")),
+            failure_rate=float(env("FAILURE_RATE", "0")),
+            garbage_rate=float(env("GARBAGE_RATE", "0")),
+            seed=int(seed) if seed else None,
+        )
+
+    def delay(self) -> float:
+        return max(0.0, self.rng.gauss(self.latency, self.jitter) if self.jitter else self.latency)
+
+    def fails(self) -> bool:
+        return self.rng.random() < self.failure_rate
+
+    def respond(self, prompt: str) -> str:
+        text = stub_response(prompt, self.rng)
+        if self.rng.random() >= self.garbage_rate:
+            return text
+        if self.rng.random() < 0.5:
+            return "Sure! Here is the JSON you asked for:\n```json\n" + text[:self.rng.randint(1, max(1, len(text) - 1))]
+        return "I'm sorry, I can't produce that right now."
+
+    def chunks(self, text: str) -> list[str]:
+        return [text[i:i + self.chunk_size] for i in range(0, len(text), self.chunk_size)] or [""]
+
+    def chunk_delays(self, count: int) -> list[float]:
+        total = self.delay()
+        first = min(total, self.first_chunk) if self.first_chunk is not None else total / count
+        rest = (total - first) / (count - 1) if count > 1 else 0.0
+        return [first] + [rest] * (count - 1)
+
+
+class StubProvider(LLMProvider):
+    name = "stub"
+    model = "stub"
+
+    def __init__(self, latency: float = 0.5, chunk_size: int = 64, behavior: Optional[StubBehavior] = None):
+        self.behavior = behavior or StubBehavior(latency=latency, chunk_size=chunk_size)
+
+    @classmethod
+    def from_env(cls) -> "StubProvider":
+        return cls(behavior=StubBehavior.from_env())
+
+    async def agenerate(self, prompt: Prompt) -> str:
+        await asyncio.sleep(self.behavior.delay())
+        if self.behavior.fails():
+            raise StubError("Stub provider failure")
+        return self.behavior.respond(prompt.text)
+
+    async def astream(self, prompt: Prompt) -> AsyncIterator[str]:
+        fails = self.behavior.fails()
+        chunks = self.behavior.chunks(self.behavior.respond(prompt.text))
+        delays = self.behavior.chunk_delays(len(chunks))
+        for i, (chunk, delay) in enumerate(zip(chunks, delays)):
+            await asyncio.sleep(delay)
+            if fails and i >= len(chunks) // 2:
+                raise StubError("Stub provider stream failure")
+            yield chunk
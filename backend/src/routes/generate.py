@@ -1,230 +1,594 @@
+import asyncio
 import json
+import os
+import re
 import uuid
 import logging
-from typing import Optional
-from fastapi import APIRouter, HTTPException, Header
+from typing import TYPE_CHECKING, Optional
+from fastapi import APIRouter, HTTPException, Header, Query
+from fastapi.responses import JSONResponse, StreamingResponse
+from pydantic import BaseModel, ValidationError
 from src.models.schemas import (
-    FeedGenerateRequest, FeedGenerateResponse,
+    FeedGenerateRequest, FeedGenerateResponse, FeedPageRequest, FeedPageResponse,
     RecommendationsRequest, RecommendationsResponse,
     KnowledgeGraphRequest, KnowledgeGraphResponse,
+    BundleGenerateRequest, BundleGenerateResponse,
+    GraphEdge, GraphNode, JobStatusResponse, JobSubmitResponse, PostSchema, Session,
+)
+from src.services.session import (
+    append_session_posts, begin_write, count_session_posts, get_session, get_session_posts, update_session, update_session_graph,
+    update_session_posts,
 )
-from src.services.session import get_session, update_session_posts
 from src.providers.llm import llm_manager
+from src.services.prompts import Prompt, count_tokens, feed_prompt, graph_refine_prompt, passages_text, recommendations_prompt
+from src.services.parsing import (
+    JsonArrayStreamParser, normalize_post, parse_edge_labels, parse_posts, parse_string_list, validate_json,
+)
+from src.services.graph import build_graph
+from src.services.chunking import distribute
+from src.services.metrics import timed
+from src.services.jobs import FAILED, QueueFull, job_queue, jobs
+from src.services.singleflight import SingleFlight, flight_key
+
+if TYPE_CHECKING:
+    from src.services.retrieval import Passage, PassageIndex
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
 
-FEED_SYSTEM_PROMPT = """You are a social feed generator. Generate exactly 10 posts based on the source material provided.
-
-Output format: JSON array of posts with this exact structure:
-[
-  {
-    "id": "unique-id",
-    "platform": "reddit" or "twitter",
-    "post_type": "question" | "creator" | "rant" | "listicle" | "poll",
-    "title": "post title",
-    "body": "post body text",
-    "author_handle": "u/snake_case for reddit, @CamelCase for twitter",
-    "upvotes": number between X-Y based on post_type,
-    "timestamp": "relative time like '2 hours ago' or '3 days ago'",
-    "citations": ["Source: title or domain"],
-    "comments": [
-      {
-        "id": "comment-id",
-        "author_handle": "u/snake_case or @CamelCase",
-        "body": "comment text",
-        "upvotes": number,
-        "citations": ["optional citation"]
-      }
-    ]
-  }
-]
-
-Post type diversity requirements:
-- At minimum: 2 question posts, 2 creator posts, 1 rant post, 1 listicle, 1 poll, rest randomized
-
-For question posts: Generate 3-5 comments with answer revealed progressively (first sets up context, subsequent deepen explanation)
-For listicle posts: title must start with a number e.g. "Top 5..." or "7 reasons..."; body must be a numbered list (1. item\n2. item\n...) of 4-7 concise items derived from source material
-For poll posts: title is a binary or multiple-choice question derived from the source material (e.g. "Which approach do you prefer: X or Y?"); body starts with a short hook sentence, then lists 2-4 options formatted as "A) option\nB) option\n..." or "• option\n• option\n..."; comments are users stating which option they prefer and briefly why
-For non-question, non-listicle, non-poll posts: Generate 2-3 comments with tangential insights or debate
-
-Citation format: "Source: [document title or domain]"
-Upvote ranges: questions 500-5000, rants 1000-20000, listicles 2000-15000, creator posts 300-3000, polls 1000-10000
-
-Generate realistic author handles: Reddit u/snake_case, Twitter @CamelCase
-Generate plausible timestamps in relative format.
-
-Respond ONLY with valid JSON, no markdown, no explanation."""
-
-KNOWLEDGE_GRAPH_SYSTEM_PROMPT = """Extract a knowledge graph from the given posts.
-
-Output as JSON with this exact structure:
-{
-  "nodes": [
-    {"id": "unique-slug", "label": "Node Label", "type": "concept|person|tool|event", "post_ids": ["post-id-1"]}
-  ],
-  "edges": [
-    {"source": "node-slug-1", "target": "node-slug-2", "relationship": "relates to"}
-  ]
+CHUNK_TOKENS = int(os.getenv("FEED_CHUNK_TOKENS", "3000"))
+MAX_CHUNKS = int(os.getenv("FEED_MAX_CHUNKS", "8"))
+PAGE_SUMMARY_TITLES = int(os.getenv("FEED_PAGE_SUMMARY_TITLES", "40"))
+TOP_PASSAGES = int(os.getenv("FEED_TOP_PASSAGES", "6"))
+POST_TYPE_QUERIES = {
+    "question": "how why what problem help explain understand difference",
+    "creator": "built made created project design process experience results",
+    "rant": "problem issue wrong fail bad worse cost limitation trouble",
+    "listicle": "steps tips best top ways list examples features types",
+    "poll": "versus compared better choice option prefer alternative tradeoff",
 }
 
-Rules:
-- Extract 8-15 key nodes from the content
-- Node types: "concept" for ideas, "person" for people/authors, "tool" for technologies, "event" for events
-- Edge relationships should be descriptive (e.g. "uses", "created by", "relates to", "leads to", "part of")
-- post_ids must be actual IDs from the posts provided
-- Create meaningful edges between related nodes
-
-Respond ONLY with valid JSON, no markdown, no explanation."""
+_page_tasks: dict[str, asyncio.Task] = {}
+_flights = SingleFlight("generate")
+
+async def _llm_generate(prompt: Prompt, gemini_key: Optional[str], minimax_key: Optional[str], use_cache: bool = True, route: str = ""):
+    with timed("llm", route):
+        return await llm_manager.agenerate(prompt, gemini_key=gemini_key, minimax_key=minimax_key, use_cache=use_cache)
+
+
+def _title_key(post: dict) -> str:
+    return re.sub(r"[^a-z0-9]+", " ", str(post.get("title", "")).lower()).strip()
+
+
+def _merge_posts(groups: list[list[dict]]) -> list[dict]:
+    merged: list[dict] = []
+    seen_titles: set[str] = set()
+    seen_ids: set[str] = set()
+    for group in groups:
+        for post in group:
+            key = _title_key(post)
+            if key and key in seen_titles:
+                continue
+            seen_titles.add(key)
+            if post["id"] in seen_ids:
+                post["id"] = str(uuid.uuid4())
+            seen_ids.add(post["id"])
+            merged.append(post)
+    return merged
+
+
+async def _generate_missing_posts(
+    platform: str,
+    source: str,
+    existing: list[dict],
+    missing: int,
+    gemini_key: Optional[str],
+    minimax_key: Optional[str],
+) -> list[dict]:
+    titles = "\n".join(f"- {p['title']}" for p in existing)
+    prompt = feed_prompt(platform, source, missing, f"These posts already exist, do not repeat them:\n{titles}")
+    response_text, provider = await _llm_generate(prompt, gemini_key, minimax_key, use_cache=False, route="feed_missing")
+    logger.info(f"Generated {missing} missing posts using {provider}")
+    with timed("parse", "feed_missing"):
+        return parse_posts(response_text, platform)[:missing]
+
+
+async def _passage_index(session: Session) -> "PassageIndex":
+    from src.services.retrieval import passage_indexes
+
+    return await passage_indexes.get(session.full_text or session.source_text)
+
+
+def _is_long(session: Session) -> bool:
+    return count_tokens(session.full_text or session.source_text) > CHUNK_TOKENS
+
+
+def _feed_source(session: Session, index: "PassageIndex", passages: Optional[list["Passage"]] = None) -> str:
+    if passages is None and not _is_long(session):
+        passages = index.passages
+    if passages is None:
+        passages = index.search("", TOP_PASSAGES * len(POST_TYPE_QUERIES))
+    return passages_text(passages) or session.source_text
+
+
+def _post_type_passages(index: "PassageIndex", post_count: int) -> list[tuple[str, list["Passage"]]]:
+    post_types = list(POST_TYPE_QUERIES)[:max(1, min(MAX_CHUNKS, post_count))]
+    groups = []
+    used: set[int] = set()
+    for post_type in post_types:
+        passages = index.search(POST_TYPE_QUERIES[post_type], TOP_PASSAGES, used)
+        used.update(p.index for p in passages)
+        groups.append((post_type, passages))
+    return groups
+
+
+async def _generate_retrieved_feed(
+    session: Session,
+    index: "PassageIndex",
+    platform: str,
+    post_count: int,
+    gemini_key: Optional[str],
+    minimax_key: Optional[str],
+    use_cache: bool,
+) -> list[dict]:
+    providers = await llm_manager.provider_names() or [None]
+    with timed("retrieve", "feed"):
+        groups = _post_type_passages(index, post_count)
+    counts = distribute(post_count, len(groups))
+
+    async def generate_group(i: int, post_type: str, passages: list["Passage"]) -> list:
+        prompt = feed_prompt(platform, _feed_source(session, index, passages), counts[i], f"Make every post a {post_type} post.")
+        with timed("llm", "feed_chunk"):
+            response_text, provider = await llm_manager.agenerate(
+                prompt, gemini_key=gemini_key, minimax_key=minimax_key,
+                use_cache=use_cache, prefer=providers[i % len(providers)], validate=validate_json,
+            )
+        logger.info(f"Feed {post_type} posts generated from {len(passages)} passages using {provider}")
+        with timed("parse", "feed_chunk"):
+            return parse_posts(response_text, platform)[:counts[i]]
+
+    results = await asyncio.gather(*(generate_group(i, *group) for i, group in enumerate(groups)), return_exceptions=True)
+
+    generated = []
+    for (post_type, _), result in zip(groups, results):
+        if isinstance(result, Exception):
+            logger.warning(f"Feed {post_type} posts failed: {result}")
+            continue
+        generated.append(result)
+
+    merged = _merge_posts(generated)
+    if not merged:
+        raise Exception("All feed post groups failed")
+    return [index.cite(post) for post in merged[:post_count]]
+
+
+def _coalesced(kind: str, request: BaseModel, gemini_key: Optional[str], minimax_key: Optional[str], run):
+    key = flight_key(kind, request.model_dump_json(), gemini_key or "", minimax_key or "")
+    return lambda: _flights.do(key, run)
+
+
+def _submit_job(kind: str, session_id: str, run) -> JSONResponse:
+    if not get_session(session_id):
+        raise HTTPException(status_code=404, detail="Session not found")
 
+    async def work(job):
+        try:
+            job.result = (await run()).model_dump()
+        except HTTPException as e:
+            job.status = FAILED
+            job.error = e.detail
 
-def _llm_generate(prompt: str, gemini_key: Optional[str], minimax_key: Optional[str]):
-    return llm_manager.generate(prompt, gemini_key=gemini_key, minimax_key=minimax_key)
+    try:
+        job = job_queue.submit(kind, work)
+    except QueueFull as e:
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": "5"})
+    return JSONResponse(status_code=202, content=JobSubmitResponse(job_id=job.job_id, status=job.status).model_dump())
 
 
-@router.post("/api/generate/feed", response_model=FeedGenerateResponse)
+@router.post("/api/generate/feed", response_model=FeedGenerateResponse, responses={202: {"model": JobSubmitResponse}})
 async def generate_feed(
     request: FeedGenerateRequest,
     x_gemini_api_key: Optional[str] = Header(None),
     x_minimax_api_key: Optional[str] = Header(None),
+    run_async: bool = Query(False, alias="async"),
 ):
+    run = _coalesced("feed", request, x_gemini_api_key, x_minimax_api_key, lambda: _generate_feed(request, x_gemini_api_key, x_minimax_api_key))
+    if run_async:
+        return _submit_job("feed", request.session_id, run)
+    return await run()
+
+
+async def _generate_feed(
+    request: FeedGenerateRequest,
+    x_gemini_api_key: Optional[str],
+    x_minimax_api_key: Optional[str],
+) -> FeedGenerateResponse:
     session = get_session(request.session_id)
     if not session:
         raise HTTPException(status_code=404, detail="Session not found")
 
-    source_text = session.source_text
-    platform = request.platform
-
-    prompt = f"{FEED_SYSTEM_PROMPT}\n\nPlatform: {platform}\n\nSource material:\n{source_text}"
+    ticket = begin_write()
+    posts = await _feed_posts(
+        session, request.platform, request.post_count,
+        x_gemini_api_key, x_minimax_api_key, not request.bypass_cache,
+    )
+    update_session_posts(request.session_id, posts, ticket)
+    return FeedGenerateResponse(session_id=request.session_id, posts=posts, platform=request.platform)
+
+
+async def _feed_posts(
+    session: Session,
+    platform: str,
+    post_count: int,
+    x_gemini_api_key: Optional[str],
+    x_minimax_api_key: Optional[str],
+    use_cache: bool,
+) -> list[dict]:
+    index = await _passage_index(session)
+    if _is_long(session) and post_count > 1:
+        try:
+            return await _generate_retrieved_feed(
+                session, index, platform, post_count,
+                x_gemini_api_key, x_minimax_api_key, use_cache,
+            )
+        except Exception as e:
+            logger.error(f"Retrieved feed generation failed: {e}")
+            raise HTTPException(status_code=500, detail=f"Generation failed: {str(e)}")
+
+    with timed("prompt_build", "feed"):
+        source = _feed_source(session, index)
+        prompt = feed_prompt(platform, source, post_count)
 
     try:
-        response_text, provider = _llm_generate(prompt, x_gemini_api_key, x_minimax_api_key)
+        response_text, provider = await _llm_generate(prompt, x_gemini_api_key, x_minimax_api_key, use_cache, "feed")
         logger.info(f"Feed generated using {provider}")
     except Exception as e:
         logger.error(f"Feed generation failed: {e}")
         raise HTTPException(status_code=500, detail=f"Generation failed: {str(e)}")
 
-    try:
-        json_match = response_text.strip()
-        if json_match.startswith("```json"):
-            json_match = json_match[7:]
-        elif json_match.startswith("```"):
-            json_match = json_match[3:]
-        if json_match.endswith("```"):
-            json_match = json_match[:-3]
-        json_match = json_match.strip()
-        posts = json.loads(json_match)
-    except json.JSONDecodeError as e:
-        logger.warning(f"JSON parse failed, retrying: {e}")
+    with timed("parse", "feed"):
+        posts = parse_posts(response_text, platform)[:post_count]
+    missing = post_count - len(posts)
+    if missing > 0:
+        logger.warning(f"Recovered {len(posts)}/{post_count} posts, requesting {missing} more")
+        llm_manager.forget(prompt)
         try:
-            response_text, _ = _llm_generate(prompt, x_gemini_api_key, x_minimax_api_key)
-            json_match = response_text.strip()
-            if "```" in json_match:
-                json_match = json_match.split("```")[1]
-                if json_match.startswith("json"):
-                    json_match = json_match[4:]
-            posts = json.loads(json_match.strip())
-        except Exception as retry_error:
-            raise HTTPException(status_code=500, detail=f"Failed to parse LLM response: {str(retry_error)}")
+            extra = await _generate_missing_posts(platform, source, posts, missing, x_gemini_api_key, x_minimax_api_key)
+            posts = _merge_posts([posts, extra])
+        except Exception as e:
+            logger.warning(f"Missing post generation failed: {e}")
+    if not posts:
+        raise HTTPException(status_code=500, detail="Failed to parse LLM response")
+    return [index.cite(post) for post in posts]
+
+
+@router.post("/api/generate/feed/stream")
+async def generate_feed_stream(
+    request: FeedGenerateRequest,
+    x_gemini_api_key: Optional[str] = Header(None),
+    x_minimax_api_key: Optional[str] = Header(None),
+):
+    session = get_session(request.session_id)
+    if not session:
+        raise HTTPException(status_code=404, detail="Session not found")
 
+    platform = request.platform
+    index = await _passage_index(session)
+    prompt = feed_prompt(platform, _feed_source(session, index), request.post_count)
+
+    ticket = begin_write()
+
+    async def stream_posts():
+        parser = JsonArrayStreamParser()
+        posts: list[PostSchema] = []
+        provider = None
+        try:
+            async for chunk, provider in llm_manager.astream(prompt, gemini_key=x_gemini_api_key, minimax_key=x_minimax_api_key, use_cache=not request.bypass_cache):
+                for raw in parser.feed(chunk):
+                    if not isinstance(raw, dict):
+                        continue
+                    try:
+                        post = PostSchema(**index.cite(normalize_post(raw, platform)))
+                    except ValidationError as e:
+                        logger.warning(f"Skipping invalid streamed post: {e}")
+                        continue
+                    posts.append(post)
+                    yield post.model_dump_json() + "\n"
+        except Exception as e:
+            logger.error(f"Feed stream failed: {e}")
+            yield json.dumps({"error": "Generation failed", "detail": str(e)}) + "\n"
+        if posts:
+            update_session_posts(request.session_id, posts, ticket)
+        logger.info(f"Feed streamed {len(posts)} posts using {provider}")
+
+    return StreamingResponse(stream_posts(), media_type="application/x-ndjson")
+
+
+def _page_source(session: Session, index: "PassageIndex", recent: list[PostSchema]) -> str:
+    if not _is_long(session):
+        return _feed_source(session, index)
+    covered = {p.index for post in recent for p in index.cited(post.citations)}
+    with timed("retrieve", "feed_page"):
+        passages = index.search("", TOP_PASSAGES, covered) or index.search("", TOP_PASSAGES)
+    return _feed_source(session, index, passages)
+
+
+async def _append_feed_page(
+    session: Session,
+    platform: str,
+    page_size: int,
+    gemini_key: Optional[str],
+    minimax_key: Optional[str],
+    use_cache: bool,
+) -> int:
+    ticket = begin_write()
+    total = count_session_posts(session.session_id)
+    recent = get_session_posts(session.session_id, max(0, total - PAGE_SUMMARY_TITLES), total)
+    note = None
+    if recent:
+        titles = "\n".join(f"- {p.title}" for p in recent)
+        note = f"The feed already covers these posts, continue with new angles and do not repeat them:\n{titles}"
+    index = await _passage_index(session)
+    prompt = feed_prompt(platform, _page_source(session, index, recent), page_size, note)
+
+    response_text, provider = await _llm_generate(prompt, gemini_key, minimax_key, use_cache, "feed_page")
+    with timed("parse", "feed_page"):
+        posts = parse_posts(response_text, platform)[:page_size]
+    seen = {_title_key({"title": p.title}) for p in recent}
+    posts = [p for p in _merge_posts([posts]) if _title_key(p) not in seen]
+    if not posts:
+        llm_manager.forget(prompt)
+        raise Exception("No new posts in page response")
     for post in posts:
-        if "id" not in post or not post["id"]:
-            post["id"] = str(uuid.uuid4())
-        if "platform" not in post:
-            post["platform"] = platform
+        post["id"] = str(uuid.uuid4())
+        index.cite(post)
+    logger.info(f"Appended {len(posts)} posts to feed using {provider}")
+    return append_session_posts(session.session_id, posts, ticket)
 
-    update_session_posts(request.session_id, posts)
-    return FeedGenerateResponse(session_id=request.session_id, posts=posts, platform=platform)
 
+def _extend_feed(session: Session, platform: str, page_size: int, gemini_key: Optional[str], minimax_key: Optional[str], use_cache: bool) -> asyncio.Task:
+    key = flight_key(session.session_id, platform, page_size, gemini_key or "", minimax_key or "", use_cache)
+    task = _page_tasks.get(key)
+    if task is None or task.done():
+        task = asyncio.create_task(_append_feed_page(session, platform, page_size, gemini_key, minimax_key, use_cache))
+        _page_tasks[key] = task
 
-@router.post("/api/generate/recommendations", response_model=RecommendationsResponse)
-async def generate_recommendations(
-    request: RecommendationsRequest,
+        def done(t: asyncio.Task) -> None:
+            if _page_tasks.get(key) is t:
+                del _page_tasks[key]
+            if not t.cancelled() and t.exception():
+                logger.warning(f"Feed page generation failed: {t.exception()}")
+
+        task.add_done_callback(done)
+    return task
+
+
+@router.post("/api/generate/feed/page", response_model=FeedPageResponse)
+async def generate_feed_page(
+    request: FeedPageRequest,
     x_gemini_api_key: Optional[str] = Header(None),
     x_minimax_api_key: Optional[str] = Header(None),
 ):
     session = get_session(request.session_id)
     if not session:
         raise HTTPException(status_code=404, detail="Session not found")
+    try:
+        start = int(request.cursor or 0)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    if start < 0 or start > count_session_posts(request.session_id):
+        raise HTTPException(status_code=400, detail="Cursor is outside the feed")
+
+    end = start + request.page_size
+    use_cache = not request.bypass_cache
+    for _ in range(2):
+        if count_session_posts(request.session_id) >= end:
+            break
+        try:
+            await asyncio.shield(_extend_feed(
+                session, request.platform, request.page_size, x_gemini_api_key, x_minimax_api_key, use_cache,
+            ))
+        except Exception as e:
+            if count_session_posts(request.session_id) > start:
+                break
+            logger.error(f"Feed page generation failed: {e}")
+            raise HTTPException(status_code=500, detail=f"Generation failed: {str(e)}")
+
+    posts = get_session_posts(request.session_id, start, end)
+    total = count_session_posts(request.session_id)
+    if request.prefetch and total < end + request.page_size:
+        _extend_feed(session, request.platform, request.page_size, x_gemini_api_key, x_minimax_api_key, use_cache)
+    return FeedPageResponse(
+        session_id=request.session_id,
+        posts=posts,
+        platform=request.platform,
+        next_cursor=str(start + len(posts)),
+        total=total,
+    )
 
-    source_text = session.source_text
 
-    prompt = f"""Based on the following source material, generate 5 follow-up single-text-prompt suggestions for further exploration.
+@router.post("/api/generate/recommendations", response_model=RecommendationsResponse, responses={202: {"model": JobSubmitResponse}})
+async def generate_recommendations(
+    request: RecommendationsRequest,
+    x_gemini_api_key: Optional[str] = Header(None),
+    x_minimax_api_key: Optional[str] = Header(None),
+    run_async: bool = Query(False, alias="async"),
+):
+    run = _coalesced("recommendations", request, x_gemini_api_key, x_minimax_api_key, lambda: _generate_recommendations(request, x_gemini_api_key, x_minimax_api_key))
+    if run_async:
+        return _submit_job("recommendations", request.session_id, run)
+    return await run()
+
 
-The suggestions should be ready-to-use prompts that explore related topics, deeper dive into concepts, or tangential areas.
+async def _generate_recommendations(
+    request: RecommendationsRequest,
+    x_gemini_api_key: Optional[str],
+    x_minimax_api_key: Optional[str],
+) -> RecommendationsResponse:
+    session = get_session(request.session_id)
+    if not session:
+        raise HTTPException(status_code=404, detail="Session not found")
 
-Source material:
-{source_text}
+    ticket = begin_write()
+    recommendations = await _recommendations(session.source_text, x_gemini_api_key, x_minimax_api_key, not request.bypass_cache)
+    update_session(request.session_id, ticket, recommendations=recommendations)
+    return RecommendationsResponse(recommendations=recommendations)
 
-Output as JSON array of strings, each being a complete prompt. Example:
-["How does analog audio signal chain work?", "What are the best practices for audio recording?", "Compare vinyl vs digital audio quality", "Best budget turntable recommendations", "How to maintain vinyl records properly"]
 
-Respond ONLY with valid JSON array, no explanation, no markdown."""
+async def _recommendations(
+    source_text: str,
+    x_gemini_api_key: Optional[str],
+    x_minimax_api_key: Optional[str],
+    use_cache: bool,
+) -> list[str]:
+    prompt = recommendations_prompt(source_text)
 
     try:
-        response_text, provider = _llm_generate(prompt, x_gemini_api_key, x_minimax_api_key)
+        response_text, provider = await _llm_generate(prompt, x_gemini_api_key, x_minimax_api_key, use_cache, "recommendations")
         logger.info(f"Recommendations generated using {provider}")
     except Exception as e:
         logger.error(f"Recommendations generation failed: {e}")
         raise HTTPException(status_code=500, detail=f"Generation failed: {str(e)}")
 
-    try:
-        json_match = response_text.strip()
-        if "```" in json_match:
-            json_match = json_match.split("```")[1]
-            if json_match.startswith("json"):
-                json_match = json_match[4:]
-        recommendations = json.loads(json_match.strip())
-    except json.JSONDecodeError as e:
-        logger.warning(f"Recommendations JSON parse failed: {e}")
-        recommendations = []
+    with timed("parse", "recommendations"):
+        return parse_string_list(response_text)[:5]
 
-    if not isinstance(recommendations, list):
-        recommendations = []
-    recommendations = recommendations[:5]
-    return RecommendationsResponse(recommendations=recommendations)
 
-
-@router.post("/api/generate/knowledge-graph", response_model=KnowledgeGraphResponse)
+@router.post("/api/generate/knowledge-graph", response_model=KnowledgeGraphResponse, responses={202: {"model": JobSubmitResponse}})
 async def generate_knowledge_graph(
     request: KnowledgeGraphRequest,
     x_gemini_api_key: Optional[str] = Header(None),
     x_minimax_api_key: Optional[str] = Header(None),
+    run_async: bool = Query(False, alias="async"),
 ):
+    run = _coalesced("knowledge_graph", request, x_gemini_api_key, x_minimax_api_key, lambda: _generate_knowledge_graph(request, x_gemini_api_key, x_minimax_api_key))
+    if run_async:
+        return _submit_job("knowledge_graph", request.session_id, run)
+    return await run()
+
+
+async def _generate_knowledge_graph(
+    request: KnowledgeGraphRequest,
+    x_gemini_api_key: Optional[str],
+    x_minimax_api_key: Optional[str],
+) -> KnowledgeGraphResponse:
     session = get_session(request.session_id)
     if not session:
         raise HTTPException(status_code=404, detail="Session not found")
 
-    posts = session.generated_posts
+    posts = get_session_posts(request.session_id)
     if not posts:
         raise HTTPException(status_code=400, detail="No posts in session to build graph from")
-
-    posts_text = "\n\n".join(
-        f"[ID: {p.id}]\nTitle: {p.title}\n{p.body}"
-        for p in posts
-    )
-    prompt = f"{KNOWLEDGE_GRAPH_SYSTEM_PROMPT}\n\nPosts:\n{posts_text}"
+    fresh = session.knowledge_graph and session.graph_posts_version == session.posts_version
+    if fresh and not request.bypass_cache and not request.refine:
+        return session.knowledge_graph
+
+    ticket = begin_write()
+    graph = await _knowledge_graph(posts, x_gemini_api_key, x_minimax_api_key, not request.bypass_cache, request.refine)
+    update_session_graph(request.session_id, graph, session.posts_version, ticket)
+    return graph
+
+
+async def _knowledge_graph(
+    posts: list[PostSchema],
+    x_gemini_api_key: Optional[str],
+    x_minimax_api_key: Optional[str],
+    use_cache: bool,
+    refine: bool = False,
+) -> KnowledgeGraphResponse:
+    with timed("build", "knowledge_graph"):
+        nodes, edges = build_graph(posts)
+    if refine and edges:
+        edges = await _refine_edges(nodes, edges, x_gemini_api_key, x_minimax_api_key, use_cache)
+    return KnowledgeGraphResponse(nodes=nodes, edges=edges)
+
+
+async def _refine_edges(
+    nodes: list[GraphNode],
+    edges: list[GraphEdge],
+    x_gemini_api_key: Optional[str],
+    x_minimax_api_key: Optional[str],
+    use_cache: bool,
+) -> list[GraphEdge]:
+    graph_text = json.dumps({
+        "nodes": [{"id": n.id, "label": n.label} for n in nodes],
+        "edges": [{"source": e.source, "target": e.target} for e in edges],
+    })
+    prompt = graph_refine_prompt(graph_text)
 
     try:
-        response_text, provider = _llm_generate(prompt, x_gemini_api_key, x_minimax_api_key)
-        logger.info(f"Knowledge graph generated using {provider}")
+        response_text, provider = await _llm_generate(prompt, x_gemini_api_key, x_minimax_api_key, use_cache, "knowledge_graph")
+        logger.info(f"Knowledge graph labels refined using {provider}")
+        with timed("parse", "knowledge_graph"):
+            labels = parse_edge_labels(response_text)
     except Exception as e:
-        logger.error(f"Knowledge graph generation failed: {e}")
-        raise HTTPException(status_code=500, detail=f"Generation failed: {str(e)}")
+        logger.warning(f"Keeping local graph labels, refinement failed: {e}")
+        return edges
+
+    return [
+        edge.model_copy(update={"relationship": labels.get((edge.source, edge.target)) or labels.get((edge.target, edge.source)) or edge.relationship})
+        for edge in edges
+    ]
+
+
+@router.post("/api/generate/bundle", response_model=BundleGenerateResponse, responses={202: {"model": JobSubmitResponse}})
+async def generate_bundle(
+    request: BundleGenerateRequest,
+    x_gemini_api_key: Optional[str] = Header(None),
+    x_minimax_api_key: Optional[str] = Header(None),
+    run_async: bool = Query(False, alias="async"),
+):
+    run = _coalesced("bundle", request, x_gemini_api_key, x_minimax_api_key, lambda: _generate_bundle(request, x_gemini_api_key, x_minimax_api_key))
+    if run_async:
+        return _submit_job("bundle", request.session_id, run)
+    return await run()
+
+
+async def _generate_bundle(
+    request: BundleGenerateRequest,
+    x_gemini_api_key: Optional[str],
+    x_minimax_api_key: Optional[str],
+) -> BundleGenerateResponse:
+    session = get_session(request.session_id)
+    if not session:
+        raise HTTPException(status_code=404, detail="Session not found")
 
+    use_cache = not request.bypass_cache
+    ticket = begin_write()
+
+    recommendations_task = asyncio.create_task(
+        _recommendations(session.source_text, x_gemini_api_key, x_minimax_api_key, use_cache)
+    )
+    try:
+        posts = [PostSchema(**p) for p in await _feed_posts(
+            session, request.platform, request.post_count, x_gemini_api_key, x_minimax_api_key, use_cache,
+        )]
+    except BaseException:
+        recommendations_task.cancel()
+        raise
+    graph = await _knowledge_graph(posts, x_gemini_api_key, x_minimax_api_key, use_cache)
     try:
-        json_match = response_text.strip()
-        if json_match.startswith("```json"):
-            json_match = json_match[7:]
-        elif json_match.startswith("```"):
-            json_match = json_match[3:]
-        if json_match.endswith("```"):
-            json_match = json_match[:-3]
-        graph = json.loads(json_match.strip())
-    except json.JSONDecodeError as e:
-        raise HTTPException(status_code=500, detail=f"Failed to parse graph response: {str(e)}")
-
-    return KnowledgeGraphResponse(
-        nodes=graph.get("nodes", []),
-        edges=graph.get("edges", []),
+        recommendations = await recommendations_task
+    except HTTPException as e:
+        logger.warning(f"Bundle recommendations failed: {e.detail}")
+        recommendations = []
+
+    update_session(
+        request.session_id, ticket,
+        generated_posts=posts, recommendations=recommendations, knowledge_graph=graph, graph_posts_version=ticket,
+    )
+    return BundleGenerateResponse(
+        session_id=request.session_id,
+        platform=request.platform,
+        posts=posts,
+        recommendations=recommendations,
+        knowledge_graph=graph,
     )
+
+
+@router.get("/api/jobs/{job_id}", response_model=JobStatusResponse)
+async def get_job_status(job_id: str):
+    job = jobs.get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return JobStatusResponse(**job.to_dict())
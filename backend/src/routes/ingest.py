@@ -1,38 +1,131 @@
+import asyncio
+import hashlib
+import json
+import os
 import uuid
 import logging
-import pdfplumber
-import httpx
-from bs4 import BeautifulSoup
-from fastapi import APIRouter, UploadFile, File, HTTPException
+from typing import List, Optional
+from fastapi import APIRouter, UploadFile, File, Form, Header, HTTPException, Response
 from src.models.schemas import (
     TextIngestRequest, TextIngestResponse,
-    PdfIngestResponse, UrlIngestRequest, UrlIngestResponse
+    PdfIngestResponse, UrlIngestRequest, UrlIngestResponse,
+    BatchIngestResponse, JobStatusResponse,
 )
-from src.services.session import create_session, get_session
+from src.models.schemas import Session
+from src.services.session import (
+    create_session, find_source, fork_session, get_session, get_session_post_json, get_session_posts, index_source, text_key,
+    update_session,
+)
+from src.services.pdf import PdfTooLarge, SpooledPdf, extract_pdf_text, spool_pdf
+from src.services.metrics import source_reuse_total, timed
+from src.services.fetcher import FetchError, HostLimiter, fetcher
+from src.services.jobs import FAILED, Job, jobs
+from src.services.prompts import truncate_tokens
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
 
 MAX_PDF_SIZE = 10 * 1024 * 1024
-MAX_TEXT_LENGTH = 12000
+MAX_SOURCE_LENGTH = 200000
+BATCH_MAX_ITEMS = int(os.getenv("BATCH_MAX_ITEMS", "50"))
+SESSION_FIELDS = (
+    "session_id", "source_text", "platform", "generated_posts", "recommendations", "knowledge_graph", "created_at",
+)
+FIELD_ALIASES = {"posts": "generated_posts", "graph": "knowledge_graph"}
+UNRESTRICTED_NOTE = "\n\n[Note: The LLM may supplement with general knowledge beyond this document.]"
+
+batch_limiter = HostLimiter()
+
+
+async def spool_upload(file: UploadFile, route: str, name: Optional[str] = None) -> SpooledPdf:
+    try:
+        with timed("read", route):
+            return await spool_pdf(file, MAX_PDF_SIZE)
+    except PdfTooLarge:
+        raise HTTPException(status_code=400, detail="PDF file size must be under 10MB" + (f": {name}" if name else ""))
+
+
+async def pdf_text(pdf: SpooledPdf) -> tuple[str, int]:
+    try:
+        with timed("extract", "ingest_pdf"):
+            return await extract_pdf_text(pdf, MAX_SOURCE_LENGTH)
+    except Exception as e:
+        logger.error(f"PDF extraction failed: {e}")
+        raise HTTPException(status_code=400, detail=f"Failed to extract text from PDF: {str(e)}")
 
 
-def truncate_text(text: str) -> str:
-    if len(text) > MAX_TEXT_LENGTH:
-        return text[:MAX_TEXT_LENGTH] + "\n\n[Document truncated for context]"
+async def url_text(url: str) -> str:
+    from src.services.extract import aextract_main_text
+
+    try:
+        with timed("fetch", "ingest_url"):
+            page = await fetcher.fetch(url)
+    except FetchError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+
+    with timed("extract", "ingest_url"):
+        text = await aextract_main_text(page.text)
+    if not text:
+        raise HTTPException(status_code=422, detail="No readable text found at URL")
     return text
 
 
+async def _new_session(kind: str, platform: str, text: str, keys: tuple[str, ...] = (), page_count: Optional[int] = None) -> Session:
+    from src.services.retrieval import passage_indexes
+
+    source_text = truncate_tokens(text)
+    full_text = text[:MAX_SOURCE_LENGTH]
+    keys = [*keys, text_key(full_text)]
+    session_id = str(uuid.uuid4())
+    parent, exact = find_source(keys, source_text)
+    if not exact:
+        passage_indexes.warm(full_text)
+    if parent is None:
+        session = create_session(session_id, source_text, platform, full_text=full_text, page_count=page_count)
+        index_source(session_id, keys, source_text)
+        return session
+
+    if exact:
+        session = fork_session(parent, session_id, platform, page_count=page_count)
+    else:
+        session = fork_session(parent, session_id, platform, source_text, full_text, page_count)
+        await _rebase_citations(parent, session)
+    index_source(session_id, keys)
+    source_reuse_total.inc(kind=kind, match="exact" if exact else "similar")
+    logger.info(f"Forked session {parent.session_id} for {kind} ingest ({'exact' if exact else 'similar'} source)")
+    return session
+
+
+async def _rebase_citations(parent: Session, session: Session) -> None:
+    from src.services.retrieval import passage_indexes
+
+    posts = get_session_posts(session.session_id)
+    if not posts:
+        return
+    index = await passage_indexes.get(session.full_text or session.source_text)
+    parent_text = parent.full_text or parent.source_text
+    update_session(session.session_id, generated_posts=[index.rebase(post.model_dump(), parent_text) for post in posts])
+
+
+def _reuse_session(kind: str, platform: str, key: str) -> Optional[Session]:
+    parent, _ = find_source([key])
+    if parent is None:
+        return None
+    session = fork_session(parent, str(uuid.uuid4()), platform)
+    index_source(session.session_id, [key])
+    source_reuse_total.inc(kind=kind, match="source")
+    logger.info(f"Forked session {parent.session_id} for repeated {kind} ingest")
+    return session
+
+
 @router.post("/api/ingest/text", response_model=TextIngestResponse)
 async def ingest_text(request: TextIngestRequest, platform: str = "reddit"):
     if not request.prompt.strip():
         raise HTTPException(status_code=400, detail="Prompt cannot be empty")
     
-    session_id = str(uuid.uuid4())
-    source_text = truncate_text(request.prompt)
-    create_session(session_id, source_text, platform)
+    session = await _new_session("text", platform, request.prompt)
     
-    return TextIngestResponse(session_id=session_id, source_text=source_text)
+    return TextIngestResponse(session_id=session.session_id, source_text=session.source_text)
 
 
 @router.post("/api/ingest/pdf", response_model=PdfIngestResponse)
@@ -40,72 +133,176 @@ async def ingest_pdf(file: UploadFile = File(...), platform: str = "reddit"):
     if file.content_type != "application/pdf":
         raise HTTPException(status_code=400, detail="File must be a PDF")
     
-    contents = await file.read()
-    if len(contents) > MAX_PDF_SIZE:
-        raise HTTPException(status_code=400, detail="PDF file size must be under 10MB")
-    
-    try:
-        import io
-        with pdfplumber.open(io.BytesIO(contents)) as pdf:
-            text_parts = []
-            for page in pdf.pages:
-                text = page.extract_text()
-                if text:
-                    text_parts.append(text)
-            full_text = "\n\n".join(text_parts)
-            page_count = len(pdf.pages)
-    except Exception as e:
-        logger.error(f"PDF extraction failed: {e}")
-        raise HTTPException(status_code=400, detail=f"Failed to extract text from PDF: {str(e)}")
-    
-    session_id = str(uuid.uuid4())
-    source_text = truncate_text(full_text)
-    create_session(session_id, source_text, platform)
+    with await spool_upload(file, "ingest_pdf") as pdf:
+        pdf_key = f"pdf:{pdf.sha256}"
+        session = _reuse_session("pdf", platform, pdf_key)
+        if session:
+            return PdfIngestResponse(session_id=session.session_id, source_text=session.source_text, page_count=session.page_count or 0)
+
+        full_text, page_count = await pdf_text(pdf)
+    session = await _new_session("pdf", platform, full_text, (pdf_key,), page_count)
     
-    return PdfIngestResponse(session_id=session_id, source_text=source_text, page_count=page_count)
+    return PdfIngestResponse(session_id=session.session_id, source_text=session.source_text, page_count=page_count)
 
 
 @router.post("/api/ingest/url", response_model=UrlIngestResponse)
 async def ingest_url(request: UrlIngestRequest, platform: str = "reddit"):
-    url = request.url
-    try:
-        async with httpx.AsyncClient() as client:
-            head_response = await client.head(url, timeout=10)
-            if head_response.status_code >= 400:
-                raise HTTPException(status_code=422, detail=f"URL is not reachable: {url}")
-            
-            response = await client.get(url, timeout=30)
-            response.raise_for_status()
-    except httpx.RequestError as e:
-        raise HTTPException(status_code=422, detail=f"Failed to fetch URL: {str(e)}")
-    
-    soup = BeautifulSoup(response.text, 'lxml')
-    
-    for tag in soup(['script', 'style', 'nav', 'footer', 'header', 'aside', 'form', 'iframe']):
-        tag.decompose()
-    
-    main_content = soup.find('article') or soup.find('main') or soup.find('div', class_=lambda x: x and 'content' in x.lower()) or soup.body
-    
-    if main_content:
-        text = main_content.get_text(separator='\n', strip=True)
-    else:
-        text = soup.get_text(separator='\n', strip=True)
-    
-    text = '\n'.join(line for line in text.split('\n') if line.strip())
-    
+    text = await url_text(request.url)
+
     if not request.restrict_to_document:
-        text += "\n\n[Note: The LLM may supplement with general knowledge beyond this document.]"
+        text += UNRESTRICTED_NOTE
     
-    session_id = str(uuid.uuid4())
-    source_text = truncate_text(text)
-    create_session(session_id, source_text, platform)
+    session = await _new_session("url", platform, text)
     
-    return UrlIngestResponse(session_id=session_id, source_text=source_text)
+    return UrlIngestResponse(session_id=session.session_id, source_text=session.source_text)
+
+
+async def _load_item(kind: str, payload) -> str:
+    if kind == "pdf":
+        with payload:
+            text, _ = await pdf_text(payload)
+        return text
+    if kind == "url":
+        async with batch_limiter.slot(payload):
+            return await url_text(payload)
+    return payload[:MAX_SOURCE_LENGTH]
+
+
+async def _batch_item(job: Job, index: int, kind: str, payload) -> None:
+    item = job.items[index]
+    item["status"] = "running"
+    try:
+        text = await _load_item(kind, payload)
+        if not text.strip():
+            raise HTTPException(status_code=422, detail="No text extracted")
+        item["text"] = text
+        item["chars"] = len(text)
+        item["status"] = "completed"
+    except HTTPException as e:
+        item["status"] = FAILED
+        item["error"] = e.detail
+    except Exception as e:
+        logger.error(f"Batch item {item['source']} failed: {e}")
+        item["status"] = FAILED
+        item["error"] = str(e)
+    job.completed += 1
+    job.touch()
+
+
+async def _run_batch(job: Job, payloads: list, mode: str, platform: str, restrict_to_document: bool) -> None:
+    await asyncio.gather(*(
+        _batch_item(job, index, item["kind"], payload) for index, (item, payload) in enumerate(zip(job.items, payloads))
+    ))
+    texts = [(item, item.pop("text")) for item in job.items if "text" in item]
+    if not texts:
+        job.status = FAILED
+        job.error = "No items could be ingested"
+        return
+
+    note = "" if restrict_to_document else UNRESTRICTED_NOTE
+    if mode == "combine":
+        full_text = "\n\n".join(f"[Source: {item['source']}]\n{text}" for item, text in texts) + note
+        session = await _new_session("batch", platform, full_text)
+        job.result = {"session_ids": [session.session_id]}
+    else:
+        for item, text in texts:
+            item["session_id"] = (await _new_session("batch", platform, text + note)).session_id
+        job.result = {"session_ids": [item["session_id"] for item, _ in texts]}
+
+
+@router.post("/api/ingest/batch", response_model=BatchIngestResponse, status_code=202)
+async def ingest_batch(
+    urls: List[str] = Form([]),
+    prompts: List[str] = Form([]),
+    files: List[UploadFile] = File([]),
+    mode: str = Form("combine"),
+    restrict_to_document: bool = Form(True),
+    platform: str = "reddit",
+):
+    if mode not in ("combine", "per_item"):
+        raise HTTPException(status_code=400, detail="mode must be 'combine' or 'per_item'")
+    if len(urls) == 1 and urls[0].lstrip().startswith("["):
+        try:
+            urls = json.loads(urls[0])
+        except json.JSONDecodeError:
+            raise HTTPException(status_code=400, detail="urls must be repeated form fields or a JSON array")
+    urls = [u.strip() for u in urls if u.strip()]
+    prompts = [p for p in prompts if p.strip()]
+    total = len(urls) + len(prompts) + len(files)
+    if total == 0:
+        raise HTTPException(status_code=400, detail="Batch must contain at least one URL, file or prompt")
+    if total > BATCH_MAX_ITEMS:
+        raise HTTPException(status_code=400, detail=f"Batch is limited to {BATCH_MAX_ITEMS} items")
+
+    for file in files:
+        if file.content_type != "application/pdf":
+            raise HTTPException(status_code=400, detail=f"File must be a PDF: {file.filename}")
+    items = []
+    try:
+        for file in files:
+            items.append(("pdf", file.filename or "upload.pdf", await spool_upload(file, "ingest_batch", file.filename)))
+    except BaseException:
+        for _, _, pdf in items:
+            pdf.close()
+        raise
+    items += [("url", url, url) for url in urls]
+    items += [("text", prompt[:80], prompt) for prompt in prompts]
+
+    job = jobs.create("ingest_batch", total=len(items))
+    job.items = [
+        {"index": index, "kind": kind, "source": source, "status": "pending"}
+        for index, (kind, source, _) in enumerate(items)
+    ]
+    payloads = [payload for _, _, payload in items]
+    jobs.start(job, lambda j: _run_batch(j, payloads, mode, platform, restrict_to_document))
+    return BatchIngestResponse(job_id=job.job_id, status=job.status, total=job.total)
+
+
+@router.get("/api/ingest/batch/{job_id}", response_model=JobStatusResponse)
+async def get_batch_status(job_id: str):
+    job = jobs.get(job_id)
+    if not job or job.kind != "ingest_batch":
+        raise HTTPException(status_code=404, detail="Job not found")
+    return JobStatusResponse(**job.to_dict())
+
+
+def _session_fields(fields: Optional[str]) -> set[str]:
+    if not fields:
+        return set(SESSION_FIELDS)
+    selected = set()
+    for name in fields.split(","):
+        name = FIELD_ALIASES.get(name.strip(), name.strip())
+        if name not in SESSION_FIELDS:
+            raise HTTPException(status_code=400, detail=f"Unknown session field: {name}")
+        selected.add(name)
+    return selected
+
+
+def _etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    tags = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+    return "*" in tags or etag.removeprefix("W/") in tags
 
 
 @router.get("/api/session/{session_id}")
-async def get_session_endpoint(session_id: str):
+async def get_session_endpoint(
+    session_id: str,
+    fields: Optional[str] = None,
+    if_none_match: Optional[str] = Header(None),
+):
     session = get_session(session_id)
     if not session:
         raise HTTPException(status_code=404, detail="Session not found")
-    return session
+
+    selected = _session_fields(fields)
+    body = session.model_dump_json(include=selected - {"generated_posts"}).encode("utf-8")
+    if "generated_posts" in selected:
+        posts = b"[" + b",".join(get_session_post_json(session_id)) + b"]"
+        body = body[:-1] + (b"," if len(body) > 2 else b"") + b'"generated_posts":' + posts + b"}"
+
+    etag = 'W/"' + hashlib.blake2b(body, digest_size=16).hexdigest() + '"'
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if _etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
@@ -0,0 +1,168 @@
+import hashlib
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Iterable, Optional
+
+logger = logging.getLogger(__name__)
+
+CACHE_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "512"))
+CACHE_MAX_BYTES = int(os.getenv("LLM_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+CACHE_TTL = float(os.getenv("LLM_CACHE_TTL", str(24 * 3600)))
+CACHE_PATH = os.getenv("LLM_CACHE_PATH")
+
+
+def cache_key(prompt: str, provider: str, model: str) -> str:
+    digest = hashlib.sha256()
+    for part in (provider, model, prompt):
+        digest.update(part.encode("utf-8"))
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+@dataclass
+class CacheEntry:
+    value: str
+    size: int
+    expires_at: float
+    hits: int = 0
+
+
+class MemoryCache:
+    def __init__(self, max_entries: int = CACHE_MAX_ENTRIES, max_bytes: int = CACHE_MAX_BYTES, ttl: float = CACHE_TTL):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.total_bytes = 0
+        self._entries: OrderedDict[str, CacheEntry] = OrderedDict()
+
+    def get(self, key: str) -> Optional[CacheEntry]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry.expires_at < time.time():
+            self.delete(key)
+            return None
+        self._entries.move_to_end(key)
+        entry.hits += 1
+        return entry
+
+    def put(self, key: str, value: str, hits: int = 0, expires_at: Optional[float] = None) -> None:
+        size = len(value.encode("utf-8"))
+        if size > self.max_bytes:
+            return
+        self.delete(key)
+        self._entries[key] = CacheEntry(value, size, expires_at or time.time() + self.ttl, hits)
+        self.total_bytes += size
+        while len(self._entries) > self.max_entries or self.total_bytes > self.max_bytes:
+            _, evicted = self._entries.popitem(last=False)
+            self.total_bytes -= evicted.size
+
+    def delete(self, key: str) -> None:
+        entry = self._entries.pop(key, None)
+        if entry:
+            self.total_bytes -= entry.size
+
+    def reused(self) -> int:
+        return sum(1 for entry in self._entries.values() if entry.hits)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class SqliteCache:
+    def __init__(self, path: str, ttl: float = CACHE_TTL):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS llm_cache ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL, hits INTEGER NOT NULL DEFAULT 0)"
+        )
+
+    def get(self, key: str) -> Optional[CacheEntry]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, expires_at, hits FROM llm_cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            value, expires_at, hits = row
+            if expires_at < time.time():
+                self._conn.execute("DELETE FROM llm_cache WHERE key = ?", (key,))
+                return None
+            self._conn.execute("UPDATE llm_cache SET hits = hits + 1 WHERE key = ?", (key,))
+        return CacheEntry(value, len(value.encode("utf-8")), expires_at, hits + 1)
+
+    def put(self, key: str, value: str, expires_at: Optional[float] = None) -> None:
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO llm_cache (key, value, expires_at, hits) VALUES (?, ?, ?, 0)",
+                (key, value, expires_at or time.time() + self.ttl),
+            )
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM llm_cache WHERE key = ?", (key,))
+
+    def purge_expired(self) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM llm_cache WHERE expires_at < ?", (time.time(),))
+
+
+class ResponseCache:
+    def __init__(self, memory: MemoryCache, disk: Optional[SqliteCache] = None):
+        self.memory = memory
+        self.disk = disk
+        self.hits = 0
+        self.misses = 0
+
+    def _entry(self, key: str) -> Optional[CacheEntry]:
+        entry = self.memory.get(key)
+        if entry is None and self.disk is not None:
+            entry = self.disk.get(key)
+            if entry is not None:
+                self.memory.put(key, entry.value, hits=entry.hits, expires_at=entry.expires_at)
+        return entry
+
+    def lookup(self, keys: Iterable[str]) -> Optional[tuple[str, CacheEntry]]:
+        for key in keys:
+            entry = self._entry(key)
+            if entry is not None:
+                self.hits += 1
+                return key, entry
+        self.misses += 1
+        return None
+
+    def get(self, key: str) -> Optional[str]:
+        found = self.lookup([key])
+        return found[1].value if found else None
+
+    def put(self, key: str, value: str) -> None:
+        self.memory.put(key, value)
+        if self.disk is not None:
+            self.disk.put(key, value)
+
+    def delete(self, key: str) -> None:
+        self.memory.delete(key)
+        if self.disk is not None:
+            self.disk.delete(key)
+
+
+def build_cache(path: Optional[str] = CACHE_PATH, memory: Optional[MemoryCache] = None, ttl: float = CACHE_TTL) -> ResponseCache:
+    disk = None
+    if path:
+        try:
+            disk = SqliteCache(path, ttl)
+            disk.purge_expired()
+        except sqlite3.Error as e:
+            logger.warning(f"Disk cache at {path} unavailable: {e}")
+    return ResponseCache(memory or MemoryCache(ttl=ttl), disk)
+
+
+response_cache = build_cache()
@@ -0,0 +1,72 @@
+import asyncio
+from typing import Optional
+
+import lxml.html
+from lxml import etree
+
+STRIP_TAGS = ("script", "style", "nav", "footer", "header", "aside", "form", "iframe", "noscript", "svg")
+TEXT_TAGS = {"p", "pre", "li", "blockquote", "td", "dd", "h1", "h2", "h3", "h4", "h5", "h6"}
+PREFERRED_TAGS = ("article", "main")
+MIN_BLOCK_CHARS = 25
+
+
+def _text_length(node: etree._Element) -> int:
+    return sum(len(t.strip()) for t in node.itertext())
+
+
+def _link_density(node: etree._Element, text_length: int) -> float:
+    if not text_length:
+        return 1.0
+    link_length = sum(_text_length(a) for a in node.iter("a"))
+    return min(1.0, link_length / text_length)
+
+
+def _best_block(root: etree._Element) -> Optional[etree._Element]:
+    scores: dict[etree._Element, float] = {}
+    for node in root.iter(*TEXT_TAGS):
+        length = _text_length(node)
+        if length < MIN_BLOCK_CHARS:
+            continue
+        parent = node.getparent()
+        if parent is None:
+            continue
+        score = 1 + min(length / 100, 3) + node.text_content().count(",")
+        scores[parent] = scores.get(parent, 0) + score
+        grandparent = parent.getparent()
+        if grandparent is not None:
+            scores[grandparent] = scores.get(grandparent, 0) + score / 2
+
+    best, best_score = None, 0.0
+    for node, score in scores.items():
+        score *= 1 - _link_density(node, _text_length(node))
+        if score > best_score:
+            best, best_score = node, score
+    return best
+
+
+def _lines(node: etree._Element) -> str:
+    return "\n".join(s for s in (t.strip() for t in node.itertext()) if s)
+
+
+def extract_main_text(html: str) -> str:
+    if not html.strip():
+        return ""
+    try:
+        root = lxml.html.document_fromstring(html)
+    except (etree.ParserError, ValueError):
+        return ""
+    etree.strip_elements(root, etree.Comment, *STRIP_TAGS, with_tail=False)
+
+    best = _best_block(root)
+    for tag in PREFERRED_TAGS:
+        preferred = root.find(f".//{tag}")
+        if preferred is not None and (best is None or _text_length(preferred) >= _text_length(best) / 2):
+            best = preferred
+            break
+
+    body = root.find("body")
+    return _lines(best if best is not None else body if body is not None else root)
+
+
+async def aextract_main_text(html: str) -> str:
+    return await asyncio.to_thread(extract_main_text, html)
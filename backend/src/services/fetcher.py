@@ -0,0 +1,156 @@
+import asyncio
+import importlib.util
+import logging
+import os
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, replace
+from typing import AsyncIterator, Optional
+from urllib.parse import urlsplit
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+FETCH_MAX_BYTES = int(os.getenv("FETCH_MAX_BYTES", str(2 * 1024 * 1024)))
+FETCH_TIMEOUT = float(os.getenv("FETCH_TIMEOUT", "30"))
+FETCH_MAX_CONNECTIONS = int(os.getenv("FETCH_MAX_CONNECTIONS", "50"))
+FETCH_CACHE_SIZE = int(os.getenv("FETCH_CACHE_SIZE", "256"))
+FETCH_CONCURRENCY = int(os.getenv("FETCH_CONCURRENCY", "8"))
+FETCH_PER_HOST = int(os.getenv("FETCH_PER_HOST", "2"))
+ALLOWED_CONTENT_TYPES = {"text/html", "application/xhtml+xml", "text/plain"}
+
+HTTP2_AVAILABLE = importlib.util.find_spec("h2") is not None
+
+
+class FetchError(Exception):
+    pass
+
+
+@dataclass
+class FetchedPage:
+    url: str
+    text: str
+    content_type: str
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
+    truncated: bool = False
+    from_cache: bool = False
+
+
+class PageCache:
+    def __init__(self, max_entries: int = FETCH_CACHE_SIZE):
+        self.max_entries = max_entries
+        self._pages: OrderedDict[str, FetchedPage] = OrderedDict()
+
+    def get(self, url: str) -> Optional[FetchedPage]:
+        page = self._pages.get(url)
+        if page is not None:
+            self._pages.move_to_end(url)
+        return page
+
+    def put(self, page: FetchedPage) -> None:
+        self._pages[page.url] = page
+        self._pages.move_to_end(page.url)
+        while len(self._pages) > self.max_entries:
+            self._pages.popitem(last=False)
+
+
+class HostLimiter:
+    def __init__(self, total: int = FETCH_CONCURRENCY, per_host: int = FETCH_PER_HOST):
+        self.per_host = per_host
+        self._total = asyncio.Semaphore(total)
+        self._hosts: dict[str, tuple[asyncio.Semaphore, int]] = {}
+
+    @asynccontextmanager
+    async def slot(self, url: str) -> AsyncIterator[None]:
+        host = (urlsplit(url).hostname or "").lower()
+        semaphore, users = self._hosts.get(host) or (asyncio.Semaphore(self.per_host), 0)
+        self._hosts[host] = (semaphore, users + 1)
+        try:
+            async with semaphore, self._total:
+                yield
+        finally:
+            semaphore, users = self._hosts[host]
+            if users == 1:
+                del self._hosts[host]
+            else:
+                self._hosts[host] = (semaphore, users - 1)
+
+
+class Fetcher:
+    def __init__(self, max_bytes: int = FETCH_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.cache = PageCache()
+        self._client: Optional[httpx.AsyncClient] = None
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                http2=HTTP2_AVAILABLE,
+                follow_redirects=True,
+                max_redirects=5,
+                timeout=FETCH_TIMEOUT,
+                limits=httpx.Limits(max_connections=FETCH_MAX_CONNECTIONS, keepalive_expiry=30),
+                headers={"User-Agent": "LearnedBot/1.0 (+https://github.com/gongahkia/trae-hackathon-2026)"},
+            )
+        return self._client
+
+    async def fetch(self, url: str) -> FetchedPage:
+        cached = self.cache.get(url)
+        headers = {}
+        if cached:
+            if cached.etag:
+                headers["If-None-Match"] = cached.etag
+            if cached.last_modified:
+                headers["If-Modified-Since"] = cached.last_modified
+
+        try:
+            async with self.client.stream("GET", url, headers=headers) as response:
+                if response.status_code == 304 and cached:
+                    return replace(cached, from_cache=True)
+                if response.status_code >= 400:
+                    raise FetchError(f"URL is not reachable: {url}")
+
+                content_type = response.headers.get("content-type", "").split(";")[0].strip().lower()
+                if content_type and content_type not in ALLOWED_CONTENT_TYPES:
+                    raise FetchError(f"Unsupported content type: {content_type}")
+
+                chunks = []
+                size = 0
+                truncated = False
+                async for chunk in response.aiter_bytes():
+                    remaining = self.max_bytes - size
+                    if len(chunk) > remaining:
+                        chunks.append(chunk[:remaining])
+                        truncated = True
+                        break
+                    chunks.append(chunk)
+                    size += len(chunk)
+                body = b"".join(chunks)
+                text = body.decode(response.encoding or "utf-8", errors="replace")
+                page = FetchedPage(
+                    url=url,
+                    text=text,
+                    content_type=content_type or "text/html",
+                    etag=response.headers.get("etag"),
+                    last_modified=response.headers.get("last-modified"),
+                    truncated=truncated,
+                )
+        except httpx.HTTPError as e:
+            raise FetchError(f"Failed to fetch URL: {str(e)}") from e
+
+        if truncated:
+            logger.info(f"Stopped reading {url} after {self.max_bytes} bytes")
+        if page.etag or page.last_modified:
+            self.cache.put(page)
+        return page
+
+    async def aclose(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+
+fetcher = Fetcher()
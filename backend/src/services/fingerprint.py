@@ -0,0 +1,37 @@
+import hashlib
+import re
+
+SHINGLE_SIZE = 3
+SIMHASH_BITS = 64
+
+_WORD = re.compile(r"\w+")
+
+
+def normalize_text(text: str) -> str:
+    return " ".join(_WORD.findall(text.lower()))
+
+
+def content_hash(text: str) -> str:
+    return hashlib.sha256(normalize_text(text).encode("utf-8")).hexdigest()
+
+
+def simhash(text: str) -> int:
+    words = _WORD.findall(text.lower())
+    shingles = {" ".join(words[i:i + SHINGLE_SIZE]) for i in range(max(1, len(words) - SHINGLE_SIZE + 1))}
+    hashes = [f"{int.from_bytes(hashlib.blake2b(s.encode('utf-8'), digest_size=8).digest(), 'big'):064b}" for s in shingles]
+    value = 0
+    for column in zip(*hashes):
+        value <<= 1
+        if column.count("1") * 2 > len(hashes):
+            value |= 1
+    return value
+
+
+def hamming(a: int, b: int) -> int:
+    return (a ^ b).bit_count()
+
+
+def bands(value: int, count: int = 4) -> list[tuple[int, int]]:
+    width = SIMHASH_BITS // count
+    mask = (1 << width) - 1
+    return [(i, (value >> (i * width)) & mask) for i in range(count)]
@@ -0,0 +1,178 @@
+import math
+import re
+from collections import Counter, defaultdict
+from typing import Iterable
+
+from src.models.schemas import GraphEdge, GraphNode, PostSchema
+
+MIN_NODES = 8
+MAX_NODES = 15
+MAX_NGRAM = 3
+DEFAULT_RELATIONSHIP = "relates to"
+EVENT_WORDS = frozenset("""
+war battle revolution election summit conference convention festival launch release crisis championship tournament
+olympic olympics cup outbreak pandemic treaty ceremony strike protest recession
+""".split())
+
+STOPWORDS = frozenset("""
+a about above after again against all almost also am an and any are aren't as at be because been before being
+below between both but by can can't cannot could couldn't did didn't do does doesn't doing don't down during each
+even ever every few for from further get gets getting got had hadn't has hasn't have haven't having he her here
+hers herself him himself his how however i if in into is isn't it it's its itself just least less let like lot lots
+made make makes many may me might more most much must my myself need needs never new no nor not now of off often on
+once one only or other others our ours ourselves out over own per really same say says see seem seems she should
+shouldn't so some still such than that that's the their theirs them themselves then there these they thing things
+this those though through thus to too under until up upon us use used uses using very via want was wasn't way ways
+we well were weren't what when where whether which while who whom whose why will with within without won't would
+wouldn't yes yet you your yours yourself yourselves anyone anything everyone everything someone something here's
+there's what's let's i'm i've i'd you're you've they're we're ago hours hour days day week weeks year years today
+actually maybe probably basically literally pretty quite rather sure thanks think know going lol edit post posts
+good great best better worse worst bad matter matters prefer help check checked claim claims try tried keep top
+""".split())
+
+_SENTENCE = re.compile(r"[.!?\n]+")
+_FRAGMENT = re.compile(r"[,;:()\[\]{}\"“”|/]+|\s[-–—]\s")
+_TOKEN = re.compile(r"[A-Za-z0-9][A-Za-z0-9'+#.-]*[A-Za-z0-9+#]|[A-Za-z]")
+_YEAR = re.compile(r"(1[5-9]|20)\d\d")
+
+
+def _post_text(post: PostSchema) -> str:
+    return "\n".join([post.title, post.body, *(c.body for c in post.comments)])
+
+
+def _sentences(text: str) -> list[list[str]]:
+    sentences = []
+    for sentence in _SENTENCE.split(text):
+        tokens = []
+        for fragment in _FRAGMENT.split(sentence):
+            tokens.extend(_TOKEN.findall(fragment))
+            tokens.append("")
+        if any(tokens):
+            sentences.append(tokens)
+    return sentences
+
+
+def _candidates(tokens: list[str]) -> Iterable[tuple[str, ...]]:
+    run: list[str] = []
+    for token in tokens + [""]:
+        if token and token.lower() not in STOPWORDS and not token.isdigit():
+            run.append(token)
+            continue
+        for start in range(len(run)):
+            for n in range(1, MAX_NGRAM + 1):
+                if start + n <= len(run):
+                    yield tuple(run[start:start + n])
+        run = []
+
+
+def _normalize(token: str) -> str:
+    token = token.lower()
+    if len(token) > 3 and token.endswith("s") and not token.endswith(("ss", "us", "is")):
+        return token[:-1]
+    return token
+
+
+def _label(forms: Counter) -> str:
+    surface = forms.most_common(1)[0][0]
+    return surface if any(c.isupper() for c in surface) else surface.title()
+
+
+def _is_name(surface: str) -> bool:
+    words = surface.split()
+    return 2 <= len(words) <= 3 and all(w.isalpha() and w[0].isupper() and w[1:].islower() for w in words)
+
+
+def _node_type(forms: Counter) -> str:
+    words = _label(forms).split()
+    if any(_YEAR.fullmatch(w) or _normalize(w) in EVENT_WORDS for w in words):
+        return "event"
+    if all(_is_name(surface) for surface in forms):
+        return "person"
+    if any(w.isupper() and len(w) > 1 or any(c.isdigit() for c in w) for w in words):
+        return "tool"
+    return "concept"
+
+
+def _slug(phrase: str) -> str:
+    return re.sub(r"[^a-z0-9]+", "-", phrase.lower()).strip("-")
+
+
+def _contains(outer: tuple[str, ...], inner: tuple[str, ...]) -> bool:
+    n = len(inner)
+    return any(outer[i:i + n] == inner for i in range(len(outer) - n + 1))
+
+
+def build_graph(posts: list[PostSchema], max_nodes: int = MAX_NODES) -> tuple[list[GraphNode], list[GraphEdge]]:
+    term_freq: Counter = Counter()
+    post_ids: dict[tuple[str, ...], set[str]] = defaultdict(set)
+    surface_forms: dict[tuple[str, ...], Counter] = defaultdict(Counter)
+    post_sentences: list[list[tuple[str, ...]]] = []
+
+    for post in posts:
+        sentences = []
+        for tokens in _sentences(_post_text(post)):
+            sentences.append(tuple(_normalize(t) for t in tokens))
+            for phrase in _candidates(tokens):
+                key = tuple(_normalize(t) for t in phrase)
+                if len(key) == 1 and len(key[0]) < 3:
+                    continue
+                term_freq[key] += 1
+                post_ids[key].add(post.id)
+                surface_forms[key][" ".join(phrase)] += 1
+        post_sentences.append(sentences)
+
+    def score(key: tuple[str, ...]) -> float:
+        return len(post_ids[key]) * (1 + math.log(term_freq[key])) * (1 + 0.5 * (len(key) - 1))
+
+    ranked = sorted(term_freq, key=score, reverse=True)
+    shared = [k for k in ranked if len(post_ids[k]) > 1]
+    if len(shared) >= MIN_NODES:
+        ranked = shared
+
+    selected: list[tuple[str, ...]] = []
+    for key in ranked:
+        if len(selected) >= max_nodes:
+            break
+        if any(_contains(s, key) or _contains(key, s) for s in selected):
+            continue
+        selected.append(key)
+
+    nodes = []
+    node_ids: dict[tuple[str, ...], str] = {}
+    for key in selected:
+        label = _label(surface_forms[key])
+        node_id = _slug(" ".join(key))
+        if not node_id or node_id in node_ids.values():
+            continue
+        node_ids[key] = node_id
+        nodes.append(GraphNode(
+            id=node_id,
+            label=label,
+            type=_node_type(surface_forms[key]),
+            post_ids=[p.id for p in posts if p.id in post_ids[key]],
+        ))
+
+    weights: Counter = Counter()
+    for sentences in post_sentences:
+        in_post: set[str] = set()
+        for sentence in sentences:
+            present = sorted(node_ids[k] for k in node_ids if _contains(sentence, k))
+            in_post.update(present)
+            for i, a in enumerate(present):
+                for b in present[i + 1:]:
+                    weights[(a, b)] += 2
+        ordered = sorted(in_post)
+        for i, a in enumerate(ordered):
+            for b in ordered[i + 1:]:
+                weights[(a, b)] += 1
+
+    edges = []
+    connected: set[str] = set()
+    for (a, b), weight in weights.most_common():
+        if len(edges) >= 2 * len(nodes):
+            break
+        if weight < 2 and a in connected and b in connected:
+            continue
+        edges.append(GraphEdge(source=a, target=b, relationship=DEFAULT_RELATIONSHIP))
+        connected.update((a, b))
+    return nodes, edges
@@ -0,0 +1,165 @@
+import asyncio
+import logging
+import os
+import time
+import uuid
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Optional
+
+logger = logging.getLogger(__name__)
+
+JOB_MAX_COUNT = int(os.getenv("JOB_MAX_COUNT", "1000"))
+JOB_TTL = float(os.getenv("JOB_TTL", "3600"))
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "4"))
+JOB_QUEUE_SIZE = int(os.getenv("JOB_QUEUE_SIZE", "100"))
+
+PENDING = "pending"
+RUNNING = "running"
+COMPLETED = "completed"
+FAILED = "failed"
+
+
+class QueueFull(Exception):
+    pass
+
+
+@dataclass
+class Job:
+    job_id: str
+    kind: str
+    status: str = PENDING
+    total: int = 0
+    completed: int = 0
+    items: list[dict] = field(default_factory=list)
+    result: Optional[dict] = None
+    error: Optional[str] = None
+    created_at: float = field(default_factory=time.time)
+    updated_at: float = field(default_factory=time.time)
+
+    @property
+    def finished(self) -> bool:
+        return self.status in (COMPLETED, FAILED)
+
+    def touch(self) -> None:
+        self.updated_at = time.time()
+
+    def to_dict(self) -> dict:
+        return {
+            "job_id": self.job_id,
+            "kind": self.kind,
+            "status": self.status,
+            "total": self.total,
+            "completed": self.completed,
+            "items": self.items,
+            "result": self.result,
+            "error": self.error,
+        }
+
+
+class JobRegistry:
+    def __init__(self, max_count: int = JOB_MAX_COUNT, ttl: float = JOB_TTL):
+        self.max_count = max_count
+        self.ttl = ttl
+        self._jobs: OrderedDict[str, Job] = OrderedDict()
+        self._tasks: set[asyncio.Task] = set()
+
+    def create(self, kind: str, total: int = 0) -> Job:
+        job = Job(job_id=str(uuid.uuid4()), kind=kind, total=total)
+        self._jobs[job.job_id] = job
+        self._evict()
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        return self._jobs.get(job_id)
+
+    def start(self, job: Job, work: Callable[[Job], Awaitable[Any]]) -> None:
+        task = asyncio.get_running_loop().create_task(self.run(job, work))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def run(self, job: Job, work: Callable[[Job], Awaitable[Any]]) -> None:
+        job.status = RUNNING
+        job.touch()
+        try:
+            await work(job)
+            if not job.finished:
+                job.status = COMPLETED
+        except Exception as e:
+            logger.error(f"Job {job.job_id} ({job.kind}) failed: {e}")
+            job.status = FAILED
+            job.error = str(e)
+        job.touch()
+
+    def _evict(self) -> None:
+        now = time.time()
+        for job_id, job in list(self._jobs.items()):
+            over_capacity = len(self._jobs) > self.max_count
+            expired = job.finished and now - job.updated_at > self.ttl
+            if over_capacity and job.finished or expired:
+                del self._jobs[job_id]
+
+    async def aclose(self) -> None:
+        for task in list(self._tasks):
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+
+    def __len__(self) -> int:
+        return len(self._jobs)
+
+
+class JobQueue(ABC):
+    @abstractmethod
+    def submit(self, kind: str, work: Callable[[Job], Awaitable[Any]]) -> Job:
+        pass
+
+    @abstractmethod
+    def depth(self) -> int:
+        pass
+
+    @abstractmethod
+    async def aclose(self) -> None:
+        pass
+
+
+class InProcessJobQueue(JobQueue):
+    def __init__(self, registry: JobRegistry, workers: int = JOB_WORKERS, max_size: int = JOB_QUEUE_SIZE):
+        self.registry = registry
+        self.workers = workers
+        self.max_size = max_size
+        self._queue: Optional[asyncio.Queue] = None
+        self._workers: list[asyncio.Task] = []
+
+    def submit(self, kind: str, work: Callable[[Job], Awaitable[Any]]) -> Job:
+        if self._queue is None:
+            self._queue = asyncio.Queue(self.max_size)
+            loop = asyncio.get_running_loop()
+            self._workers = [loop.create_task(self._worker()) for _ in range(self.workers)]
+        if self._queue.full():
+            raise QueueFull(f"Job queue is full ({self.max_size} pending)")
+        job = self.registry.create(kind)
+        self._queue.put_nowait((job, work))
+        return job
+
+    async def _worker(self) -> None:
+        while True:
+            job, work = await self._queue.get()
+            try:
+                await self.registry.run(job, work)
+            finally:
+                self._queue.task_done()
+
+    def depth(self) -> int:
+        return self._queue.qsize() if self._queue else 0
+
+    async def aclose(self) -> None:
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+        self._queue = None
+
+
+jobs = JobRegistry()
+job_queue: JobQueue = InProcessJobQueue(jobs)
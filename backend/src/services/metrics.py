@@ -0,0 +1,152 @@
+import bisect
+import time
+from contextlib import contextmanager
+from typing import Callable, Iterator, Optional
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576)
+
+
+def _format_labels(labelnames: tuple[str, ...], values: tuple[str, ...], extra: str = "") -> str:
+    parts = [f'{name}="{_escape(value)}"' for name, value in zip(labelnames, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+class Counter:
+    type = "counter"
+
+    def __init__(self, name: str, help: str, labelnames: tuple[str, ...] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = labelnames
+        self._values: dict[tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1, **labels: str) -> None:
+        key = tuple(str(labels[n]) for n in self.labelnames)
+        self._values[key] = self._values.get(key, 0) + amount
+
+    def samples(self) -> Iterator[str]:
+        for key, value in self._values.items():
+            yield f"{self.name}{_format_labels(self.labelnames, key)} {value}"
+
+
+class Gauge:
+    type = "gauge"
+
+    def __init__(self, name: str, help: str, fn: Callable[[], float], type: str = "gauge"):
+        self.name = name
+        self.help = help
+        self.fn = fn
+        self.type = type
+
+    def samples(self) -> Iterator[str]:
+        yield f"{self.name} {self.fn()}"
+
+
+class Histogram:
+    type = "histogram"
+
+    def __init__(self, name: str, help: str, labelnames: tuple[str, ...] = (), buckets: tuple[float, ...] = DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labelnames = labelnames
+        self.buckets = buckets
+        self._values: dict[tuple[str, ...], list] = {}
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = tuple(str(labels[n]) for n in self.labelnames)
+        state = self._values.get(key)
+        if state is None:
+            state = self._values[key] = [[0] * len(self.buckets), 0.0, 0]
+        index = bisect.bisect_left(self.buckets, value)
+        if index < len(self.buckets):
+            state[0][index] += 1
+        state[1] += value
+        state[2] += 1
+
+    def samples(self) -> Iterator[str]:
+        for key, (counts, total, count) in self._values.items():
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                labels = _format_labels(self.labelnames, key, 'le="%s"' % bound)
+                yield f"{self.name}_bucket{labels} {cumulative}"
+            labels = _format_labels(self.labelnames, key, 'le="+Inf"')
+            yield f"{self.name}_bucket{labels} {count}"
+            yield f"{self.name}_sum{_format_labels(self.labelnames, key)} {total}"
+            yield f"{self.name}_count{_format_labels(self.labelnames, key)} {count}"
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: list = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics:
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.type}")
+            lines.extend(metric.samples())
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+http_request_seconds = registry.register(Histogram(
+    "learned_http_request_seconds", "HTTP request latency by route", ("route", "method", "status"),
+))
+stage_seconds = registry.register(Histogram(
+    "learned_stage_seconds", "Latency of ingest and generate stages", ("route", "stage"),
+))
+llm_requests_total = registry.register(Counter(
+    "learned_llm_requests_total", "LLM provider calls by outcome", ("provider", "outcome"),
+))
+llm_fallbacks_total = registry.register(Counter(
+    "learned_llm_fallbacks_total", "Calls that moved on from a failed or slow provider", ("from_provider", "reason"),
+))
+llm_prompt_chars = registry.register(Histogram(
+    "learned_llm_prompt_chars", "Prompt size in characters", ("provider",), SIZE_BUCKETS,
+))
+llm_response_chars = registry.register(Histogram(
+    "learned_llm_response_chars", "Response size in characters", ("provider",), SIZE_BUCKETS,
+))
+llm_tokens_total = registry.register(Counter(
+    "learned_llm_tokens_total", "Token usage reported by providers", ("provider", "kind"),
+))
+source_reuse_total = registry.register(Counter(
+    "learned_source_reuse_total", "Ingests served by forking a session with the same source", ("kind", "match"),
+))
+coalesced_total = registry.register(Counter(
+    "learned_coalesced_requests_total", "Requests that attached to an identical in-flight call", ("scope",),
+))
+rate_limited_total = registry.register(Counter(
+    "learned_rate_limited_total", "Requests and provider calls held back by a token bucket", ("scope",),
+))
+
+
+@contextmanager
+def timed(stage: str, route: str = "") -> Iterator[None]:
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        stage_seconds.observe(time.perf_counter() - start, route=route, stage=stage)
+
+
+def record_tokens(provider: str, prompt_tokens: Optional[int], completion_tokens: Optional[int], cached_tokens: Optional[int] = None) -> None:
+    if cached_tokens:
+        llm_tokens_total.inc(cached_tokens, provider=provider, kind="cached")
+    if prompt_tokens:
+        llm_tokens_total.inc(prompt_tokens, provider=provider, kind="prompt")
+    if completion_tokens:
+        llm_tokens_total.inc(completion_tokens, provider=provider, kind="completion")
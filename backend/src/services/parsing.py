@@ -0,0 +1,218 @@
+import json
+import logging
+import re
+import uuid
+from typing import Any
+
+from pydantic import ValidationError
+
+from src.models.schemas import GraphEdge, PostSchema
+from src.services.metrics import timed
+
+logger = logging.getLogger(__name__)
+
+_FENCE = re.compile(r"```(?:json)?\s*(.*?)(?:```|$)", re.DOTALL)
+
+
+def strip_code_fences(text: str) -> str:
+    text = text.strip()
+    if "```" in text:
+        match = _FENCE.search(text)
+        if match:
+            return match.group(1).strip()
+    return text
+
+
+def strip_trailing_commas(text: str) -> str:
+    out = []
+    in_string = False
+    escape = False
+    i = 0
+    while i < len(text):
+        ch = text[i]
+        if in_string:
+            if escape:
+                escape = False
+            elif ch == "\\":
+                escape = True
+            elif ch == '"':
+                in_string = False
+        elif ch == '"':
+            in_string = True
+        elif ch == ",":
+            j = i + 1
+            while j < len(text) and text[j].isspace():
+                j += 1
+            if j < len(text) and text[j] in "}]":
+                i += 1
+                continue
+        out.append(ch)
+        i += 1
+    return "".join(out)
+
+
+def repair_json(text: str) -> str:
+    stack: list[str] = []
+    in_string = False
+    escape = False
+    boundary = (0, ())
+    for i, ch in enumerate(text):
+        if in_string:
+            if escape:
+                escape = False
+            elif ch == "\\":
+                escape = True
+            elif ch == '"':
+                in_string = False
+        elif ch == '"':
+            in_string = True
+        elif ch in "{[":
+            stack.append(ch)
+            boundary = (i + 1, tuple(stack))
+        elif ch in "}]":
+            if stack:
+                stack.pop()
+            boundary = (i + 1, tuple(stack))
+        elif ch == ",":
+            boundary = (i, tuple(stack))
+
+    if not stack and not in_string:
+        return strip_trailing_commas(text)
+    end, open_brackets = boundary
+    closing = "".join("}" if b == "{" else "]" for b in reversed(open_brackets))
+    return strip_trailing_commas(text[:end] + closing)
+
+
+def loads_lenient(text: str) -> Any:
+    text = strip_code_fences(text)
+    try:
+        return json.loads(text)
+    except json.JSONDecodeError as e:
+        start = min((i for i in (text.find("["), text.find("{")) if i >= 0), default=-1)
+        if start < 0:
+            raise
+        repaired = repair_json(text[start:])
+        logger.info(f"Repairing malformed JSON response: {e}")
+        return json.loads(repaired)
+
+
+def validate_json(text: str) -> None:
+    loads_lenient(text)
+
+
+class JsonArrayStreamParser:
+    def __init__(self):
+        self._buffer = ""
+        self._pos = 0
+        self._started = False
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._obj_start = -1
+
+    def feed(self, chunk: str) -> list:
+        self._buffer += chunk
+        objects = []
+        buf = self._buffer
+        i = self._pos
+        while i < len(buf):
+            ch = buf[i]
+            if not self._started:
+                if ch == "[":
+                    self._started = True
+                    self._depth = 1
+                i += 1
+                continue
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif ch == "\\":
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+            elif ch == '"':
+                self._in_string = True
+            elif ch in "{[":
+                if self._depth == 1 and ch == "{":
+                    self._obj_start = i
+                self._depth += 1
+            elif ch in "}]":
+                self._depth -= 1
+                if self._depth == 1 and ch == "}" and self._obj_start >= 0:
+                    raw = buf[self._obj_start:i + 1]
+                    try:
+                        objects.append(json.loads(raw))
+                    except json.JSONDecodeError:
+                        try:
+                            objects.append(json.loads(strip_trailing_commas(raw)))
+                        except json.JSONDecodeError:
+                            pass
+                    self._obj_start = -1
+            i += 1
+
+        if self._obj_start >= 0:
+            self._buffer = buf[self._obj_start:]
+            self._obj_start = 0
+        else:
+            self._buffer = ""
+        self._pos = len(self._buffer)
+        return objects
+
+
+def normalize_post(post: dict, platform: str) -> dict:
+    if "id" not in post or not post["id"]:
+        post["id"] = str(uuid.uuid4())
+    if "platform" not in post:
+        post["platform"] = platform
+    return post
+
+
+def _valid_posts(items: list, platform: str) -> list[dict]:
+    posts = []
+    for item in items:
+        if not isinstance(item, dict):
+            continue
+        try:
+            posts.append(PostSchema(**normalize_post(item, platform)).model_dump())
+        except ValidationError as e:
+            logger.warning(f"Dropping invalid post: {e.error_count()} errors")
+    return posts
+
+
+def parse_posts(text: str, platform: str) -> list[dict]:
+    try:
+        data = loads_lenient(text)
+    except json.JSONDecodeError:
+        data = JsonArrayStreamParser().feed(text)
+    if isinstance(data, dict):
+        data = data.get("posts", [])
+    if not isinstance(data, list):
+        return []
+    with timed("validate", "posts"):
+        return _valid_posts(data, platform)
+
+
+def parse_string_list(text: str) -> list[str]:
+    try:
+        data = loads_lenient(text)
+    except json.JSONDecodeError as e:
+        logger.warning(f"String list parse failed: {e}")
+        return []
+    if not isinstance(data, list):
+        return []
+    return [item for item in data if isinstance(item, str)]
+
+
+def parse_edge_labels(text: str) -> dict[tuple[str, str], str]:
+    data = loads_lenient(text)
+    if not isinstance(data, dict):
+        raise json.JSONDecodeError("Expected a JSON object", strip_code_fences(text), 0)
+    labels = {}
+    for item in data.get("edges") or []:
+        try:
+            edge = GraphEdge(**item)
+        except (TypeError, ValidationError):
+            continue
+        if edge.relationship.strip():
+            labels[(edge.source, edge.target)] = edge.relationship.strip()
+    return labels
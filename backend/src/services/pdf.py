@@ -0,0 +1,181 @@
+import asyncio
+import hashlib
+import json
+import logging
+import mmap
+import os
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Iterator, Optional
+
+from src.services.cache import MemoryCache, ResponseCache, build_cache
+
+logger = logging.getLogger(__name__)
+
+PDF_WORKERS = int(os.getenv("PDF_WORKERS", str(min(4, os.cpu_count() or 1))))
+PDF_PAGES_PER_TASK = int(os.getenv("PDF_PAGES_PER_TASK", "8"))
+PDF_READ_CHUNK = int(os.getenv("PDF_READ_CHUNK", str(1024 * 1024)))
+PDF_SPOOL_DIR = os.getenv("PDF_SPOOL_DIR") or None
+PDF_CACHE_PATH = os.getenv("PDF_CACHE_PATH", "pdf_cache.db")
+PDF_CACHE_TTL = float(os.getenv("PDF_CACHE_TTL", str(30 * 24 * 3600)))
+PDF_CACHE_MAX_ENTRIES = int(os.getenv("PDF_CACHE_MAX_ENTRIES", "128"))
+PDF_CACHE_MAX_BYTES = int(os.getenv("PDF_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+
+_executor: Optional[ProcessPoolExecutor] = None
+_page_cache: Optional[ResponseCache] = None
+
+
+class PdfTooLarge(Exception):
+    pass
+
+
+@dataclass
+class SpooledPdf:
+    path: str
+    sha256: str
+    size: int
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "SpooledPdf":
+        fd, path = tempfile.mkstemp(suffix=".pdf", dir=PDF_SPOOL_DIR)
+        with os.fdopen(fd, "wb") as out:
+            out.write(data)
+        return cls(path, hashlib.sha256(data).hexdigest(), len(data))
+
+    def close(self) -> None:
+        try:
+            os.unlink(self.path)
+        except FileNotFoundError:
+            pass
+
+    def __enter__(self) -> "SpooledPdf":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+async def spool_pdf(upload, max_bytes: int) -> SpooledPdf:
+    if (getattr(upload, "size", None) or 0) > max_bytes:
+        raise PdfTooLarge(f"PDF is larger than {max_bytes} bytes")
+    digest = hashlib.sha256()
+    size = 0
+    fd, path = tempfile.mkstemp(suffix=".pdf", dir=PDF_SPOOL_DIR)
+    try:
+        with os.fdopen(fd, "wb") as out:
+            while chunk := await upload.read(PDF_READ_CHUNK):
+                size += len(chunk)
+                if size > max_bytes:
+                    raise PdfTooLarge(f"PDF is larger than {max_bytes} bytes")
+                digest.update(chunk)
+                await asyncio.to_thread(out.write, chunk)
+    except BaseException:
+        os.unlink(path)
+        raise
+    return SpooledPdf(path, digest.hexdigest(), size)
+
+
+def page_cache() -> ResponseCache:
+    global _page_cache
+    if _page_cache is None:
+        memory = MemoryCache(PDF_CACHE_MAX_ENTRIES, PDF_CACHE_MAX_BYTES, PDF_CACHE_TTL)
+        _page_cache = build_cache(PDF_CACHE_PATH, memory, PDF_CACHE_TTL)
+    return _page_cache
+
+
+def _get_executor() -> ProcessPoolExecutor:
+    global _executor
+    if _executor is None:
+        _executor = ProcessPoolExecutor(max_workers=PDF_WORKERS)
+    return _executor
+
+
+def shutdown_executor() -> None:
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
+
+
+@contextmanager
+def _open_pdf(path: str) -> Iterator:
+    import pdfplumber
+
+    with open(path, "rb") as f:
+        try:
+            source = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except (ValueError, OSError):
+            source = None
+        try:
+            with pdfplumber.open(source if source is not None else f) as pdf:
+                yield pdf
+        finally:
+            if source is not None:
+                source.close()
+
+
+def _page_count(path: str) -> int:
+    with _open_pdf(path) as pdf:
+        return len(pdf.pages)
+
+
+def _extract_range(path: str, start: int, end: int, budget: int) -> list[str]:
+    text_parts = []
+    collected = 0
+    with _open_pdf(path) as pdf:
+        for page in pdf.pages[start:end]:
+            text = page.extract_text()
+            page.close()
+            if text:
+                text_parts.append(text)
+                collected += len(text)
+                if collected >= budget:
+                    break
+    return text_parts
+
+
+def _cached_pages(key: str, max_chars: int) -> Optional[tuple[list[str], int]]:
+    cached = page_cache().get(key)
+    if cached is None:
+        return None
+    entry = json.loads(cached)
+    if not entry["complete"] and sum(len(p) for p in entry["pages"]) < max_chars:
+        return None
+    return entry["pages"], entry["page_count"]
+
+
+async def extract_pdf_text(pdf: SpooledPdf, max_chars: int, use_cache: bool = True) -> tuple[str, int]:
+    key = f"pdf:{pdf.sha256}"
+    cached = _cached_pages(key, max_chars) if use_cache else None
+    if cached is not None:
+        pages, page_count = cached
+        logger.info(f"PDF page text cache hit for {pdf.sha256[:12]}")
+        return "\n\n".join(pages), page_count
+
+    loop = asyncio.get_running_loop()
+    executor = _get_executor()
+    page_count = await loop.run_in_executor(executor, _page_count, pdf.path)
+
+    ranges = [(start, min(start + PDF_PAGES_PER_TASK, page_count)) for start in range(0, page_count, PDF_PAGES_PER_TASK)]
+    text_parts: list[str] = []
+    collected = 0
+    complete = True
+    for i in range(0, len(ranges), PDF_WORKERS):
+        wave = ranges[i:i + PDF_WORKERS]
+        results = await asyncio.gather(*(
+            loop.run_in_executor(executor, _extract_range, pdf.path, start, end, max_chars - collected)
+            for start, end in wave
+        ))
+        for parts in results:
+            text_parts.extend(parts)
+            collected += sum(len(p) for p in parts)
+        if collected >= max_chars:
+            complete = False
+            logger.info(f"PDF extraction stopped after {wave[-1][1]} of {page_count} pages")
+            break
+
+    if use_cache:
+        page_cache().put(key, json.dumps({"page_count": page_count, "pages": text_parts, "complete": complete}))
+    return "\n\n".join(text_parts), page_count
@@ -0,0 +1,174 @@
+import hashlib
+import importlib.util
+import logging
+import os
+import threading
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Iterable, Optional, Union
+
+from src.services.chunking import CHARS_PER_TOKEN, estimate_tokens
+
+if TYPE_CHECKING:
+    from src.services.retrieval import Passage
+
+logger = logging.getLogger(__name__)
+
+SOURCE_TOKENS = int(os.getenv("PROMPT_SOURCE_TOKENS", "3000"))
+TOKENIZER_ENCODING = os.getenv("PROMPT_TOKENIZER", "cl100k_base")
+TIKTOKEN_AVAILABLE = bool(TOKENIZER_ENCODING) and importlib.util.find_spec("tiktoken") is not None
+TRUNCATION_NOTE = "\n\n[Document truncated for context]"
+
+_encoder = None
+_encoder_failed = False
+_encoder_lock = threading.Lock()
+
+FEED_SYSTEM_PROMPT = """You are a social feed generator. Generate the number of posts requested, based on the source material provided.
+
+Output format: JSON array of posts with this exact structure:
+[
+  {
+    "id": "unique-id",
+    "platform": "reddit" or "twitter",
+    "post_type": "question" | "creator" | "rant" | "listicle" | "poll",
+    "title": "post title",
+    "body": "post body text",
+    "author_handle": "u/snake_case for reddit, @CamelCase for twitter",
+    "upvotes": number between X-Y based on post_type,
+    "timestamp": "relative time like '2 hours ago' or '3 days ago'",
+    "citations": ["P1"],
+    "comments": [
+      {
+        "id": "comment-id",
+        "author_handle": "u/snake_case or @CamelCase",
+        "body": "comment text",
+        "upvotes": number,
+        "citations": ["optional passage label"]
+      }
+    ]
+  }
+]
+
+Post type diversity requirements:
+- At minimum: 2 question posts, 2 creator posts, 1 rant post, 1 listicle, 1 poll, rest randomized
+- When asked for fewer than 7 posts, use as many different post types as possible
+
+For question posts: Generate 3-5 comments with answer revealed progressively (first sets up context, subsequent deepen explanation)
+For listicle posts: title must start with a number e.g. "Top 5..." or "7 reasons..."; body must be a numbered list (1. item\n2. item\n...) of 4-7 concise items derived from source material
+For poll posts: title is a binary or multiple-choice question derived from the source material (e.g. "Which approach do you prefer: X or Y?"); body starts with a short hook sentence, then lists 2-4 options formatted as "A) option\nB) option\n..." or "• option\n• option\n..."; comments are users stating which option they prefer and briefly why
+For non-question, non-listicle, non-poll posts: Generate 2-3 comments with tangential insights or debate
+
+The source material is split into passages labelled [P1], [P2], ... Citation format: the labels of the passages a post or comment draws on, e.g. "P3". Only cite labels that appear in the source material.
+Upvote ranges: questions 500-5000, rants 1000-20000, listicles 2000-15000, creator posts 300-3000, polls 1000-10000
+
+Generate realistic author handles: Reddit u/snake_case, Twitter @CamelCase
+Generate plausible timestamps in relative format.
+
+Respond ONLY with valid JSON, no markdown, no explanation."""
+
+RECOMMENDATIONS_SYSTEM_PROMPT = """Based on the source material provided, generate 5 follow-up single-text-prompt suggestions for further exploration.
+
+The suggestions should be ready-to-use prompts that explore related topics, deeper dive into concepts, or tangential areas.
+
+Output as JSON array of strings, each being a complete prompt. Example:
+["How does analog audio signal chain work?", "What are the best practices for audio recording?", "Compare vinyl vs digital audio quality", "Best budget turntable recommendations", "How to maintain vinyl records properly"]
+
+Respond ONLY with valid JSON array, no explanation, no markdown."""
+
+GRAPH_REFINE_PROMPT = """Improve the relationship labels of a knowledge graph extracted from social posts.
+
+You get the nodes and the edges between them. For each edge, replace "relates to" with a short, specific relationship (e.g. "uses", "created by", "leads to", "part of", "contrasts with") that fits how the two nodes are discussed. Keep every source and target exactly as given.
+
+Output as JSON with this exact structure:
+{"edges": [{"source": "node-slug-1", "target": "node-slug-2", "relationship": "uses"}]}
+
+Respond ONLY with valid JSON, no markdown, no explanation."""
+
+
+@dataclass(frozen=True)
+class Prompt:
+    system: str
+    user: str
+    context: str = ""
+
+    @property
+    def content(self) -> str:
+        return f"{self.context}\n\n{self.user}" if self.context else self.user
+
+    @property
+    def text(self) -> str:
+        return f"{self.system}\n\n{self.content}" if self.system else self.content
+
+    @property
+    def prefix_key(self) -> str:
+        digest = hashlib.sha256()
+        for part in (self.system, self.context):
+            digest.update(part.encode("utf-8"))
+            digest.update(b"\0")
+        return digest.hexdigest()
+
+
+def as_prompt(prompt: Union[Prompt, str]) -> Prompt:
+    return prompt if isinstance(prompt, Prompt) else Prompt(system="", user=prompt)
+
+
+def load_tokenizer():
+    global _encoder, _encoder_failed
+    with _encoder_lock:
+        if _encoder is None and TIKTOKEN_AVAILABLE and not _encoder_failed:
+            try:
+                import tiktoken
+                _encoder = tiktoken.get_encoding(TOKENIZER_ENCODING)
+            except Exception as e:
+                _encoder_failed = True
+                logger.warning(f"Tokenizer unavailable, estimating tokens from length: {e}")
+    return _encoder
+
+
+def _tokenizer():
+    if _encoder is None and TIKTOKEN_AVAILABLE and not _encoder_failed:
+        return load_tokenizer()
+    return _encoder
+
+
+def count_tokens(text: str) -> int:
+    encoder = _tokenizer()
+    if encoder is None:
+        return estimate_tokens(text)
+    return len(encoder.encode(text, disallowed_special=()))
+
+
+def truncate_tokens(text: str, max_tokens: int = SOURCE_TOKENS) -> str:
+    if count_tokens(text) <= max_tokens:
+        return text
+    encoder = _tokenizer()
+    if encoder is None:
+        cut = text[:max_tokens * CHARS_PER_TOKEN]
+    else:
+        cut = encoder.decode(encoder.encode(text, disallowed_special=())[:max_tokens])
+    boundary = max(cut.rfind("\n\n"), cut.rfind(". "))
+    if boundary > len(cut) * 0.8:
+        cut = cut[:boundary + 1]
+    return cut.rstrip() + TRUNCATION_NOTE
+
+
+def passages_text(passages: Iterable["Passage"]) -> str:
+    return "\n\n".join(f"[{p.label}] {p.text}" for p in sorted(passages, key=lambda p: p.index))
+
+
+def feed_prompt(platform: str, source_text: str, post_count: int = 10, note: Optional[str] = None) -> Prompt:
+    user = f"Platform: {platform}\n\nGenerate exactly {post_count} posts."
+    if note:
+        user += f"\n\n{note}"
+    return Prompt(system=FEED_SYSTEM_PROMPT, context=f"Source material:\n{source_text}", user=user)
+
+
+def recommendations_prompt(source_text: str) -> Prompt:
+    return Prompt(
+        system=RECOMMENDATIONS_SYSTEM_PROMPT,
+        context=f"Source material:\n{source_text}",
+        user="Generate the 5 follow-up prompts.",
+    )
+
+
+def graph_refine_prompt(graph_text: str) -> Prompt:
+    return Prompt(system=GRAPH_REFINE_PROMPT, user=f"Graph:\n{graph_text}")
@@ -0,0 +1,70 @@
+import asyncio
+import os
+import time
+from collections import OrderedDict
+from typing import Optional
+
+CALLER_RATE = float(os.getenv("CALLER_RATE", "0"))
+CALLER_BURST = float(os.getenv("CALLER_BURST", "20"))
+CALLER_MAX_TRACKED = int(os.getenv("CALLER_MAX_TRACKED", "10000"))
+
+
+class TokenBucket:
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def try_acquire(self, tokens: float = 1.0) -> float:
+        self._refill()
+        if self.tokens >= tokens:
+            self.tokens -= tokens
+            return 0.0
+        return (tokens - self.tokens) / self.rate
+
+    async def acquire(self, tokens: float = 1.0) -> None:
+        while (wait := self.try_acquire(tokens)) > 0:
+            await asyncio.sleep(wait)
+
+
+class RateLimiter:
+    def __init__(self, rate: float = CALLER_RATE, burst: float = CALLER_BURST, max_tracked: int = CALLER_MAX_TRACKED):
+        self.rate = rate
+        self.burst = burst
+        self.max_tracked = max_tracked
+        self._buckets: OrderedDict[str, TokenBucket] = OrderedDict()
+
+    @property
+    def enabled(self) -> bool:
+        return self.rate > 0
+
+    def check(self, caller: str) -> float:
+        if not self.enabled:
+            return 0.0
+        bucket = self._buckets.get(caller)
+        if bucket is None:
+            bucket = self._buckets[caller] = TokenBucket(self.rate, max(1.0, self.burst))
+            while len(self._buckets) > self.max_tracked:
+                self._buckets.popitem(last=False)
+        self._buckets.move_to_end(caller)
+        return bucket.try_acquire()
+
+    def __len__(self) -> int:
+        return len(self._buckets)
+
+
+def provider_bucket(name: str) -> Optional[TokenBucket]:
+    rate = float(os.getenv(f"LLM_RATE_{name.upper()}", os.getenv("LLM_RATE", "0")))
+    if rate <= 0:
+        return None
+    burst = float(os.getenv(f"LLM_RATE_BURST_{name.upper()}", os.getenv("LLM_RATE_BURST", str(max(1.0, rate)))))
+    return TokenBucket(rate, burst)
+
+
+caller_limiter = RateLimiter()
@@ -0,0 +1,225 @@
+import asyncio
+import hashlib
+import logging
+import os
+import re
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Iterable, Optional
+
+import numpy as np
+
+from src.services.chunking import CHARS_PER_TOKEN
+from src.services.singleflight import SingleFlight
+
+logger = logging.getLogger(__name__)
+
+PASSAGE_TOKENS = int(os.getenv("RETRIEVAL_PASSAGE_TOKENS", "150"))
+RETRIEVAL_MAX_INDEXES = int(os.getenv("RETRIEVAL_MAX_INDEXES", "128"))
+KEY_TERMS = int(os.getenv("RETRIEVAL_KEY_TERMS", "16"))
+BM25_K1 = float(os.getenv("BM25_K1", "1.2"))
+BM25_B = float(os.getenv("BM25_B", "0.75"))
+
+STOPWORDS = frozenset("""
+a about after all also an and any are as at be because been but by can could did do does for from had has have
+he her his how i if in into is it its just more most my no not of on or our out over she so some such than that
+the their them then there these they this to too up us was we were what when which while who will with would you your
+""".split())
+
+_WORD = re.compile(r"[a-z0-9]+")
+_PARAGRAPH_BREAK = re.compile(r"\n\s*\n")
+_SENTENCE_BREAK = re.compile(r"(?<=[.!?])\s+")
+_LABEL = re.compile(r"\bP(\d+)\b")
+_OFFSETS = re.compile(r"\bchars (\d+)-(\d+)")
+
+
+@dataclass(frozen=True)
+class Passage:
+    index: int
+    start: int
+    end: int
+    text: str
+
+    @property
+    def label(self) -> str:
+        return f"P{self.index + 1}"
+
+    @property
+    def citation(self) -> str:
+        return f"Source: {self.label}, chars {self.start}-{self.end}"
+
+
+def tokenize(text: str) -> list[str]:
+    return [w for w in _WORD.findall(text.lower()) if len(w) > 1 and w not in STOPWORDS]
+
+
+def _spans(text: str, start: int, end: int, pattern: re.Pattern) -> list[tuple[int, int]]:
+    spans = []
+    for match in pattern.finditer(text, start, end):
+        spans.append((start, match.start()))
+        start = match.end()
+    spans.append((start, end))
+    stripped = []
+    for s, e in spans:
+        while s < e and text[s].isspace():
+            s += 1
+        while e > s and text[e - 1].isspace():
+            e -= 1
+        if s < e:
+            stripped.append((s, e))
+    return stripped
+
+
+def split_passages(text: str, max_tokens: int = PASSAGE_TOKENS) -> list[Passage]:
+    max_chars = max_tokens * CHARS_PER_TOKEN
+    pieces = []
+    for start, end in _spans(text, 0, len(text), _PARAGRAPH_BREAK):
+        if end - start <= max_chars:
+            pieces.append((start, end))
+            continue
+        for s, e in _spans(text, start, end, _SENTENCE_BREAK):
+            pieces.extend((i, min(e, i + max_chars)) for i in range(s, e, max_chars))
+
+    spans: list[tuple[int, int]] = []
+    for start, end in pieces:
+        if spans and end - spans[-1][0] <= max_chars:
+            spans[-1] = (spans[-1][0], end)
+        else:
+            spans.append((start, end))
+    return [Passage(i, s, e, text[s:e]) for i, (s, e) in enumerate(spans)]
+
+
+class PassageIndex:
+    def __init__(self, passages: list[Passage]):
+        self.passages = passages
+        self.vocabulary: dict[str, int] = {}
+        term_ids: list[int] = []
+        doc_ids: list[int] = []
+        for passage in passages:
+            tokens = tokenize(passage.text)
+            term_ids.extend(self.vocabulary.setdefault(t, len(self.vocabulary)) for t in tokens)
+            doc_ids.extend([passage.index] * len(tokens))
+
+        count = max(1, len(passages))
+        terms = np.asarray(term_ids, dtype=np.int64)
+        docs = np.asarray(doc_ids, dtype=np.int64)
+        keys, tf = np.unique(terms * count + docs, return_counts=True)
+        posting_terms = keys // count
+        self.posting_docs = (keys % count).astype(np.int32)
+        df = np.bincount(posting_terms, minlength=len(self.vocabulary))
+        self.indptr = np.concatenate(([0], np.cumsum(df)))
+        idf = np.log1p((len(passages) - df + 0.5) / (df + 0.5))
+        doc_len = np.bincount(docs, minlength=count).astype(np.float64)
+        norm = BM25_K1 * (1 - BM25_B + BM25_B * doc_len / max(1.0, doc_len.mean()))
+        self.weights = (idf[posting_terms] * tf * (BM25_K1 + 1) / (tf + norm[self.posting_docs])).astype(np.float32)
+
+        salience = np.add.reduceat(self.weights, self.indptr[:-1]) if len(self.weights) else np.zeros(0)
+        key_terms = np.argsort(-salience, kind="stable")[:KEY_TERMS]
+        self.central = np.argsort(-self._scores(key_terms), kind="stable")[:len(passages)]
+
+    @classmethod
+    def from_text(cls, text: str, max_tokens: int = PASSAGE_TOKENS) -> "PassageIndex":
+        return cls(split_passages(text, max_tokens))
+
+    def _term_ids(self, text: str) -> list[int]:
+        return sorted({self.vocabulary[t] for t in tokenize(text) if t in self.vocabulary})
+
+    def _scores(self, term_ids: Iterable[int]) -> np.ndarray:
+        scores = np.zeros(max(1, len(self.passages)), dtype=np.float32)
+        for term in term_ids:
+            start, end = self.indptr[term], self.indptr[term + 1]
+            scores[self.posting_docs[start:end]] += self.weights[start:end]
+        return scores
+
+    def search(self, query: str, k: int, exclude: Iterable[int] = ()) -> list[Passage]:
+        if not self.passages:
+            return []
+        excluded = set(exclude)
+        scores = self._scores(self._term_ids(query))
+        if excluded:
+            scores[list(excluded)] = 0
+        picked = [int(i) for i in np.argsort(-scores, kind="stable")[:k] if scores[i] > 0]
+        for i in self.central:
+            if len(picked) >= k:
+                break
+            if int(i) not in excluded and int(i) not in picked:
+                picked.append(int(i))
+        return [self.passages[i] for i in picked]
+
+    def best_match(self, text: str) -> Optional[Passage]:
+        if not self.passages:
+            return None
+        scores = self._scores(self._term_ids(text))
+        best = int(np.argmax(scores))
+        return self.passages[best] if scores[best] > 0 else None
+
+    def cited(self, citations: Iterable[str]) -> list[Passage]:
+        found: dict[int, Passage] = {}
+        for citation in citations:
+            for match in _LABEL.finditer(citation):
+                number = int(match.group(1))
+                if 1 <= number <= len(self.passages):
+                    found.setdefault(number - 1, self.passages[number - 1])
+        return list(found.values())
+
+    def cite(self, post: dict) -> dict:
+        passages = self.cited(post.get("citations") or [])
+        if not passages:
+            best = self.best_match(f"{post.get('title', '')}\n{post.get('body', '')}")
+            passages = [best] if best else []
+        post["citations"] = [p.citation for p in passages]
+        for comment in post.get("comments") or []:
+            if isinstance(comment, dict):
+                comment["citations"] = [p.citation for p in self.cited(comment.get("citations") or [])]
+        return post
+
+    def _rebased(self, citations: Iterable[str], source: str) -> list[str]:
+        found: dict[int, Passage] = {}
+        for citation in citations:
+            match = _OFFSETS.search(citation)
+            passage = self.best_match(source[int(match.group(1)):int(match.group(2))]) if match else None
+            if passage:
+                found.setdefault(passage.index, passage)
+        return [p.citation for p in found.values()]
+
+    def rebase(self, post: dict, source: str) -> dict:
+        post["citations"] = self._rebased(post.get("citations") or [], source)
+        for comment in post.get("comments") or []:
+            if isinstance(comment, dict):
+                comment["citations"] = self._rebased(comment.get("citations") or [], source)
+        return self.cite(post)
+
+
+class PassageIndexes:
+    def __init__(self, max_entries: int = RETRIEVAL_MAX_INDEXES):
+        self.max_entries = max_entries
+        self._indexes: OrderedDict[str, PassageIndex] = OrderedDict()
+        self._flights = SingleFlight("retrieval")
+        self._warming: set[asyncio.Future] = set()
+
+    async def get(self, text: str) -> PassageIndex:
+        key = hashlib.sha256(text.encode("utf-8")).hexdigest()
+        index = self._indexes.get(key)
+        if index is None:
+            index = await self._flights.do(key, lambda: asyncio.to_thread(PassageIndex.from_text, text))
+            self._indexes[key] = index
+            while len(self._indexes) > self.max_entries:
+                self._indexes.popitem(last=False)
+        self._indexes.move_to_end(key)
+        return index
+
+    def warm(self, text: str) -> None:
+        task = asyncio.ensure_future(self.get(text))
+        self._warming.add(task)
+        task.add_done_callback(self._warmed)
+
+    def _warmed(self, task: asyncio.Future) -> None:
+        self._warming.discard(task)
+        if not task.cancelled() and task.exception():
+            logger.warning(f"Passage index build failed: {task.exception()}")
+
+    def __len__(self) -> int:
+        return len(self._indexes)
+
+
+passage_indexes = PassageIndexes()
@@ -1,29 +1,536 @@
-from typing import Dict
+from abc import ABC, abstractmethod
+from collections import OrderedDict, defaultdict
+from contextlib import contextmanager
+from typing import Optional
 from datetime import datetime
+import itertools
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
 from src.models.schemas import Session, PostSchema
+from src.services.fingerprint import bands, content_hash, hamming, simhash
 
+logger = logging.getLogger(__name__)
 
-sessions: Dict[str, Session] = {}
+SESSION_STORE = os.getenv("SESSION_STORE", "memory")
+SESSION_DB_PATH = os.getenv("SESSION_DB_PATH", "sessions.db")
+SESSION_MAX_COUNT = int(os.getenv("SESSION_MAX_COUNT", "1000"))
+SESSION_MAX_BYTES = int(os.getenv("SESSION_MAX_BYTES", str(256 * 1024 * 1024)))
+SESSION_IDLE_TTL = float(os.getenv("SESSION_IDLE_TTL", str(6 * 3600)))
+SOURCE_DEDUP = os.getenv("SOURCE_DEDUP", "1") != "0"
+SOURCE_INDEX_MAX_ENTRIES = int(os.getenv("SOURCE_INDEX_MAX_ENTRIES", "10000"))
+SIMHASH_MAX_DISTANCE = int(os.getenv("SIMHASH_MAX_DISTANCE", "3"))
+WRITE_ORDER_MAX_SESSIONS = int(os.getenv("WRITE_ORDER_MAX_SESSIONS", "10000"))
+SESSION_PRUNE_EVERY = int(os.getenv("SESSION_PRUNE_EVERY", "100"))
 
 
-def create_session(session_id: str, source_text: str, platform: str) -> Session:
+class SessionStore(ABC):
+    @abstractmethod
+    def get(self, session_id: str, touch: bool = True) -> Optional[Session]:
+        pass
+
+    @abstractmethod
+    def put(self, session: Session) -> None:
+        pass
+
+    @abstractmethod
+    def delete(self, session_id: str) -> None:
+        pass
+
+    @abstractmethod
+    def __len__(self) -> int:
+        pass
+
+    @abstractmethod
+    def post_count(self, session_id: str) -> int:
+        pass
+
+    @abstractmethod
+    def post_json(self, session_id: str, start: int = 0, end: Optional[int] = None) -> list[bytes]:
+        pass
+
+    @abstractmethod
+    def set_posts(self, session_id: str, posts: list[bytes]) -> None:
+        pass
+
+    @abstractmethod
+    def append_posts(self, session_id: str, posts: list[bytes]) -> int:
+        pass
+
+    @abstractmethod
+    def copy_posts(self, source_id: str, target_id: str) -> None:
+        pass
+
+
+class MemorySessionStore(SessionStore):
+    def __init__(self, max_count: int = SESSION_MAX_COUNT, max_bytes: int = SESSION_MAX_BYTES, idle_ttl: float = SESSION_IDLE_TTL):
+        self.max_count = max_count
+        self.max_bytes = max_bytes
+        self.idle_ttl = idle_ttl
+        self.total_bytes = 0
+        self._sessions: OrderedDict[str, tuple[Session, int, float]] = OrderedDict()
+        self._posts: dict[str, list[bytes]] = {}
+
+    def get(self, session_id: str, touch: bool = True) -> Optional[Session]:
+        item = self._sessions.get(session_id)
+        if item is None:
+            return None
+        session, size, last_access = item
+        now = time.time()
+        if now - last_access > self.idle_ttl:
+            self.delete(session_id)
+            return None
+        if touch:
+            self._sessions[session_id] = (session, size, now)
+            self._sessions.move_to_end(session_id)
+        return session
+
+    def put(self, session: Session) -> None:
+        if session.generated_posts:
+            session = session.model_copy(update={"generated_posts": []})
+        posts = self._posts.pop(session.session_id, [])
+        self.delete(session.session_id)
+        size = len(session.model_dump_json()) + sum(len(p) for p in posts)
+        self._sessions[session.session_id] = (session, size, time.time())
+        self._posts[session.session_id] = posts
+        self.total_bytes += size
+        self._evict()
+
+    def delete(self, session_id: str) -> None:
+        item = self._sessions.pop(session_id, None)
+        self._posts.pop(session_id, None)
+        if item:
+            self.total_bytes -= item[1]
+
+    def post_count(self, session_id: str) -> int:
+        return len(self._posts.get(session_id, ()))
+
+    def post_json(self, session_id: str, start: int = 0, end: Optional[int] = None) -> list[bytes]:
+        return self._posts.get(session_id, [])[start:end]
+
+    def set_posts(self, session_id: str, posts: list[bytes]) -> None:
+        self._write_posts(session_id, posts, replace=True)
+
+    def append_posts(self, session_id: str, posts: list[bytes]) -> int:
+        return self._write_posts(session_id, posts, replace=False)
+
+    def copy_posts(self, source_id: str, target_id: str) -> None:
+        self._write_posts(target_id, list(self._posts.get(source_id, ())), replace=True)
+
+    def _write_posts(self, session_id: str, posts: list[bytes], replace: bool) -> int:
+        if self.get(session_id) is None:
+            return 0
+        session, size, last_access = self._sessions[session_id]
+        stored = self._posts[session_id]
+        delta = sum(len(p) for p in posts) - (sum(len(p) for p in stored) if replace else 0)
+        if replace:
+            stored[:] = posts
+        else:
+            stored.extend(posts)
+        self._sessions[session_id] = (session, size + delta, last_access)
+        self.total_bytes += delta
+        self._evict()
+        return len(stored)
+
+    def _evict(self) -> None:
+        now = time.time()
+        while self._sessions:
+            oldest_id, (_, _, last_access) = next(iter(self._sessions.items()))
+            over_budget = len(self._sessions) > self.max_count or self.total_bytes > self.max_bytes
+            if not over_budget and now - last_access <= self.idle_ttl:
+                break
+            self.delete(oldest_id)
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+
+class SqliteSessionStore(SessionStore):
+    def __init__(
+        self,
+        path: str = SESSION_DB_PATH,
+        max_count: int = SESSION_MAX_COUNT,
+        max_bytes: int = SESSION_MAX_BYTES,
+        idle_ttl: float = SESSION_IDLE_TTL,
+        prune_every: int = SESSION_PRUNE_EVERY,
+    ):
+        self.max_count = max_count
+        self.max_bytes = max_bytes
+        self.idle_ttl = idle_ttl
+        self.prune_every = max(1, prune_every)
+        self.total_bytes = 0
+        self._writes = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS sessions ("
+            "session_id TEXT PRIMARY KEY, data TEXT NOT NULL, last_access REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS sessions_last_access ON sessions (last_access)")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS session_posts ("
+            "session_id TEXT NOT NULL, position INTEGER NOT NULL, data BLOB NOT NULL, "
+            "PRIMARY KEY (session_id, position))"
+        )
+        self.prune()
+
+    def get(self, session_id: str, touch: bool = True) -> Optional[Session]:
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT data, last_access FROM sessions WHERE session_id = ?", (session_id,)
+            ).fetchone()
+            if row is None:
+                return None
+            data, last_access = row
+            if now - last_access > self.idle_ttl:
+                self._conn.execute("DELETE FROM sessions WHERE session_id = ?", (session_id,))
+                self._conn.execute("DELETE FROM session_posts WHERE session_id = ?", (session_id,))
+                return None
+            if touch:
+                self._conn.execute("UPDATE sessions SET last_access = ? WHERE session_id = ?", (now, session_id))
+        return Session.model_validate_json(data)
+
+    def put(self, session: Session) -> None:
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO sessions (session_id, data, last_access) VALUES (?, ?, ?)",
+                (session.session_id, session.model_dump_json(exclude={"generated_posts"}), time.time()),
+            )
+        self._wrote()
+
+    def delete(self, session_id: str) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM sessions WHERE session_id = ?", (session_id,))
+            self._conn.execute("DELETE FROM session_posts WHERE session_id = ?", (session_id,))
+
+    def post_count(self, session_id: str) -> int:
+        with self._lock:
+            return self._conn.execute(
+                "SELECT COUNT(*) FROM session_posts WHERE session_id = ?", (session_id,)
+            ).fetchone()[0]
+
+    def post_json(self, session_id: str, start: int = 0, end: Optional[int] = None) -> list[bytes]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT data FROM session_posts WHERE session_id = ? AND position >= ? AND position < ? ORDER BY position",
+                (session_id, start, end if end is not None else 2 ** 62),
+            ).fetchall()
+        return [row[0] if isinstance(row[0], bytes) else row[0].encode("utf-8") for row in rows]
+
+    def set_posts(self, session_id: str, posts: list[bytes]) -> None:
+        with self._lock, self._transaction():
+            self._conn.execute("DELETE FROM session_posts WHERE session_id = ?", (session_id,))
+            self._insert_posts(session_id, 0, posts)
+        self._wrote()
+
+    def append_posts(self, session_id: str, posts: list[bytes]) -> int:
+        with self._lock, self._transaction():
+            if self._conn.execute("SELECT 1 FROM sessions WHERE session_id = ?", (session_id,)).fetchone() is None:
+                return 0
+            count = self._conn.execute(
+                "SELECT COUNT(*) FROM session_posts WHERE session_id = ?", (session_id,)
+            ).fetchone()[0]
+            self._insert_posts(session_id, count, posts)
+        self._wrote()
+        return count + len(posts)
+
+    def copy_posts(self, source_id: str, target_id: str) -> None:
+        with self._lock, self._transaction():
+            self._conn.execute("DELETE FROM session_posts WHERE session_id = ?", (target_id,))
+            self._conn.execute(
+                "INSERT INTO session_posts (session_id, position, data) "
+                "SELECT ?, position, data FROM session_posts WHERE session_id = ?",
+                (target_id, source_id),
+            )
+        self._wrote()
+
+    def _insert_posts(self, session_id: str, offset: int, posts: list[bytes]) -> None:
+        self._conn.executemany(
+            "INSERT INTO session_posts (session_id, position, data) VALUES (?, ?, ?)",
+            [(session_id, offset + i, p) for i, p in enumerate(posts)],
+        )
+        self._conn.execute("UPDATE sessions SET last_access = ? WHERE session_id = ?", (time.time(), session_id))
+
+    @contextmanager
+    def _transaction(self):
+        self._conn.execute("BEGIN")
+        try:
+            yield
+        except BaseException:
+            self._conn.execute("ROLLBACK")
+            raise
+        self._conn.execute("COMMIT")
+
+    def purge_expired(self) -> None:
+        cutoff = time.time() - self.idle_ttl
+        with self._lock:
+            self._conn.execute(
+                "DELETE FROM session_posts WHERE session_id IN (SELECT session_id FROM sessions WHERE last_access < ?)",
+                (cutoff,),
+            )
+            self._conn.execute("DELETE FROM sessions WHERE last_access < ?", (cutoff,))
+
+    def prune(self) -> None:
+        self.purge_expired()
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT s.session_id, length(s.data) + COALESCE(SUM(length(p.data)), 0) FROM sessions s "
+                "LEFT JOIN session_posts p ON p.session_id = s.session_id GROUP BY s.session_id ORDER BY s.last_access"
+            ).fetchall()
+        count = len(rows)
+        total = sum(size for _, size in rows)
+        for session_id, size in rows:
+            if count <= self.max_count and total <= self.max_bytes:
+                break
+            self.delete(session_id)
+            count -= 1
+            total -= size
+        self.total_bytes = total
+
+    def _wrote(self) -> None:
+        self._writes += 1
+        if self._writes % self.prune_every == 0:
+            self.prune()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM sessions").fetchone()[0]
+
+
+def _build_store() -> SessionStore:
+    if SESSION_STORE == "sqlite":
+        logger.info(f"Using SQLite session store at {SESSION_DB_PATH}")
+        return SqliteSessionStore()
+    return MemorySessionStore()
+
+
+class SourceIndex:
+    def __init__(self, max_entries: int = SOURCE_INDEX_MAX_ENTRIES, max_distance: int = SIMHASH_MAX_DISTANCE):
+        self.max_entries = max_entries
+        self.max_distance = max_distance
+        self.band_count = max_distance + 1
+        self._keys: OrderedDict[str, str] = OrderedDict()
+        self._simhashes: OrderedDict[str, int] = OrderedDict()
+        self._bands: dict[tuple[int, int], set[str]] = defaultdict(set)
+
+    def add(self, session_id: str, keys: list[str], text: Optional[str] = None) -> None:
+        for key in keys:
+            self._keys[key] = session_id
+            self._keys.move_to_end(key)
+        if text:
+            self._drop_simhash(session_id)
+            value = simhash(text)
+            self._simhashes[session_id] = value
+            for band in bands(value, self.band_count):
+                self._bands[band].add(session_id)
+        while len(self._keys) > self.max_entries:
+            self._keys.popitem(last=False)
+        while len(self._simhashes) > self.max_entries:
+            self._drop_simhash(next(iter(self._simhashes)))
+
+    def exact(self, key: str) -> Optional[str]:
+        return self._keys.get(key)
+
+    def similar(self, text: str) -> list[str]:
+        value = simhash(text)
+        candidates: set[str] = set()
+        for band in bands(value, self.band_count):
+            candidates.update(self._bands.get(band, ()))
+        ranked = sorted((hamming(value, self._simhashes[c]), c) for c in candidates)
+        return [session_id for distance, session_id in ranked if distance <= self.max_distance]
+
+    def remove(self, session_id: str) -> None:
+        for key in [k for k, v in self._keys.items() if v == session_id]:
+            del self._keys[key]
+        self._drop_simhash(session_id)
+
+    def _drop_simhash(self, session_id: str) -> None:
+        value = self._simhashes.pop(session_id, None)
+        if value is None:
+            return
+        for band in bands(value, self.band_count):
+            members = self._bands.get(band)
+            if members:
+                members.discard(session_id)
+                if not members:
+                    del self._bands[band]
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+
+class WriteOrder:
+    def __init__(self, max_sessions: int = WRITE_ORDER_MAX_SESSIONS):
+        self.max_sessions = max_sessions
+        self._tickets = itertools.count(1)
+        self._applied: OrderedDict[str, dict[str, int]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def begin(self) -> int:
+        return next(self._tickets)
+
+    def accept(self, session_id: str, ticket: int, fields: dict) -> dict:
+        with self._lock:
+            applied = self._applied.setdefault(session_id, {})
+            self._applied.move_to_end(session_id)
+            while len(self._applied) > self.max_sessions:
+                self._applied.popitem(last=False)
+            writes = [name for name, value in fields.items() if value is not None]
+            stale = [name for name in writes if applied.get(name, 0) > ticket]
+            if stale:
+                logger.info(f"Skipping stale write of {', '.join(stale)} for session {session_id}")
+            if writes and len(stale) == len(writes):
+                return {}
+            for name in fields:
+                if name not in stale:
+                    applied[name] = max(applied.get(name, 0), ticket)
+            return {name: value for name, value in fields.items() if name not in stale}
+
+    def stale(self, session_id: str, ticket: int, name: str) -> bool:
+        with self._lock:
+            return self._applied.get(session_id, {}).get(name, 0) > ticket
+
+
+store: SessionStore = _build_store()
+source_index = SourceIndex()
+write_order = WriteOrder()
+
+
+def _encode_post(post) -> bytes:
+    if isinstance(post, PostSchema):
+        return post.model_dump_json().encode("utf-8")
+    return json.dumps(post, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def create_session(session_id: str, source_text: str, platform: str, full_text: Optional[str] = None, page_count: Optional[int] = None) -> Session:
     session = Session(
         session_id=session_id,
         source_text=source_text,
         platform=platform,
+        full_text=full_text if full_text and full_text != source_text else None,
+        page_count=page_count,
         generated_posts=[],
         created_at=datetime.now()
     )
-    sessions[session_id] = session
+    store.put(session)
+    return session
+
+
+def fork_session(
+    parent: Session,
+    session_id: str,
+    platform: str,
+    source_text: Optional[str] = None,
+    full_text: Optional[str] = None,
+    page_count: Optional[int] = None,
+) -> Session:
+    updates = {"session_id": session_id, "platform": platform, "created_at": datetime.now()}
+    if page_count is not None:
+        updates["page_count"] = page_count
+    if source_text is not None:
+        updates["source_text"] = source_text
+        updates["full_text"] = full_text if full_text and full_text != source_text else None
+    same_platform = parent.platform == platform
+    if not same_platform:
+        updates.update(knowledge_graph=None)
+    session = parent.model_copy(update=updates)
+    store.put(session)
+    if same_platform:
+        store.copy_posts(parent.session_id, session_id)
     return session
 
 
+def text_key(text: str) -> str:
+    return f"text:{content_hash(text)}"
+
+
+def find_source(keys: list[str], text: Optional[str] = None) -> tuple[Optional[Session], bool]:
+    if not SOURCE_DEDUP:
+        return None, False
+    for key in keys:
+        session_id = source_index.exact(key)
+        if session_id:
+            session = store.get(session_id, touch=False)
+            if session:
+                return session, True
+            source_index.remove(session_id)
+    if text:
+        for session_id in source_index.similar(text):
+            session = store.get(session_id, touch=False)
+            if session:
+                return session, False
+            source_index.remove(session_id)
+    return None, False
+
+
+def index_source(session_id: str, keys: list[str], text: Optional[str] = None) -> None:
+    if SOURCE_DEDUP:
+        source_index.add(session_id, keys, text)
+
+
 def get_session(session_id: str) -> Session | None:
-    return sessions.get(session_id)
+    return store.get(session_id)
+
+
+def begin_write() -> int:
+    return write_order.begin()
+
+
+def update_session(session_id: str, ticket: Optional[int] = None, **fields) -> None:
+    if ticket is not None:
+        fields = write_order.accept(session_id, ticket, fields)
+        if not fields:
+            return
+    posts = fields.pop("generated_posts", None)
+    session = store.get(session_id)
+    if session:
+        if posts is not None:
+            fields["posts_version"] = ticket or begin_write()
+        for name, value in fields.items():
+            setattr(session, name, value)
+        store.put(session)
+        if posts is not None:
+            store.set_posts(session_id, [_encode_post(p) for p in posts])
+
+
+def count_session_posts(session_id: str) -> int:
+    return store.post_count(session_id)
+
+
+def get_session_post_json(session_id: str, start: int = 0, end: Optional[int] = None) -> list[bytes]:
+    return store.post_json(session_id, start, end)
+
+
+def get_session_posts(session_id: str, start: int = 0, end: Optional[int] = None) -> list[PostSchema]:
+    return [PostSchema.model_validate_json(p) for p in store.post_json(session_id, start, end)]
+
+
+def append_session_posts(session_id: str, posts: list, ticket: Optional[int] = None) -> int:
+    if ticket is not None and write_order.stale(session_id, ticket, "generated_posts"):
+        logger.info(f"Skipping append to posts rewritten since page started for session {session_id}")
+        return store.post_count(session_id)
+    session = store.get(session_id)
+    if session is None:
+        return 0
+    session.posts_version = begin_write()
+    store.put(session)
+    return store.append_posts(session_id, [_encode_post(p) for p in posts])
+
+
+def update_session_posts(session_id: str, posts: list, ticket: Optional[int] = None) -> None:
+    update_session(session_id, ticket, generated_posts=posts, knowledge_graph=None)
 
 
-def update_session_posts(session_id: str, posts: list) -> None:
-    if session_id in sessions:
-        sessions[session_id].generated_posts = [
-            PostSchema(**p) if isinstance(p, dict) else p for p in posts
-        ]
+def update_session_graph(session_id: str, graph, posts_version: int, ticket: Optional[int] = None) -> bool:
+    session = store.get(session_id)
+    if session is None or session.posts_version != posts_version:
+        logger.info(f"Skipping knowledge graph built from outdated posts for session {session_id}")
+        return False
+    update_session(session_id, ticket, knowledge_graph=graph, graph_posts_version=posts_version)
+    return True
@@ -0,0 +1,37 @@
+import asyncio
+import hashlib
+from typing import Any, Awaitable, Callable, Hashable
+
+from src.services.metrics import coalesced_total
+
+
+class SingleFlight:
+    def __init__(self, scope: str):
+        self.scope = scope
+        self._calls: dict[Hashable, asyncio.Future] = {}
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        call = self._calls.get(key)
+        if call is None:
+            call = self._calls[key] = asyncio.ensure_future(fn())
+            call.add_done_callback(lambda done: self._finish(key, done))
+        else:
+            coalesced_total.inc(scope=self.scope)
+        return await asyncio.shield(call)
+
+    def _finish(self, key: Hashable, call: asyncio.Future) -> None:
+        if self._calls.get(key) is call:
+            del self._calls[key]
+        if not call.cancelled():
+            call.exception()
+
+    def __len__(self) -> int:
+        return len(self._calls)
+
+
+def flight_key(*parts: Any) -> str:
+    digest = hashlib.sha256()
+    for part in parts:
+        digest.update(str(part).encode("utf-8"))
+        digest.update(b"\0")
+    return digest.hexdigest()
@@ -0,0 +1,36 @@
+from src.services.cache import MemoryCache, build_cache
+
+
+def test_lookup_counts_one_miss_across_candidate_keys():
+    cache = build_cache(path=None)
+    assert cache.lookup(["a", "b", "c"]) is None
+    assert (cache.hits, cache.misses) == (0, 1)
+
+
+def test_lookup_returns_first_cached_key_and_counts_entry_hits():
+    cache = build_cache(path=None)
+    cache.put("b", "value")
+    for served in (1, 2):
+        key, entry = cache.lookup(["a", "b"])
+        assert (key, entry.value, entry.hits) == ("b", "value", served)
+    assert (cache.hits, cache.misses) == (2, 0)
+    assert cache.memory.reused() == 1
+
+
+def test_disk_hits_are_promoted_with_their_hit_count(tmp_path):
+    path = str(tmp_path / "cache.db")
+    build_cache(path).put("k", "v")
+    warm = build_cache(path)
+    assert warm.get("k") == "v"
+    assert warm.memory.get("k").hits == 2
+
+
+def test_memory_cache_evicts_by_entries_and_bytes():
+    cache = MemoryCache(max_entries=2, max_bytes=10)
+    cache.put("a", "12345")
+    cache.put("b", "12345")
+    cache.put("c", "1")
+    assert cache.get("a") is None
+    assert cache.total_bytes == 6
+    cache.put("big", "x" * 11)
+    assert cache.get("big") is None
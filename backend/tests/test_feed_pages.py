@@ -0,0 +1,33 @@
+import asyncio
+
+from src.models.schemas import Session
+from src.routes import generate
+
+
+def test_page_tasks_are_shared_only_for_identical_requests(monkeypatch):
+    calls = []
+
+    async def append(session, platform, page_size, gemini_key, minimax_key, use_cache):
+        calls.append((platform, page_size, gemini_key, use_cache))
+        await asyncio.sleep(0.01)
+        return len(calls)
+
+    monkeypatch.setattr(generate, "_append_feed_page", append)
+    session = Session(session_id="s", source_text="text", platform="reddit")
+
+    async def run():
+        first = generate._extend_feed(session, "reddit", 3, None, None, True)
+        same = generate._extend_feed(session, "reddit", 3, None, None, True)
+        others = [
+            generate._extend_feed(session, "linkedin", 3, None, None, True),
+            generate._extend_feed(session, "reddit", 5, None, None, True),
+            generate._extend_feed(session, "reddit", 3, "key", None, True),
+            generate._extend_feed(session, "reddit", 3, None, None, False),
+        ]
+        assert same is first
+        assert len({id(task) for task in [first, *others]}) == 5
+        await asyncio.gather(first, *others)
+
+    asyncio.run(run())
+    assert len(calls) == 5
+    assert generate._page_tasks == {}
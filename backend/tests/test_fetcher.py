@@ -0,0 +1,32 @@
+import asyncio
+
+import httpx
+
+from src.services.fetcher import Fetcher
+
+
+def fetch(body: bytes, max_bytes: int):
+    fetcher = Fetcher(max_bytes=max_bytes)
+    fetcher._client = httpx.AsyncClient(transport=httpx.MockTransport(
+        lambda request: httpx.Response(200, content=body, headers={"content-type": "text/plain"})
+    ))
+
+    async def run():
+        try:
+            return await fetcher.fetch("http://example.test/page")
+        finally:
+            await fetcher.aclose()
+
+    return asyncio.run(run())
+
+
+def test_body_exactly_at_the_cap_is_not_truncated():
+    page = fetch(b"x" * 10, max_bytes=10)
+    assert page.text == "x" * 10
+    assert not page.truncated
+
+
+def test_body_past_the_cap_is_cut_and_flagged():
+    page = fetch(b"x" * 11, max_bytes=10)
+    assert page.text == "x" * 10
+    assert page.truncated
@@ -0,0 +1,106 @@
+import asyncio
+import json
+
+import pytest
+
+from src.providers import llm
+from src.providers.llm import LLMManager
+from src.providers.stub import StubBehavior, StubProvider
+
+PROMPT = "Platform: reddit\n\nGenerate exactly 2 posts."
+HEDGE_DELAY = 0.05
+
+
+class TimedStub(StubProvider):
+    def __init__(self, name: str, latency: float, failure_rate: float = 0.0, garbage_rate: float = 0.0):
+        super().__init__(behavior=StubBehavior(latency=latency, failure_rate=failure_rate, garbage_rate=garbage_rate, seed=0))
+        self.name = name
+        self.started: list[float] = []
+        self.cancelled = False
+
+    async def agenerate(self, prompt) -> str:
+        self.started.append(asyncio.get_running_loop().time())
+        try:
+            return await super().agenerate(prompt)
+        except asyncio.CancelledError:
+            self.cancelled = True
+            raise
+
+
+@pytest.fixture(autouse=True)
+def hedge_delay(monkeypatch):
+    monkeypatch.setattr(llm, "HEDGE_ENABLED", True)
+    monkeypatch.setattr(llm, "HEDGE_DEFAULT_DELAY", HEDGE_DELAY)
+    monkeypatch.setattr(llm, "HEDGE_MIN_DELAY", HEDGE_DELAY)
+
+
+def manager_with(primary: TimedStub, secondary: TimedStub) -> LLMManager:
+    manager = LLMManager()
+    manager._gemini, manager._minimax = primary, secondary
+    manager._initialized = True
+    return manager
+
+
+def generate(manager: LLMManager, validate=None) -> tuple[str, str, float]:
+    async def run():
+        start = asyncio.get_running_loop().time()
+        result, provider = await manager.agenerate(PROMPT, use_cache=False, validate=validate)
+        await asyncio.sleep(0.01)
+        return result, provider, start
+
+    return asyncio.run(run())
+
+
+def test_fast_primary_never_starts_secondary():
+    primary, secondary = TimedStub("gemini", 0.01), TimedStub("minimax", 0.01)
+    _, provider, _ = generate(manager_with(primary, secondary))
+    assert provider == "gemini"
+    assert secondary.started == []
+
+
+def test_secondary_fires_after_hedge_delay_and_loser_is_cancelled():
+    primary, secondary = TimedStub("gemini", 0.5), TimedStub("minimax", 0.01)
+    manager = manager_with(primary, secondary)
+    _, provider, start = generate(manager)
+
+    assert provider == "minimax"
+    assert secondary.started[0] - start >= HEDGE_DELAY * 0.9
+    assert primary.cancelled
+    assert manager.breakers["gemini"].state == "closed"
+    assert not manager.breakers["gemini"]._trial_in_flight
+    assert manager.latencies["minimax"]._samples
+    assert "gemini" not in manager.latencies
+
+
+def test_result_that_fails_validation_does_not_win():
+    primary = TimedStub("gemini", HEDGE_DELAY * 2, garbage_rate=1.0)
+    secondary = TimedStub("minimax", HEDGE_DELAY * 2)
+    manager = manager_with(primary, secondary)
+    result, provider, _ = generate(manager, validate=json.loads)
+
+    assert provider == "minimax"
+    json.loads(result)
+    assert len(manager.latencies["gemini"]._samples) == 1
+    assert len(manager.latencies["minimax"]._samples) == 1
+
+
+def test_primary_failure_starts_secondary_without_waiting():
+    primary = TimedStub("gemini", 0.0, failure_rate=1.0)
+    secondary = TimedStub("minimax", 0.01)
+    manager = manager_with(primary, secondary)
+    _, provider, start = generate(manager)
+
+    assert provider == "minimax"
+    assert secondary.started[0] - start < HEDGE_DELAY
+    assert manager.breakers["gemini"].failures == 1
+    assert manager.breakers["minimax"].failures == 0
+    assert manager.latencies["minimax"]._samples
+
+
+def test_hedge_delay_follows_observed_latency():
+    primary, secondary = TimedStub("gemini", 0.0), TimedStub("minimax", 0.0)
+    manager = manager_with(primary, secondary)
+    tracker = manager.latencies["gemini"] = llm.LatencyTracker()
+    for _ in range(20):
+        tracker.record(0.2)
+    assert manager._hedge_delay(primary) == pytest.approx(0.2)
@@ -0,0 +1,100 @@
+import asyncio
+
+import pytest
+
+from src.services import ratelimit
+from src.services.ratelimit import RateLimiter, TokenBucket, provider_bucket
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 100.0
+
+    def monotonic(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(ratelimit, "time", clock)
+    return clock
+
+
+def test_bucket_starts_full_and_reports_wait(clock):
+    bucket = TokenBucket(rate=2, capacity=3)
+    assert [bucket.try_acquire() for _ in range(3)] == [0.0, 0.0, 0.0]
+    assert bucket.try_acquire() == pytest.approx(0.5)
+
+
+def test_bucket_refills_at_rate_up_to_capacity(clock):
+    bucket = TokenBucket(rate=2, capacity=3)
+    for _ in range(3):
+        bucket.try_acquire()
+    clock.now += 0.75
+    assert bucket.try_acquire() == 0.0
+    assert bucket.try_acquire() == pytest.approx(0.25)
+
+    clock.now += 60
+    assert bucket.tokens <= 3
+    assert [bucket.try_acquire() for _ in range(4)][-1] == pytest.approx(0.5)
+
+
+def test_failed_acquire_does_not_consume(clock):
+    bucket = TokenBucket(rate=1, capacity=1)
+    bucket.try_acquire()
+    for _ in range(5):
+        assert bucket.try_acquire() == pytest.approx(1.0)
+    clock.now += 1
+    assert bucket.try_acquire() == 0.0
+
+
+def test_acquire_waits_for_a_token():
+    bucket = TokenBucket(rate=50, capacity=1)
+
+    async def run():
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        await bucket.acquire()
+        await bucket.acquire()
+        return loop.time() - start
+
+    assert asyncio.run(run()) >= 0.015
+
+
+def test_limiter_tracks_callers_separately(clock):
+    limiter = RateLimiter(rate=1, burst=2, max_tracked=10)
+    assert limiter.check("a") == 0.0
+    assert limiter.check("a") == 0.0
+    assert limiter.check("a") > 0
+    assert limiter.check("b") == 0.0
+
+
+def test_limiter_evicts_least_recently_seen_caller(clock):
+    limiter = RateLimiter(rate=1, burst=1, max_tracked=2)
+    limiter.check("a")
+    limiter.check("b")
+    limiter.check("a")
+    limiter.check("c")
+    assert len(limiter) == 2
+    assert limiter.check("a") > 0
+    assert limiter.check("b") == 0.0
+
+
+def test_disabled_limiter_allows_everything():
+    limiter = RateLimiter(rate=0, burst=1)
+    assert not limiter.enabled
+    assert all(limiter.check("a") == 0.0 for _ in range(100))
+    assert len(limiter) == 0
+
+
+def test_provider_bucket_reads_env(monkeypatch):
+    monkeypatch.delenv("LLM_RATE", raising=False)
+    monkeypatch.delenv("LLM_RATE_GEMINI", raising=False)
+    assert provider_bucket("gemini") is None
+    monkeypatch.setenv("LLM_RATE", "1")
+    monkeypatch.setenv("LLM_RATE_GEMINI", "4")
+    monkeypatch.setenv("LLM_RATE_BURST_GEMINI", "8")
+    bucket = provider_bucket("gemini")
+    assert (bucket.rate, bucket.capacity) == (4.0, 8.0)
+    assert provider_bucket("minimax").rate == 1.0
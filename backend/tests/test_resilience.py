@@ -0,0 +1,148 @@
+import asyncio
+import time
+
+import pytest
+
+from src.providers import llm
+from src.providers.llm import LLMManager, LLMProvider
+from src.providers.resilience import CircuitBreaker
+
+
+class FakeProvider(LLMProvider):
+    model = "fake"
+
+    def __init__(self, name: str, fail: bool = False):
+        self.name = name
+        self.fail = fail
+        self.calls = 0
+
+    async def agenerate(self, prompt) -> str:
+        self.calls += 1
+        if self.fail:
+            raise RuntimeError(f"{self.name} down")
+        return f"{self.name} answer"
+
+
+def half_open(breaker: CircuitBreaker) -> CircuitBreaker:
+    breaker.failures = breaker.failure_threshold
+    breaker.opened_at = time.monotonic() - breaker.cooldown - 1
+    return breaker
+
+
+@pytest.fixture
+def manager():
+    manager = LLMManager()
+    manager._gemini = FakeProvider("gemini")
+    manager._minimax = FakeProvider("minimax")
+    manager._initialized = True
+    half_open(manager._breaker(manager.minimax))
+    return manager
+
+
+def test_breaker_opens_after_threshold_and_allows_one_trial():
+    breaker = CircuitBreaker(failure_threshold=2, cooldown=60)
+    breaker.record_failure()
+    assert breaker.state == "closed"
+    breaker.record_failure()
+    assert breaker.state == "open"
+    assert not breaker.available()
+
+    half_open(breaker)
+    assert breaker.available()
+    assert breaker.allow()
+    assert not breaker.available()
+    assert not breaker.allow()
+    breaker.record_success()
+    assert breaker.state == "closed"
+
+
+def test_checking_availability_does_not_claim_the_trial():
+    breaker = half_open(CircuitBreaker())
+    for _ in range(3):
+        assert breaker.available()
+    assert not breaker._trial_in_flight
+
+
+@pytest.mark.parametrize("hedge", [True, False])
+def test_unused_half_open_fallback_stays_available(manager, monkeypatch, hedge):
+    monkeypatch.setattr(llm, "HEDGE_ENABLED", hedge)
+    minimax_breaker = manager._breaker(manager.minimax)
+
+    async def run():
+        for i in range(3):
+            result, provider = await manager.agenerate(f"prompt {hedge} {i}", use_cache=False)
+            assert provider == "gemini"
+        assert minimax_breaker.available()
+        assert not minimax_breaker._trial_in_flight
+
+        manager.gemini.fail = True
+        result, provider = await manager.agenerate(f"prompt {hedge} fallback", use_cache=False)
+        assert (result, provider) == ("minimax answer", "minimax")
+        assert minimax_breaker.state == "closed"
+
+    asyncio.run(run())
+
+
+def test_stream_does_not_hold_the_trial_of_an_unused_fallback(manager):
+    minimax_breaker = manager._breaker(manager.minimax)
+
+    async def run():
+        chunks = [chunk async for chunk in manager.astream("stream prompt", use_cache=False)]
+        assert chunks == [("gemini answer", "gemini")]
+
+    asyncio.run(run())
+    assert minimax_breaker.available()
+    assert manager.minimax.calls == 0
+
+
+def test_cancelled_trial_is_released(manager):
+    minimax_breaker = manager._breaker(manager.minimax)
+    started = asyncio.Event()
+
+    async def slow(prompt):
+        started.set()
+        await asyncio.sleep(10)
+
+    manager.minimax.agenerate = slow
+
+    async def run():
+        task = asyncio.create_task(manager._call(manager.minimax, llm.as_prompt("slow"), None))
+        await started.wait()
+        assert not minimax_breaker.available()
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    asyncio.run(run())
+    assert minimax_breaker.available()
+
+
+def test_provider_warmup_does_not_block_the_event_loop(monkeypatch):
+    manager = LLMManager()
+    created = []
+
+    def slow_create():
+        time.sleep(0.2)
+        manager._gemini = FakeProvider("gemini")
+        created.append(True)
+
+    monkeypatch.setattr(manager, "_create_providers", slow_create)
+
+    async def run():
+        ticks = 0
+
+        async def ticker():
+            nonlocal ticks
+            while not created:
+                ticks += 1
+                await asyncio.sleep(0.01)
+
+        tick = asyncio.create_task(ticker())
+        names = await asyncio.gather(manager.provider_names(), manager.provider_names())
+        await tick
+        return names, ticks
+
+    names, ticks = asyncio.run(run())
+    assert names == [["gemini"], ["gemini"]]
+    assert created == [True]
+    assert ticks > 5
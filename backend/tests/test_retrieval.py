@@ -0,0 +1,96 @@
+import asyncio
+import re
+
+from benchmarks.fixtures import make_paragraphs
+from src.services.retrieval import Passage, PassageIndex, PassageIndexes, split_passages, tokenize
+
+DOC = "\n\n".join(make_paragraphs(40))
+OFFSETS = re.compile(r"chars (\d+)-(\d+)")
+
+
+def index_of(*paragraphs: str) -> PassageIndex:
+    passages, start = [], 0
+    for i, text in enumerate(paragraphs):
+        passages.append(Passage(i, start, start + len(text), text))
+        start += len(text) + 2
+    return PassageIndex(passages)
+
+
+def test_tokenize_drops_stopwords_and_single_letters():
+    assert tokenize("The tonearm is a key part of a Turntable") == ["tonearm", "key", "part", "turntable"]
+
+
+def test_passages_point_at_their_source_offsets():
+    passages = split_passages(DOC, max_tokens=60)
+    assert len(passages) > 5
+    for passage in passages:
+        assert DOC[passage.start:passage.end] == passage.text
+        assert len(passage.text) <= 60 * 4
+    assert [p.index for p in passages] == list(range(len(passages)))
+
+
+def test_search_ranks_matching_passage_first():
+    index = index_of(
+        "Cartridge alignment needs a protractor and patience.",
+        "Direct drive motors reach speed quickly.",
+        "Belt drive turntables isolate motor vibration.",
+    )
+    assert index.search("direct drive motor", 1)[0].index == 1
+    assert index.search("protractor", 1)[0].index == 0
+
+
+def test_rare_terms_outweigh_common_ones():
+    index = index_of(
+        "Vinyl vinyl vinyl records.",
+        "Vinyl records and a stylus.",
+        "Vinyl records on the shelf.",
+    )
+    assert index.search("vinyl stylus", 1)[0].index == 1
+
+
+def test_search_excludes_and_pads_with_central_passages():
+    index = index_of(
+        "Tonearm height affects tracking.",
+        "Tonearm bearings and tonearm wiring.",
+        "Something about speakers.",
+    )
+    results = index.search("tonearm", 3, exclude=[1])
+    assert [p.index for p in results][0] == 0
+    assert 1 not in [p.index for p in results]
+    assert len(index.search("no matching words here", 2)) == 2
+
+
+def test_cite_uses_labels_then_falls_back_to_best_match():
+    index = index_of("Cartridge alignment with a protractor.", "Direct drive motors reach speed quickly.")
+    post = index.cite({"title": "Motors", "body": "direct drive speed", "citations": ["P1", "P9"], "comments": [{"citations": ["P2"]}]})
+    assert post["citations"] == [index.passages[0].citation]
+    assert post["comments"][0]["citations"] == [index.passages[1].citation]
+
+    post = index.cite({"title": "Motors", "body": "direct drive speed", "citations": []})
+    assert post["citations"] == [index.passages[1].citation]
+
+
+def test_rebase_moves_citations_to_the_same_text_in_a_shifted_source():
+    paragraphs = make_paragraphs(30)
+    parent = PassageIndex.from_text("\n\n".join(paragraphs))
+    shifted_text = "\n\n".join(["A new opening paragraph about something else entirely."] + paragraphs)
+    shifted = PassageIndex.from_text(shifted_text)
+    parent_text = "\n\n".join(paragraphs)
+    cited = parent.passages[12]
+
+    post = shifted.rebase({"title": "", "body": "", "citations": [cited.citation]}, parent_text)
+    start, end = map(int, OFFSETS.search(post["citations"][0]).groups())
+    assert shifted_text[start:end] == cited.text
+
+
+def test_indexes_are_built_once_per_text():
+    indexes = PassageIndexes(max_entries=1)
+
+    async def run():
+        first, second = await asyncio.gather(indexes.get(DOC), indexes.get(DOC))
+        assert first is second
+        await indexes.get("other text")
+        assert len(indexes) == 1
+        assert await indexes.get(DOC) is not first
+
+    asyncio.run(run())
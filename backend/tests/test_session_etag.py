@@ -0,0 +1,25 @@
+import asyncio
+
+import httpx
+
+from src.main import app
+
+
+def test_session_etag_is_weak_and_varies_on_encoding():
+    async def run():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            created = await client.post("/api/ingest/text", json={"prompt": "Turntables and belts. " * 200})
+            url = f"/api/session/{created.json()['session_id']}"
+            identity = await client.get(url, headers={"Accept-Encoding": "identity"})
+            gzipped = await client.get(url, headers={"Accept-Encoding": "gzip"})
+            cached = await client.get(url, headers={"Accept-Encoding": "gzip", "If-None-Match": identity.headers["etag"]})
+            return identity, gzipped, cached
+
+    identity, gzipped, cached = asyncio.run(run())
+    assert identity.headers["etag"].startswith('W/"')
+    assert gzipped.headers["content-encoding"] == "gzip"
+    assert gzipped.headers["etag"] == identity.headers["etag"]
+    assert cached.status_code == 304
+    for response in (identity, gzipped, cached):
+        assert response.headers["vary"].lower() == "accept-encoding"
@@ -0,0 +1,40 @@
+import time
+
+from src.models.schemas import Session
+from src.services.session import SqliteSessionStore
+
+
+def session(session_id: str, text: str = "source") -> Session:
+    return Session(session_id=session_id, source_text=text, platform="reddit")
+
+
+def test_sqlite_store_caps_session_count(tmp_path):
+    store = SqliteSessionStore(str(tmp_path / "s.db"), max_count=3, prune_every=1)
+    for i in range(5):
+        store.put(session(f"s{i}"))
+        time.sleep(0.001)
+    assert len(store) == 3
+    assert store.get("s0") is None
+    assert store.get("s4") is not None
+
+
+def test_sqlite_store_caps_bytes_including_posts(tmp_path):
+    store = SqliteSessionStore(str(tmp_path / "s.db"), max_bytes=4000, prune_every=1)
+    store.put(session("old"))
+    time.sleep(0.001)
+    store.set_posts("old", [b"x" * 3000])
+    store.put(session("new"))
+    store.set_posts("new", [b"y" * 3000])
+    assert store.get("old") is None
+    assert store.post_count("old") == 0
+    assert store.get("new") is not None
+    assert store.total_bytes <= 4000
+
+
+def test_sqlite_store_prunes_expired_sessions_while_running(tmp_path):
+    store = SqliteSessionStore(str(tmp_path / "s.db"), idle_ttl=0.05, prune_every=2)
+    store.put(session("stale"))
+    time.sleep(0.1)
+    store.put(session("a"))
+    store.put(session("b"))
+    assert len(store) == 2
@@ -0,0 +1,87 @@
+import asyncio
+
+import pytest
+
+from src.services.singleflight import SingleFlight, flight_key
+
+
+def test_concurrent_calls_share_one_execution():
+    flights = SingleFlight("test")
+    calls = 0
+
+    async def work():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        return calls
+
+    async def run():
+        return await asyncio.gather(*(flights.do("k", work) for _ in range(5)))
+
+    assert asyncio.run(run()) == [1] * 5
+    assert calls == 1
+    assert len(flights) == 0
+
+
+def test_sequential_calls_run_again():
+    flights = SingleFlight("test")
+    calls = 0
+
+    async def work():
+        nonlocal calls
+        calls += 1
+        return calls
+
+    async def run():
+        return [await flights.do("k", work), await flights.do("k", work)]
+
+    assert asyncio.run(run()) == [1, 2]
+
+
+def test_errors_reach_every_waiter_and_are_not_cached():
+    flights = SingleFlight("test")
+    attempts = 0
+
+    async def work():
+        nonlocal attempts
+        attempts += 1
+        await asyncio.sleep(0.01)
+        if attempts == 1:
+            raise ValueError("boom")
+        return "ok"
+
+    async def run():
+        results = await asyncio.gather(*(flights.do("k", work) for _ in range(3)), return_exceptions=True)
+        assert all(isinstance(r, ValueError) for r in results)
+        return await flights.do("k", work)
+
+    assert asyncio.run(run()) == "ok"
+    assert attempts == 2
+
+
+def test_cancelling_one_waiter_does_not_cancel_the_shared_call():
+    flights = SingleFlight("test")
+    finished = False
+
+    async def work():
+        nonlocal finished
+        await asyncio.sleep(0.02)
+        finished = True
+        return "done"
+
+    async def run():
+        first = asyncio.create_task(flights.do("k", work))
+        second = asyncio.create_task(flights.do("k", work))
+        await asyncio.sleep(0)
+        first.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await first
+        return await second
+
+    assert asyncio.run(run()) == "done"
+    assert finished
+
+
+def test_flight_key_separates_parts():
+    assert flight_key("ab", "c") != flight_key("a", "bc")
+    assert flight_key("a", 1) == flight_key("a", "1")
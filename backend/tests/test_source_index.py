@@ -0,0 +1,83 @@
+import random
+
+from benchmarks.fixtures import make_paragraphs
+from src.services.fingerprint import bands, content_hash, hamming, simhash
+from src.services.session import SourceIndex
+
+DOC = "\n\n".join(make_paragraphs(30))
+
+
+def test_content_hash_ignores_case_and_punctuation():
+    assert content_hash("Hello,   World!") == content_hash("hello world")
+    assert content_hash("hello world") != content_hash("hello there")
+
+
+def test_values_within_distance_share_a_band():
+    rng = random.Random(0)
+    for _ in range(200):
+        value = rng.getrandbits(64)
+        other = value
+        for bit in rng.sample(range(64), 3):
+            other ^= 1 << bit
+        assert hamming(value, other) == 3
+        assert set(bands(value, 4)) & set(bands(other, 4))
+
+
+def test_exact_keys_map_to_latest_session():
+    index = SourceIndex()
+    index.add("a", ["pdf:1", "text:1"])
+    index.add("b", ["text:1"])
+    assert index.exact("pdf:1") == "a"
+    assert index.exact("text:1") == "b"
+    assert index.exact("text:2") is None
+
+
+def test_similar_finds_near_duplicates_only():
+    index = SourceIndex(max_distance=3)
+    index.add("doc", [], DOC)
+    index.add("other", [], "\n\n".join(make_paragraphs(30, seed=7)))
+    near = DOC.replace(".", "!", 1)
+    assert hamming(simhash(DOC), simhash(near)) <= 3
+    assert index.similar(near) == ["doc"]
+    assert index.similar("Sourdough starters need regular feeding and a warm kitchen.") == []
+
+
+def test_remove_drops_keys_and_bands():
+    index = SourceIndex()
+    index.add("doc", ["text:1"], DOC)
+    index.remove("doc")
+    assert index.exact("text:1") is None
+    assert index.similar(DOC) == []
+    assert not index._bands
+
+
+def test_readding_text_replaces_old_fingerprint():
+    index = SourceIndex()
+    index.add("doc", [], DOC)
+    index.add("doc", [], "\n\n".join(make_paragraphs(30, seed=3)))
+    assert index.similar(DOC) == []
+
+
+def test_evicts_oldest_entries_beyond_limit():
+    index = SourceIndex(max_entries=2)
+    for i, session_id in enumerate("abc"):
+        index.add(session_id, [f"text:{i}"], "\n\n".join(make_paragraphs(10, seed=i)))
+    assert len(index) == 2
+    assert index.exact("text:0") is None
+    assert index.similar("\n\n".join(make_paragraphs(10, seed=0))) == []
+    assert index.similar("\n\n".join(make_paragraphs(10, seed=2))) == ["c"]
+
+
+def test_lookups_do_not_keep_the_parent_alive(monkeypatch):
+    from src.services import session
+
+    store = session.MemorySessionStore(idle_ttl=60)
+    monkeypatch.setattr(session, "store", store)
+    monkeypatch.setattr(session, "source_index", SourceIndex())
+    parent = session.create_session("parent", DOC, "reddit")
+    session.index_source("parent", ["text:1"], DOC)
+    last_access = store._sessions["parent"][2]
+
+    found, exact = session.find_source(["text:1"])
+    assert (found.session_id, exact) == (parent.session_id, True)
+    assert store._sessions["parent"][2] == last_access
@@ -0,0 +1,29 @@
+from src.models.schemas import Session
+from src.routes import generate
+from src.services import prompts
+
+
+class WordEncoder:
+    def encode(self, text, disallowed_special=()):
+        return text.split()
+
+    def decode(self, tokens):
+        return " ".join(tokens)
+
+
+def test_routing_and_truncation_share_the_token_counter(monkeypatch):
+    monkeypatch.setattr(prompts, "_encoder", WordEncoder())
+    monkeypatch.setattr(generate, "CHUNK_TOKENS", 10)
+    text = " ".join(["longword"] * 11)
+    session = Session(session_id="s", source_text=text, platform="reddit")
+
+    assert prompts.count_tokens(text) == 11
+    assert generate._is_long(session)
+    assert prompts.truncate_tokens(text, 10) != text
+
+
+def test_missing_tokenizer_falls_back_to_length_estimate(monkeypatch):
+    monkeypatch.setattr(prompts, "_encoder", None)
+    monkeypatch.setattr(prompts, "TIKTOKEN_AVAILABLE", False)
+    assert prompts._tokenizer() is None
+    assert prompts.count_tokens("x" * 40) == 10
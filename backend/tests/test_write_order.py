@@ -0,0 +1,112 @@
+import pytest
+
+from src.models.schemas import KnowledgeGraphResponse
+from src.services.session import WriteOrder
+
+
+def test_tickets_increase():
+    order = WriteOrder()
+    assert order.begin() < order.begin()
+
+
+def test_newer_write_wins_over_late_older_write():
+    order = WriteOrder()
+    old, new = order.begin(), order.begin()
+    assert order.accept("s", new, {"generated_posts": [2]}) == {"generated_posts": [2]}
+    assert order.accept("s", old, {"generated_posts": [1]}) == {}
+
+
+def test_stale_fields_are_dropped_individually():
+    order = WriteOrder()
+    old, new = order.begin(), order.begin()
+    order.accept("s", new, {"knowledge_graph": "new"})
+    accepted = order.accept("s", old, {"generated_posts": [1], "knowledge_graph": "old"})
+    assert accepted == {"generated_posts": [1]}
+
+
+def test_resets_to_none_are_not_checked_for_staleness():
+    order = WriteOrder()
+    old, new = order.begin(), order.begin()
+    order.accept("s", new, {"knowledge_graph": "new"})
+    accepted = order.accept("s", old, {"generated_posts": [1], "knowledge_graph": None})
+    assert accepted == {"generated_posts": [1], "knowledge_graph": None}
+
+
+def test_write_of_only_stale_fields_is_dropped_with_its_resets():
+    order = WriteOrder()
+    old, new = order.begin(), order.begin()
+    order.accept("s", new, {"generated_posts": [2]})
+    assert order.accept("s", old, {"generated_posts": [1], "knowledge_graph": None}) == {}
+
+
+def test_sessions_are_ordered_independently():
+    order = WriteOrder()
+    old, new = order.begin(), order.begin()
+    order.accept("a", new, {"generated_posts": [2]})
+    assert order.accept("b", old, {"generated_posts": [1]}) == {"generated_posts": [1]}
+
+
+def test_forgets_least_recent_sessions_beyond_limit():
+    order = WriteOrder(max_sessions=2)
+    old, new = order.begin(), order.begin()
+    order.accept("a", new, {"generated_posts": [2]})
+    order.accept("b", new, {"generated_posts": [2]})
+    order.accept("c", new, {"generated_posts": [2]})
+    assert order.accept("a", old, {"generated_posts": [1]}) == {"generated_posts": [1]}
+    assert order.accept("c", old, {"generated_posts": [1]}) == {}
+
+
+@pytest.fixture
+def session(monkeypatch):
+    from src.services import session
+
+    monkeypatch.setattr(session, "store", session.MemorySessionStore())
+    monkeypatch.setattr(session, "write_order", WriteOrder())
+    session.create_session("s", "source", "reddit")
+    return session
+
+
+def post(title: str) -> dict:
+    return {"id": title, "platform": "reddit", "post_type": "question", "title": title, "body": title,
+            "author_handle": "u/a", "upvotes": 1, "timestamp": "now"}
+
+
+def test_graph_built_from_replaced_posts_is_rejected(session):
+    session.update_session_posts("s", [post("a"), post("b")], session.begin_write())
+    version = session.get_session("s").posts_version
+
+    session.update_session_posts("s", [post("c"), post("d")], session.begin_write())
+    assert not session.update_session_graph("s", KnowledgeGraphResponse(nodes=[], edges=[]), version)
+    assert session.get_session("s").knowledge_graph is None
+
+
+def test_graph_for_current_posts_is_stored(session):
+    session.update_session_posts("s", [post("a")], session.begin_write())
+    current = session.get_session("s")
+    graph = KnowledgeGraphResponse(nodes=[], edges=[])
+    assert session.update_session_graph("s", graph, current.posts_version, session.begin_write())
+    stored = session.get_session("s")
+    assert stored.knowledge_graph is not None
+    assert stored.graph_posts_version == stored.posts_version
+
+
+def test_append_changes_posts_version(session):
+    session.update_session_posts("s", [post("a")], session.begin_write())
+    version = session.get_session("s").posts_version
+    assert session.append_session_posts("s", [post("b")], session.begin_write()) == 2
+    assert session.get_session("s").posts_version != version
+
+
+def test_append_started_before_a_rewrite_is_dropped(session):
+    session.update_session_posts("s", [post("a")], session.begin_write())
+    page = session.begin_write()
+    session.update_session_posts("s", [post("b"), post("c")], session.begin_write())
+    assert session.append_session_posts("s", [post("old page")], page) == 2
+    assert [p.id for p in session.get_session_posts("s")] == ["b", "c"]
+
+
+def test_rewrite_started_before_an_append_still_replaces_posts(session):
+    rewrite = session.begin_write()
+    session.append_session_posts("s", [post("page")], session.begin_write())
+    session.update_session_posts("s", [post("new")], rewrite)
+    assert [p.id for p in session.get_session_posts("s")] == ["new"]